@@ -0,0 +1,298 @@
+"""Adaptive question selection with a 2PL IRT model updated online (Elo-style) and recalibrated in batch.
+
+P(correct) = 1 / (1 + exp(-a * (theta - b))), with student ability theta
+and question difficulty b / discrimination a. Each answer moves theta and
+b by one O(1) step; recalibrate() refits every parameter from the full
+answer history with vectorized gradient ascent. Run the batch job with:
+
+    python adaptive.py --epochs 300
+
+It can run while the app is up: each recalibration bumps the version in
+adaptive_calibration, and a running engine that sees a newer version on its
+next persist reloads the refit estimates and drops its unsaved online steps
+(the answers behind them are in quiz_answers for the next refit).
+"""
+import argparse
+import atexit
+import math
+import sqlite3
+import threading
+
+import numpy as np
+
+from config import Config
+from database import get_pool
+from question_bank import QuestionBank, SeenSets
+
+# Starting difficulty for questions that have no estimate yet
+DIFFICULTY_PRIORS = {"easy": -1.0, "medium": 0.0, "hard": 1.0}
+
+
+def probability(theta, a, b):
+    return 1.0 / (1.0 + np.exp(-a * (theta - b)))
+
+
+def information(theta, a, b):
+    """Fisher information of each question at ability theta; the next question maximizes it"""
+    p = probability(theta, a, b)
+    return a * a * p * (1.0 - p)
+
+
+def fit_2pl(students, questions, correct, n_students, n_questions, epochs=300, lr=0.5,
+            theta=None, a=None, b=None):
+    """Joint MAP fit of a 2PL model over every (student, question, correct) triple.
+
+    Standard-normal priors on theta and b and a log-normal prior on a keep
+    sparse students and questions from diverging. One epoch is a handful of
+    array operations over all answers, so millions of answers fit in seconds.
+    """
+    theta = np.zeros(n_students) if theta is None else theta.astype(np.float64).copy()
+    b = np.zeros(n_questions) if b is None else b.astype(np.float64).copy()
+    log_a = np.zeros(n_questions) if a is None else np.log(np.clip(a, 0.2, 4.0))
+    y = correct.astype(np.float64)
+    student_counts = np.bincount(students, minlength=n_students) + 1.0
+    question_counts = np.bincount(questions, minlength=n_questions) + 1.0
+
+    for _ in range(epochs):
+        a_cur = np.exp(log_a)
+        diff = theta[students] - b[questions]
+        residual = y - probability(diff, a_cur[questions], 0.0)
+        grad_theta = np.bincount(students, residual * a_cur[questions], n_students) - theta
+        grad_b = -np.bincount(questions, residual * a_cur[questions], n_questions) - b
+        grad_log_a = np.bincount(questions, residual * diff * a_cur[questions], n_questions) - log_a / 0.25
+        # Per-parameter step sizes scaled by how many answers each one has seen
+        theta += lr * grad_theta / student_counts
+        b += lr * grad_b / question_counts
+        log_a += 0.5 * lr * grad_log_a / question_counts
+        log_a = np.clip(log_a, np.log(0.2), np.log(4.0))
+    return theta, np.exp(log_a), b
+
+
+class AdaptiveEngine:
+    """Per-student ability and per-question difficulty/discrimination for one QuestionBank.
+
+    Online updates only touch in-memory state under a lock; dirty rows are
+    written to student_ability / question_params by a background thread
+    every persist_interval seconds and at exit, unless another process has
+    recalibrated since this engine loaded, in which case it reloads instead.
+    """
+
+    def __init__(self, bank, db_path=None, persist_interval=None):
+        self.db_path = str(db_path or Config.EDUTUTOR_DB_PATH)
+        self.persist_interval = persist_interval if persist_interval is not None else Config.ADAPTIVE_PERSIST_SECONDS
+        self.students = {}  # user_id -> [theta, answers]
+        self.calibration = 0  # adaptive_calibration version the in-memory estimates build on
+        self._dirty_students = set()
+        self._dirty_questions = set()
+        self._lock = threading.Lock()
+        self._persist_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.pool = get_pool(self.db_path)
+        self._reset_questions(bank)
+        self.load()
+        self._worker = None
+        if self.persist_interval > 0:
+            self._worker = threading.Thread(target=self._run, name="adaptive-persist", daemon=True)
+            self._worker.start()
+            atexit.register(self.close)
+
+    def _reset_questions(self, bank):
+        self.bank = bank
+        priors = np.array([DIFFICULTY_PRIORS.get(d, 0.0) for _, _, d in bank.keys], dtype=np.float64)
+        self.b = priors[bank.key_of] if len(bank) else np.zeros(0)
+        self.a = np.ones(len(bank), dtype=np.float64)
+        self.question_answers = np.zeros(len(bank), dtype=np.int64)
+        self._pools = {}  # (subject, topic) -> question IDs across all difficulties
+
+    def rebind(self, bank):
+        """Switch to a reloaded bank: save pending estimates, then reload them by question text"""
+        self.persist()
+        with self._lock:
+            self._reset_questions(bank)
+        self.load()
+
+    def connect(self):
+        return self.pool.connection()
+
+    def load(self):
+        """Read saved estimates; questions are matched by text so bank edits keep their history"""
+        with self.connect() as conn:
+            # Read first: estimates written by a newer recalibration than this are only reloaded again later
+            calibration = conn.execute("SELECT version FROM adaptive_calibration").fetchone()[0]
+            students = conn.execute("SELECT user_id, theta, answers FROM student_ability").fetchall()
+            params = conn.execute("SELECT question, difficulty, discrimination, answers FROM question_params").fetchall()
+        with self._lock:
+            self.calibration = calibration
+            self.students = {user_id: [theta, answers] for user_id, theta, answers in students}
+            for question, difficulty, discrimination, answers in params:
+                qid = self.bank.id_for_text(question)
+                if qid is not None:
+                    self.b[qid], self.a[qid], self.question_answers[qid] = difficulty, discrimination, answers
+
+    def ability(self, user_id):
+        with self._lock:
+            return self.students.get(str(user_id), [0.0, 0])[0]
+
+    def update(self, user_id, question_id, correct):
+        """Elo-style step for one answer; step sizes shrink as estimates gather evidence. Returns the new theta"""
+        user_id = str(user_id)
+        y = 1.0 if correct else 0.0
+        with self._lock:
+            student = self.students.setdefault(user_id, [0.0, 0])
+            a, b = float(self.a[question_id]), float(self.b[question_id])
+            residual = y - 1.0 / (1.0 + math.exp(-a * (student[0] - b)))
+            k_student = Config.ADAPTIVE_K_STUDENT / (1.0 + Config.ADAPTIVE_K_DECAY * student[1])
+            k_question = Config.ADAPTIVE_K_QUESTION / (1.0 + Config.ADAPTIVE_K_DECAY * self.question_answers[question_id])
+            student[0] += k_student * a * residual
+            student[1] += 1
+            self.b[question_id] -= k_question * a * residual
+            self.question_answers[question_id] += 1
+            self._dirty_students.add(user_id)
+            self._dirty_questions.add(question_id)
+            return student[0]
+
+    def next_question(self, user_id, subject, topic, exclude=(), seen=None):
+        """The most informative question at the student's current ability, preferring unseen ones"""
+        pool = self._pools.get((subject, topic))
+        if pool is None:
+            pool = self._pools[(subject, topic)] = np.concatenate(
+                [self.bank.candidates(subject, topic, d) for d in self.bank.difficulties(subject, topic)]
+                or [np.empty(0, dtype=np.int32)])
+        if len(pool) == 0:
+            return None
+        available = ~np.isin(pool, list(exclude)) if exclude else np.ones(len(pool), dtype=bool)
+        if seen is not None:
+            unseen = available & ~SeenSets.mask(seen, pool)
+            if unseen.any():
+                available = unseen
+        if not available.any():
+            return None
+        candidates = pool[available]
+        theta = self.ability(user_id)
+        scores = information(theta, self.a[candidates], self.b[candidates])
+        return int(candidates[int(np.argmax(scores))])
+
+    def persist(self, recalibrated=False):
+        """Write every estimate changed since the last call in one transaction.
+
+        If the write fails, the estimates stay marked dirty for the next call.
+        If another process recalibrated since this engine loaded, nothing is
+        written and the refit estimates are loaded instead. recalibrated bumps
+        the calibration version in the same transaction.
+        """
+        with self._persist_lock:
+            with self._lock:
+                dirty_students, dirty_questions = self._dirty_students, self._dirty_questions
+                self._dirty_students, self._dirty_questions = set(), set()
+                students = [(u, *self.students[u]) for u in dirty_students]
+                questions = [(self.bank.text(q), float(self.b[q]), float(self.a[q]),
+                              int(self.question_answers[q])) for q in dirty_questions]
+                calibration = self.calibration
+            try:
+                if not students and not questions and not recalibrated:
+                    # Nothing to write, so no write lock: only look for a recalibration
+                    stale = self.pool.query("SELECT version FROM adaptive_calibration")[0][0] != calibration
+                else:
+                    stale = self._write(students, questions, calibration, recalibrated)
+            except BaseException:
+                # Answers recorded meanwhile only add to the sets; the values are read again next time
+                with self._lock:
+                    self._dirty_students |= dirty_students
+                    self._dirty_questions |= dirty_questions
+                raise
+            if stale:
+                print("Ability estimates were recalibrated elsewhere; reloading them")
+                with self._lock:
+                    self._reset_questions(self.bank)
+                    self._dirty_students, self._dirty_questions = set(), set()
+                self.load()
+                return False
+            if recalibrated:
+                with self._lock:
+                    self.calibration = calibration + 1
+            return True
+
+    def _write(self, students, questions, calibration, recalibrated):
+        """Write rows if the database is still at calibration; returns whether it had moved on"""
+        with self.pool.transaction() as conn:
+            if conn.execute("SELECT version FROM adaptive_calibration").fetchone()[0] != calibration:
+                return True
+            conn.executemany("INSERT OR REPLACE INTO student_ability (user_id, theta, answers) VALUES (?, ?, ?)",
+                             students)
+            conn.executemany("INSERT OR REPLACE INTO question_params (question, difficulty, discrimination, answers) "
+                             "VALUES (?, ?, ?, ?)", questions)
+            if recalibrated:
+                conn.execute("UPDATE adaptive_calibration SET version = version + 1")
+        return False
+
+    def close(self):
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+        self.persist()
+
+    def _run(self):
+        while not self._stop.wait(self.persist_interval):
+            try:
+                self.persist()
+            except sqlite3.Error as e:
+                print(f"Could not persist ability estimates: {e}")
+
+    def recalibrate(self, epochs=300):
+        """Refit every theta, a and b from all recorded answers that map to a question in the bank.
+
+        Estimates that took an online step while the fit ran keep that step
+        and are refit next time. Returns the number of answers fitted, or 0
+        if another process recalibrated first and its estimates were loaded.
+        """
+        with self.connect() as conn:
+            rows = conn.execute(
+                "SELECT r.user_id, a.question, a.is_correct FROM quiz_answers a "
+                "JOIN quiz_results r ON r.id = a.result_id WHERE a.question IS NOT NULL"
+            ).fetchall()
+        users, students, questions, correct = {}, [], [], []
+        for user_id, question, is_correct in rows:
+            qid = self.bank.id_for_text(question)
+            if qid is None:
+                continue
+            students.append(users.setdefault(user_id, len(users)))
+            questions.append(qid)
+            correct.append(is_correct)
+        if not students:
+            return 0
+
+        with self._lock:
+            theta0 = np.array([self.students.get(u, [0.0, 0])[0] for u in users])
+            a0, b0 = self.a.copy(), self.b.copy()
+            # Answer counts at the snapshot; a row whose count moves during the fit was updated online
+            students0 = {u: self.students.get(u, [0.0, 0])[1] for u in users}
+            questions0 = self.question_answers.copy()
+        students, questions = np.array(students), np.array(questions)
+        theta, a, b = fit_2pl(students, questions, np.array(correct), len(users), len(self.bank),
+                              epochs=epochs, theta=theta0, a=a0, b=b0)
+        answered = np.bincount(questions, minlength=len(self.bank))
+        student_answers = np.bincount(students, minlength=len(users))
+        with self._lock:
+            touched = (answered > 0) & (self.question_answers == questions0)
+            self.a[touched], self.b[touched] = a[touched], b[touched]
+            self.question_answers[touched] = np.maximum(questions0, answered)[touched]
+            refit = [u for u in users if self.students.get(u, [0.0, 0])[1] == students0[u]]
+            for user_id in refit:
+                index = users[user_id]
+                self.students[user_id] = [float(theta[index]), int(student_answers[index])]
+            self._dirty_students.update(refit)
+            self._dirty_questions.update(np.flatnonzero(touched).tolist())
+        return len(students) if self.persist(recalibrated=True) else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refit ability and question parameters from answer history")
+    parser.add_argument("--epochs", type=int, default=300)
+    args = parser.parse_args()
+    engine = AdaptiveEngine(QuestionBank.from_json(Config.QUESTION_BANK_PATH), persist_interval=0)
+    print(f"Recalibrated from {engine.recalibrate(args.epochs)} answers")
+
+
+if __name__ == "__main__":
+    main()
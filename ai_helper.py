@@ -1,13 +1,10 @@
-import google.generativeai as genai
-from config import Config
+from llm_client import get_llm_client
 
-# Configure Gemini
-genai.configure(api_key=Config.GEMINI_API_KEY)
+def ask_ai(prompt, user_id=None):
+    """The full answer; raises llm_gateway.LLMError on failure"""
+    # Shared client: one model object, cached and coalesced responses
+    return get_llm_client().ask(prompt, user_id=user_id)
 
-def ask_ai(prompt):
-    try:
-        model = genai.GenerativeModel("gemini-pro")  # or gemini-1.5-pro
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        return f"⚠️ Gemini Error: {str(e)}"
\ No newline at end of file
+def stream_ai(prompt, user_id=None):
+    """Yield the answer as it is generated, for st.write_stream; raises llm_gateway.LLMError on failure"""
+    return get_llm_client().stream(prompt, user_id=user_id)
\ No newline at end of file
@@ -0,0 +1,117 @@
+import json
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from config import Config
+
+AGGREGATES_MIGRATION = "student_aggregates_v1"
+# What SQLite's CURRENT_TIMESTAMP writes (UTC); every writer uses it, so timestamps order correctly as text
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def db_timestamp(value=None):
+    """A time in TIMESTAMP_FORMAT: epoch seconds, an ISO 8601 string (naive means local time) or None for now.
+
+    Strings that do not parse are returned unchanged.
+    """
+    if value is None or isinstance(value, (int, float)):
+        when = datetime.fromtimestamp(value if value is not None else datetime.now().timestamp(), timezone.utc)
+    else:
+        try:
+            when = datetime.fromisoformat(str(value)).astimezone(timezone.utc)
+        except ValueError:
+            return value
+    return when.strftime(TIMESTAMP_FORMAT)
+
+
+def create_aggregates_table(c):
+    """Per student x subject x topic x difficulty running totals, so dashboards read O(students) rows"""
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS student_aggregates (
+        user_id TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        topic TEXT NOT NULL,
+        difficulty TEXT NOT NULL,
+        attempts INTEGER NOT NULL,
+        score_sum INTEGER NOT NULL,
+        total_sum INTEGER NOT NULL,
+        last_timestamp TIMESTAMP,
+        recent_pcts TEXT NOT NULL DEFAULT '[]',
+        PRIMARY KEY (user_id, subject, topic, difficulty)
+    )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_student_aggregates_subject ON student_aggregates (subject)")
+
+
+def _percentage(score, total):
+    return round(score / total * 100, 2) if total else 0.0
+
+
+def apply_attempts(c, attempts):
+    """Fold newly inserted attempts into the aggregates; call inside the transaction that inserted them.
+
+    Each attempt is a dict with user_id, subject, topic, difficulty, score,
+    total and timestamp. Cost is O(distinct keys in the batch), independent
+    of how much history already exists.
+    """
+    deltas = defaultdict(lambda: [0, 0, 0, None, []])
+    for a in sorted(attempts, key=lambda a: a["timestamp"] or ""):
+        delta = deltas[(a["user_id"], a["subject"], a["topic"], a["difficulty"])]
+        delta[0] += 1
+        delta[1] += a["score"]
+        delta[2] += a["total"]
+        delta[3] = max(delta[3] or "", a["timestamp"] or "") or None
+        delta[4].append(_percentage(a["score"], a["total"]))
+
+    keep = Config.ANALYTICS_TREND_LENGTH
+    for key, (attempts_n, score_sum, total_sum, last_ts, pcts) in deltas.items():
+        row = c.execute(
+            "SELECT attempts, score_sum, total_sum, last_timestamp, recent_pcts FROM student_aggregates "
+            "WHERE user_id = ? AND subject = ? AND topic = ? AND difficulty = ?", key,
+        ).fetchone()
+        if row is not None:
+            attempts_n += row[0]
+            score_sum += row[1]
+            total_sum += row[2]
+            last_ts = max(row[3] or "", last_ts or "") or None
+            pcts = json.loads(row[4]) + pcts
+        c.execute(
+            "INSERT OR REPLACE INTO student_aggregates (user_id, subject, topic, difficulty, attempts, "
+            "score_sum, total_sum, last_timestamp, recent_pcts) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (*key, attempts_n, score_sum, total_sum, last_ts, json.dumps(pcts[-keep:])),
+        )
+
+
+def rebuild_aggregates(c):
+    """Recompute every aggregate from quiz_results (one pass; used for existing history)"""
+    c.execute("DELETE FROM student_aggregates")
+    c.execute("""
+    INSERT INTO student_aggregates (user_id, subject, topic, difficulty, attempts, score_sum, total_sum, last_timestamp)
+    SELECT user_id, subject, topic, difficulty, COUNT(*), SUM(score), SUM(total), MAX(timestamp)
+    FROM quiz_results GROUP BY user_id, subject, topic, difficulty
+    """)
+
+    trends = defaultdict(list)
+    rows = c.execute("""
+    SELECT user_id, subject, topic, difficulty, score, total FROM (
+        SELECT *, ROW_NUMBER() OVER (
+            PARTITION BY user_id, subject, topic, difficulty ORDER BY timestamp DESC, id DESC
+        ) AS rn FROM quiz_results
+    ) WHERE rn <= ? ORDER BY timestamp, id
+    """, (Config.ANALYTICS_TREND_LENGTH,))
+    for user_id, subject, topic, difficulty, score, total in rows:
+        trends[(user_id, subject, topic, difficulty)].append(_percentage(score, total))
+    c.executemany(
+        "UPDATE student_aggregates SET recent_pcts = ? "
+        "WHERE user_id = ? AND subject = ? AND topic = ? AND difficulty = ?",
+        [(json.dumps(pcts), *key) for key, pcts in trends.items()],
+    )
+
+
+def ensure_aggregates(c):
+    """Create the aggregates table and backfill it once from existing history"""
+    create_aggregates_table(c)
+    if c.execute("SELECT 1 FROM applied_migrations WHERE name = ?", (AGGREGATES_MIGRATION,)).fetchone():
+        return
+    rebuild_aggregates(c)
+    c.execute("INSERT INTO applied_migrations (name) VALUES (?)", (AGGREGATES_MIGRATION,))
@@ -1,58 +1,138 @@
 import streamlit as st
-from auth import AuthSystem
-from quiz import QuizEngine
-from analytics import AnalyticsDashboard
-from modules.pdf_qa import PDFQASystem
-from modules.ask_ai import AskAI
 from config import Config
 from database import init_db
-import base64
+from llm_gateway import LLMError
+from static_assets import background_css
 from pathlib import Path
-from ai_helper import ask_ai as ask_ai_func
 from datetime import datetime
 import json
 import os
 import logging
+import threading
+import time
 
 user_info = None
 
 def ensure_background_image():
-    try:
-        img_path = Path(__file__).parent / 'assets' / 'image_classification.png'
-        if img_path.exists():
-            with open(img_path, "rb") as image_file:
-                encoded_string = base64.b64encode(image_file.read()).decode()
-            bg_image = f"url('data:image/png;base64,{encoded_string}')"
-        else:
-            raise FileNotFoundError
-    except Exception:
-        bg_image = "url('https://images.unsplash.com/photo-1523050854058-8df90110c9f1')"
+    # The image is read and encoded once per process; with static serving the CSS it carries a short URL instead of ~2 MB of base64
+    css, found = background_css(st.get_option("server.enableStaticServing"))
+    if not found:
         st.warning("Using default background")
+    st.markdown(css, unsafe_allow_html=True)
+
+# Components are built on first use and shared by every session. Heavy imports
+# (torch, transformers, OAuth) happen inside them, so a page only pays for what it shows.
+
+@st.cache_resource
+def prepare_storage():
+    """Create the data directory and schema once per process"""
+    Config.ensure_data_dir()
+    init_db()
+
+@st.cache_resource
+def get_score_store():
+    """One score store per process; runs the schema and JSON migrations once"""
+    from score_store import ScoreStore
+    return ScoreStore()
+
+@st.cache_resource
+def get_session_store():
+    from session_store import SessionStore
+    return SessionStore()
+
+@st.cache_resource
+def get_auth():
+    from auth import AuthSystem
+    return AuthSystem()
 
-    st.markdown(
-        f"""
-        <style>
-        .stApp {{
-            background-image: linear-gradient(rgba(255,255,255,0.95), rgba(255,255,255,0.95)), 
-                              {bg_image};
-            background-size: cover;
-            background-position: center;
-            background-attachment: fixed;
-        }}
-        .main .block-container {{
-            background-color: rgba(255, 255, 255, 0.95);
-            border-radius: 15px;
-            padding: 3rem;
-            margin-top: 2rem;
-        }}
-        .stButton>button {{
-            background-color: #4a6fa5 !important;
-            color: white;
-        }}
-        </style>
-        """,
-        unsafe_allow_html=True
+@st.cache_resource
+def get_quiz_engine():
+    from quiz import QuizEngine
+    from quiz_generator import get_question_generator
+    engine = QuizEngine(data_path=Config.QUESTION_BANK_PATH, history=get_score_store(),
+                        generator=get_question_generator())
+    if engine.pregenerator is not None:
+        engine.pregenerator.start()
+    return engine
+
+@st.cache_resource
+def get_analytics():
+    from analytics import AnalyticsDashboard
+    return AnalyticsDashboard(get_score_store())
+
+@st.cache_resource(show_spinner="Loading PDF Q&A model...")
+def get_pdf_qa():
+    """Shared around the cached T5 model; it keeps no documents, each session passes its own"""
+    from modules.pdf_qa import PDFQASystem
+    return PDFQASystem()
+
+@st.cache_resource(show_spinner="Loading QA model...")
+def get_ask_ai():
+    from modules.ask_ai import AskAI
+    return AskAI()
+
+def warm_up_models():
+    """Load both local models and their batchers so the first question does not wait on them"""
+    from modules.pdf_qa import get_answer_batcher
+    from modules.ask_ai import get_qa_batcher
+    try:
+        get_answer_batcher()
+        get_qa_batcher()
+    except Exception as e:
+        print(f"Model warm-up failed: {e}")
+
+@st.cache_resource
+def start_warmup():
+    """Start the optional background warm-up once per process (WARMUP_MODELS=1)"""
+    thread = threading.Thread(target=warm_up_models, name="model-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def restore_session():
+    """Resume the session named by the signed cookie after a browser refresh or reconnect (once per connection)"""
+    if st.session_state.get('session_checked'):
+        return
+    st.session_state['session_checked'] = True
+    cookies = getattr(getattr(st, "context", None), "cookies", None) or {}
+    store = get_session_store()
+    sid = store.sid_from_cookie(cookies.get(Config.SESSION_COOKIE_NAME))
+    data = store.load(sid) if sid else None
+    if data and data.get('user'):
+        st.session_state.update(data)
+        st.session_state['session_id'] = sid
+
+def persist_session():
+    """Save the restorable part of session_state; written to SQLite only when it changed"""
+    from session_store import snapshot
+    if 'user' not in st.session_state:
+        return
+    store = get_session_store()
+    if 'session_id' in st.session_state:
+        store.save(st.session_state['session_id'], snapshot(st.session_state))
+    else:
+        st.session_state['session_id'] = store.create(snapshot(st.session_state))
+
+def set_session_cookie():
+    """Send the signed session cookie once per connection, which also renews its expiry.
+
+    Streamlit gives the app no HTTP response to attach a Set-Cookie header
+    to, so the cookie is set from a script and cannot be HttpOnly: scripts on
+    the page can read it. It is Secure (unless SESSION_COOKIE_SECURE is off),
+    SameSite=Strict, and expires with the signed value inside it. Serving
+    behind a proxy that sets the cookie itself is the way to get HttpOnly.
+    """
+    if 'session_id' not in st.session_state or st.session_state.get('cookie_sent'):
+        return
+    import streamlit.components.v1 as components
+    store = get_session_store()
+    cookie = store.cookie_for(st.session_state['session_id'])
+    secure = "; Secure" if Config.SESSION_COOKIE_SECURE else ""
+    components.html(
+        f"<script>window.parent.document.cookie = '{Config.SESSION_COOKIE_NAME}={cookie}; path=/; "
+        f"max-age={store.idle_seconds}; SameSite=Strict{secure}';</script>",
+        height=0,
     )
+    st.session_state['cookie_sent'] = True
 
 def setup_file_watching():
     """Configure file watching behavior"""
@@ -62,15 +142,15 @@ def setup_file_watching():
 def show_student_dashboard(user):
     st.title(f"🎒 Welcome, {user['username']}")
     st.caption(f"Level: {user.get('role', 'Student').capitalize()}")
-    analytics.show_student_dashboard(user["username"])
+    get_analytics().show_student_dashboard(user["username"])
 
 def show_educator_dashboard():
     st.title("👩‍🏫 Educator Dashboard")
     tab1, tab2 = st.tabs(["Class Overview", "Reports"])
     with tab1:
-        analytics.show_educator_dashboard()
+        get_analytics().show_educator_dashboard()
     with tab2:
-        analytics.show_student_reports()
+        get_analytics().show_student_reports()
 
 def show_landing_page(auth):
     global user_info
@@ -102,23 +182,42 @@ def display_current_quiz(quiz_engine, user):
     quiz = st.session_state['current_quiz']
     index = quiz['current_question']
     questions = quiz['questions']
-    total = len(questions)
+    # Adaptive quizzes pick each next question after the previous answer, so questions grows as it goes
+    total = quiz.get('length', len(questions))
+    user_identifier = user.get('id', user.get('username', 'anonymous'))
 
     if index >= total:
+        total = len(questions)
         st.success("🎉 Quiz Completed!")
         score = sum(1 for i, q in enumerate(questions) 
                    if quiz['user_answers'][i] == q['correct_option'])
         st.write(f"✅ You scored **{score}/{total}**")
+        if quiz.get('adaptive'):
+            st.caption(f"Estimated ability: {quiz_engine.adaptive.ability(user_identifier):+.2f}")
+
+        answers = [
+            {
+                'question_index': i,
+                'question_id': q.get('id'),
+                'question': q['question'],
+                'selected_option': quiz['user_answers'][i],
+                'correct_option': q['correct_option'],
+                'is_correct': quiz['user_answers'][i] == q['correct_option'],
+                'elapsed_ms': quiz.get('answer_ms', [None] * total)[i],
+            }
+            for i, q in enumerate(questions)
+        ]
 
-        user_identifier = user.get('id', user.get('username', 'anonymous'))
-        
+        # Queued for the background writer; the page does not wait on the database
         quiz_engine.save_score(
             username=user_identifier,
             subject=quiz.get('subject', 'general'),
             topic=quiz.get('topic', 'general'),
             difficulty=quiz.get('difficulty', 'medium'),
             score=score,
-            total=total
+            total=total,
+            answers=answers,
+            started_at=quiz.get('started_at')
         )
 
         del st.session_state['current_quiz']
@@ -131,6 +230,21 @@ def display_current_quiz(quiz_engine, user):
     if st.button("Submit Answer"):
         if selected is not None:
             quiz['user_answers'][index] = question['options'].index(selected) + 1
+            now = time.time()
+            if 'answer_ms' in quiz:
+                quiz['answer_ms'][index] = int((now - quiz['question_shown_at']) * 1000)
+                quiz['question_shown_at'] = now
+            if quiz.get('adaptive'):
+                quiz_engine.record_answer(user_identifier, question,
+                                          quiz['user_answers'][index] == question['correct_option'])
+                if index + 1 < total:
+                    next_question = quiz_engine.next_adaptive_question(
+                        user_identifier, quiz['subject'], quiz['topic'], asked=questions
+                    )
+                    if next_question:
+                        questions.append(next_question)
+                    else:
+                        quiz['length'] = len(questions)
             quiz['current_question'] += 1
             st.rerun()
         else:
@@ -140,22 +254,24 @@ def run_app():
     # Configure file watching and logging
     setup_file_watching()
     
-    # Initialize app components
-    Config.ensure_data_dir()
-    init_db()
+    # Once per process; everything else is built when a menu first needs it
+    prepare_storage()
     ensure_background_image()
+    restore_session()
+    try:
+        show_page()
+    finally:
+        # Also runs when st.rerun() ends the script early, so quiz progress is saved before the next run
+        persist_session()
+    set_session_cookie()
 
-    auth = AuthSystem()
-    quiz_engine = QuizEngine(data_path="data/sample_questions.json")
-    analytics_dashboard = AnalyticsDashboard(Config.DATABASE_URI)
-    pdf_qa = PDFQASystem()
-    ask_ai = AskAI()
-
-    global analytics
-    analytics = analytics_dashboard
+    # After the page has been sent, so warm-up never delays the first render
+    if Config.WARMUP_MODELS:
+        start_warmup()
 
+def show_page():
     if 'user' not in st.session_state:
-        show_landing_page(auth)
+        show_landing_page(get_auth())
     else:
         user = st.session_state['user']
         st.sidebar.title(f"👤 {user['username']}")
@@ -163,48 +279,88 @@ def run_app():
 
         if user.get('role') == 'student':
             menu = st.sidebar.radio("Menu", [
-                "Dashboard", "Take Quiz", "Resources", "PDF Q&A", "Ask AI"
+                "Dashboard", "Take Quiz", "Resources", "PDF Q&A", "Course Library", "Ask AI"
             ])
         else:
             menu = st.sidebar.radio("Menu", [
-                "Dashboard", "Reports"
+                "Dashboard", "Reports", "Course Library"
             ])
 
         if st.sidebar.button("🚪 Logout"):
+            if 'session_id' in st.session_state:
+                get_session_store().delete(st.session_state['session_id'])
             st.session_state.clear()
+            # The stale cookie now names a deleted session; do not restore from it
+            st.session_state['session_checked'] = True
             st.rerun()
 
         if 'current_quiz' in st.session_state:
-            display_current_quiz(quiz_engine, user)
+            display_current_quiz(get_quiz_engine(), user)
         elif user.get('role') == 'student':
             if menu == "Dashboard":
                 show_student_dashboard(user)
             elif menu == "Take Quiz":
                 st.title("🎯 Start a Quiz")
-                subject = st.selectbox("Choose Subject", ["Math", "Science", "English", "History"])
-                topic_map = {
-                    "Math": ["Algebra"],
-                    "Science": ["Physics"],
-                    "English": ["Grammar"],
-                    "History": ["World History"]
-                }
-                topic = st.selectbox("Choose Topic", topic_map.get(subject, []))
-                difficulty_level = st.select_slider("Difficulty", [1, 2, 3],
-                                                  format_func=lambda x: ["Easy", "Medium", "Hard"][x - 1])
-                if st.button("Generate Quiz"):
-                    questions = quiz_engine.get_questions(
-                        subject.lower(), 
-                        topic.lower(), 
-                        ["easy", "medium", "hard"][difficulty_level - 1]
-                    )
+                # Menus come from the compiled bank's index, so new subjects and topics appear automatically
+                bank = get_quiz_engine().bank
+                subject = st.selectbox("Choose Subject", bank.subjects(), format_func=str.title)
+                if subject is None and get_quiz_engine().pregenerator is not None:
+                    # An empty bank has no subjects to choose from; questions are generated for a typed one
+                    from quiz_generator import sanitize_topic
+                    subject = sanitize_topic(st.text_input("Subject", max_chars=Config.QUIZ_TOPIC_MAX_LENGTH)) or None
+                topic = st.selectbox("Choose Topic", bank.topics(subject), format_func=str.title)
+                if get_quiz_engine().pregenerator is not None:
+                    from quiz_generator import sanitize_topic
+                    new_topic = st.text_input("Or type a new topic", max_chars=Config.QUIZ_TOPIC_MAX_LENGTH,
+                                              help="Questions are generated for it")
+                    new_topic = sanitize_topic(new_topic)
+                    if new_topic:
+                        topic = new_topic
+                difficulties = bank.difficulties(subject, topic) if topic else []
+                if not difficulties and get_quiz_engine().pregenerator is not None:
+                    difficulties = ["easy", "medium", "hard"]
+                adaptive = st.checkbox("Adaptive difficulty", value=True,
+                                       help="Each question is chosen from your answers so far")
+                if adaptive:
+                    difficulty = "adaptive"
+                elif len(difficulties) > 1:
+                    difficulty = st.select_slider("Difficulty", difficulties, format_func=str.title)
+                else:
+                    difficulty = difficulties[0] if difficulties else "easy"
+                    st.caption(f"Difficulty: {difficulty.title()}")
+                generate = st.button("Generate Quiz")
+                if generate and not (subject and topic):
+                    st.warning("⚠️ Please choose a subject and a topic.")
+                if generate and subject and topic:
+                    user_identifier = user.get('id', user.get('username', 'anonymous'))
+                    length = 3
+                    questions = []
+                    try:
+                        if adaptive:
+                            first = get_quiz_engine().next_adaptive_question(user_identifier, subject, topic)
+                            questions = [first] if first else []
+                        if not questions:
+                            if adaptive:
+                                # Nothing to adapt over; fall back to a fixed quiz
+                                adaptive, difficulty = False, "medium"
+                            questions = get_quiz_engine().get_questions(subject, topic, difficulty,
+                                                                        num_questions=length, user_id=user_identifier)
+                            length = len(questions)
+                    except LLMError as e:
+                        st.error(f"❌ Could not generate questions: {e}")
                     if questions:
                         st.session_state['current_quiz'] = {
                             'questions': questions,
-                            'user_answers': [0]*len(questions),
+                            'length': length,
+                            'adaptive': adaptive,
+                            'user_answers': [0] * length,
                             'current_question': 0,
-                            'subject': subject,
-                            'topic': topic,
-                            'difficulty': ["easy", "medium", "hard"][difficulty_level - 1]
+                            'subject': subject.title(),
+                            'topic': topic.title(),
+                            'difficulty': difficulty,
+                            'started_at': time.time(),
+                            'question_shown_at': time.time(),
+                            'answer_ms': [None] * length
                         }
                         st.rerun()
                     else:
@@ -224,21 +380,34 @@ def run_app():
                 st.title("📄 Ask Questions from PDF")
                 uploaded_file = st.file_uploader("Upload a PDF file", type="pdf")
                 if uploaded_file:
-                    with open("temp_uploaded.pdf", "wb") as f:
-                        f.write(uploaded_file.getbuffer())
-                    st.success("✅ PDF uploaded. You can now ask a question.")
-                    question = st.text_input("Enter your question:")
-                    if question:
-                        context = pdf_qa.extract_text_from_pdf("temp_uploaded.pdf")
-                        answer = pdf_qa.ask_question(context, question)
-                        st.write(f"🧠 Answer: **{answer}**")
+                    # Parsed once per unique file content, shared across sessions; no temp file on disk
+                    from modules.document_store import get_document_store
+                    pdf_qa = get_pdf_qa()
+                    with st.spinner("Reading and processing PDF..."):
+                        document = get_document_store().get_or_parse(
+                            uploaded_file.getvalue(), pdf_qa.parse_document
+                        )
+                    if not document.chunks:
+                        st.warning("No text found in PDF.")
+                    else:
+                        st.success("✅ PDF uploaded. You can now ask a question.")
+                        question = st.text_input("Enter your question:")
+                        if question:
+                            answer = pdf_qa.ask_question(document.index, question, doc_hash=document.doc_hash)
+                            st.write(f"🧠 Answer: **{answer}**")
+            elif menu == "Course Library":
+                from modules.course_library import get_course_library
+                get_course_library().show_student_interface(get_pdf_qa())
             elif menu == "Ask AI":
-                ask_ai.show_interface()
+                get_ask_ai().show_interface()
         else:
             if menu == "Dashboard":
                 show_educator_dashboard()
             elif menu == "Reports":
-                analytics.show_student_reports()
+                get_analytics().show_student_reports()
+            elif menu == "Course Library":
+                from modules.course_library import get_course_library
+                get_course_library().show_educator_interface(user)
 
 if __name__ == "__main__":
     run_app()
\ No newline at end of file
@@ -0,0 +1,146 @@
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+
+from config import Config
+from database import get_pool
+from analytics_aggregates import apply_attempts, db_timestamp
+
+_STOP = object()
+
+
+class AttemptRecorder:
+    """Write-behind persistence for finished quiz attempts.
+
+    record() only appends to an in-memory queue, so quiz submission never
+    waits on disk. A background thread drains the queue and writes each
+    batch (up to batch_size attempts, or whatever arrived within
+    flush_interval seconds) in one transaction with synchronous=FULL, so
+    a committed batch survives power loss and a partial batch is never
+    visible. Pending attempts are flushed on close() and at interpreter exit.
+    """
+
+    def __init__(self, db_path=None, batch_size=None, flush_interval=None, max_pending=None):
+        self.db_path = str(db_path or Config.EDUTUTOR_DB_PATH)
+        self.batch_size = batch_size or Config.ATTEMPT_BATCH_SIZE
+        self.flush_interval = flush_interval if flush_interval is not None else Config.ATTEMPT_FLUSH_SECONDS
+        # Bounded so a stalled disk applies backpressure instead of growing memory without limit
+        self._queue = queue.Queue(maxsize=max_pending or Config.ATTEMPT_MAX_PENDING)
+        self._closed = False
+        self.written = 0
+        self.batches = 0
+        self.pool = get_pool(self.db_path)
+        self._worker = threading.Thread(target=self._run, name="attempt-recorder", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def record(self, user_id, subject, topic, difficulty, score, total, answers=None,
+               started_at=None, finished_at=None):
+        """Queue one finished attempt; answers is a list of dicts with per-question details"""
+        if self._closed:
+            raise RuntimeError("AttemptRecorder is closed")
+        finished_at = finished_at or time.time()
+        self._queue.put({
+            "user_id": str(user_id),
+            "subject": subject,
+            "topic": topic,
+            "difficulty": difficulty,
+            "score": int(score),
+            "total": int(total),
+            "timestamp": db_timestamp(finished_at),
+            "duration_ms": int((finished_at - started_at) * 1000) if started_at else None,
+            "answers": answers or [],
+        })
+
+    def flush(self):
+        """Block until everything queued so far has been committed"""
+        self._queue.join()
+
+    def close(self):
+        """Flush pending attempts and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._worker.join()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and batch[-1] is not _STOP:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        # This thread's pooled connection; nothing else runs on it, so the stricter sync level stays local
+        conn = self.pool.connection()
+        conn.execute("PRAGMA synchronous=FULL")  # fsync the WAL on every commit
+        while True:
+            batch = self._collect()
+            attempts = [item for item in batch if item is not _STOP]
+            if attempts:
+                self._write_with_retry(conn, attempts)
+            for _ in batch:
+                self._queue.task_done()
+            if len(attempts) < len(batch):
+                return
+
+    def _write_with_retry(self, conn, attempts):
+        delay = 0.05
+        while True:
+            try:
+                with conn:  # One transaction per batch
+                    self._write_batch(conn, attempts)
+                self.written += len(attempts)
+                self.batches += 1
+                return
+            except sqlite3.Error as e:
+                if "locked" not in str(e) and "busy" not in str(e):
+                    print(f"Dropping attempt batch of {len(attempts)}: {e}")
+                    return
+                # Another writer holds the lock: keep the batch and retry rather than lose attempts
+                time.sleep(delay)
+                delay = min(delay * 2, 2.0)
+
+    def _write_batch(self, conn, attempts):
+        answer_rows = []
+        for attempt in attempts:
+            cursor = conn.execute(
+                "INSERT INTO quiz_results (user_id, subject, topic, difficulty, score, total, timestamp, duration_ms) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (attempt["user_id"], attempt["subject"], attempt["topic"], attempt["difficulty"],
+                 attempt["score"], attempt["total"], attempt["timestamp"], attempt["duration_ms"]),
+            )
+            result_id = cursor.lastrowid
+            for answer in attempt["answers"]:
+                answer_rows.append((
+                    result_id, answer.get("question_index"), answer.get("question_id"), answer.get("question"),
+                    answer.get("selected_option"), answer.get("correct_option"),
+                    int(bool(answer.get("is_correct"))), answer.get("elapsed_ms"),
+                ))
+        conn.executemany(
+            "INSERT INTO quiz_answers (result_id, question_index, question_id, question, selected_option, "
+            "correct_option, is_correct, elapsed_ms) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            answer_rows,
+        )
+        # Same transaction, so aggregates never disagree with the raw history
+        apply_attempts(conn, attempts)
+
+
+_default_recorder = None
+_default_recorder_lock = threading.Lock()
+
+
+def get_attempt_recorder():
+    """Process-wide recorder shared by every session"""
+    global _default_recorder
+    with _default_recorder_lock:
+        if _default_recorder is None:
+            _default_recorder = AttemptRecorder()
+        return _default_recorder
@@ -1,67 +1,90 @@
 import streamlit as st
 import sqlite3
-from google_auth_oauthlib.flow import Flow
-from google.oauth2 import id_token
-from google.auth.transport import requests
-import os
+from contextlib import closing
+from pathlib import Path
 from dotenv import load_dotenv
-from config import get_db_connection
+from config import Config
+from credentials import CredentialStore, LoginThrottled
+from database import get_pool
+from oauth import SessionSigner
 
 load_dotenv()
 
 
 class AuthSystem:
-    def __init__(self):
-        self.conn = get_db_connection()
-        self.create_users_table()
-
-    def create_users_table(self):
-        self.conn.execute('''CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT,
-            password TEXT,
-            email TEXT,
-            role TEXT
-        )''')
-        self.conn.commit()
+    def __init__(self, db_path=None, legacy_db_path=None):
+        # Accounts live in the shared database's users table (schema and migrations in database.py)
+        self.pool = get_pool(db_path)
+        self.credentials = CredentialStore(self.pool)
+        self.signer = SessionSigner()
+        self._oauth = None
+        self.migrate_legacy_users(legacy_db_path or Config.LEGACY_USERS_DB)
+
+    def migrate_legacy_users(self, legacy_path):
+        """Import accounts from the old standalone users.db once (plaintext passwords are hashed at next login)"""
+        legacy_path = Path(legacy_path)
+        if not legacy_path.exists() or legacy_path.resolve() == Path(self.pool.db_path).resolve():
+            return 0
+        name = f"legacy_users:{legacy_path.name}"
+        with self.pool.transaction() as conn:
+            if conn.execute("SELECT 1 FROM applied_migrations WHERE name = ?", (name,)).fetchone():
+                return 0
+            try:
+                with closing(sqlite3.connect(legacy_path)) as legacy:
+                    columns = {row[1] for row in legacy.execute("PRAGMA table_info(users)")}
+                    select = ", ".join(c if c in columns else "NULL" for c in ("username", "password", "email", "role"))
+                    rows = legacy.execute(f"SELECT {select} FROM users WHERE username IS NOT NULL").fetchall() if columns else []
+            except sqlite3.DatabaseError as e:
+                print(f"Skipping unreadable account database {legacy_path}: {e}")
+                rows = []
+            conn.executemany(
+                "INSERT OR IGNORE INTO users (username, password, email, role) VALUES (?, ?, NULLIF(?, ''), ?)",
+                [(u, p, e, "teacher" if r in ("teacher", "educator") else "student") for u, p, e, r in rows],
+            )
+            conn.execute("INSERT INTO applied_migrations (name) VALUES (?)", (name,))
+            return len(rows)
 
     def register_user(self, username, password, email, role):
+        if not username or not password:
+            st.error("Registration failed: username and password are required")
+            return False
         try:
-            self.conn.execute("INSERT INTO users (username, password, email, role) VALUES (?, ?, ?, ?)",
-                              (username, password, email, role))
-            self.conn.commit()
+            self.credentials.register(username, password, email, role)
             return True
+        except sqlite3.IntegrityError:
+            st.error("Registration failed: that username or email is already registered")
+            return False
         except Exception as e:
             st.error(f"Registration failed: {e}")
             return False
 
-    def authenticate_user(self, username, password):
-        cursor = self.conn.execute("SELECT * FROM users WHERE username = ? AND password = ?",
-                                   (username, password))
-        return cursor.fetchone()
+    def authenticate_user(self, username, password, client=None):
+        """(id, username, email, role) for valid credentials, else None; raises LoginThrottled"""
+        return self.credentials.authenticate(username, password, client=client)
+
+    def oauth_provider(self):
+        """Built on first use and kept, so discovery metadata and signing keys stay cached"""
+        if self._oauth is None:
+            from oauth import OIDCProvider
+            self._oauth = OIDCProvider(signer=self.signer)
+        return self._oauth
+
+    def start_session(self, user_info):
+        """Issue a signed session token for a logged-in user; get_user_info() checks it locally"""
+        st.session_state.session_token = self.signer.sign(user_info)
+        st.session_state.user_info = user_info
+        return user_info
 
     def login_with_google(self):
-        client_id = os.getenv("GOOGLE_CLIENT_ID")
-        client_secret = os.getenv("GOOGLE_CLIENT_SECRET")
-        redirect_uri = "http://localhost:8501"
-
-        flow = Flow.from_client_config(
-            {
-                "web": {
-                    "client_id": client_id,
-                    "client_secret": client_secret,
-                    "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                    "token_uri": "https://oauth2.googleapis.com/token",
-                    "redirect_uris": [redirect_uri],
-                }
-            },
-            scopes=["https://www.googleapis.com/auth/userinfo.profile",
-                    "https://www.googleapis.com/auth/userinfo.email", "openid"],
-        )
-        flow.redirect_uri = redirect_uri
+        from oauth import OAuthError, link_google_user
+        provider = self.oauth_provider()
 
         if "code" not in st.query_params:
-            auth_url, _ = flow.authorization_url(prompt='consent')
+            try:
+                auth_url = provider.authorization_url()
+            except OAuthError as e:
+                st.error(f"Google login is unavailable: {e}")
+                return None
             st.markdown(
                 f'<a href="{auth_url}" target="_self"><button style="background-color:#0f9d58; color:white; padding:10px 16px; font-size:16px; border:none; border-radius:8px;">🔐 Login with Google</button></a>',
                 unsafe_allow_html=True
@@ -69,23 +92,15 @@ class AuthSystem:
             return None
 
         try:
-            flow.fetch_token(code=st.query_params["code"])
-            credentials = flow.credentials
-            request = requests.Request()
-            id_info = id_token.verify_oauth2_token(credentials._id_token, request, client_id)
-
-            user_info = {
-                "name": id_info["name"],
-                "email": id_info["email"],
-                "picture": id_info["picture"],
-                "role": "student"
-            }
-
-            st.session_state.user_info = user_info
-            return user_info
-        except Exception as e:
+            claims = provider.complete_login(st.query_params["code"], st.query_params.get("state", ""))
+            user_info = link_google_user(self.pool, claims)
+        except OAuthError as e:
             st.error(f"Google login failed: {e}")
             return None
+        finally:
+            # The code is single-use; drop it so a rerun does not replay it
+            st.query_params.clear()
+        return self.start_session(user_info)
 
     def show_login_form(self):
         st.subheader("🔐 Login")
@@ -97,15 +112,20 @@ class AuthSystem:
         username = st.text_input("Username", key="login_username")
         password = st.text_input("Password", type="password", key="login_password")
         if st.button("Login"):
-            user = self.authenticate_user(username, password)
+            try:
+                # Client address for throttling, where this Streamlit version exposes it
+                client = getattr(getattr(st, "context", None), "ip_address", None)
+                user = self.authenticate_user(username, password, client=client)
+            except LoginThrottled as e:
+                st.error(str(e))
+                return None
             if user:
                 st.success("Login successful")
-                st.session_state.user_info = {
+                return self.start_session({
                     "username": user[1],
-                    "email": user[3],
-                    "role": user[4]
-                }
-                return st.session_state.user_info
+                    "email": user[2],
+                    "role": user[3]
+                })
             else:
                 st.error("Invalid credentials")
 
@@ -123,4 +143,8 @@ class AuthSystem:
                 st.success("Registration successful. Please login.")
 
     def get_user_info(self):
-        return st.session_state.get("user_info", None)
+        """The logged-in user if this session holds a valid, unexpired session token"""
+        claims = self.signer.verify(st.session_state.get("session_token"))
+        if claims is None:
+            return None
+        return {k: v for k, v in claims.items() if k not in ("iat", "exp")}
@@ -0,0 +1,116 @@
+"""Simulate students taking adaptive quizzes: ability convergence and engine throughput.
+
+Synthetic students and questions have known 2PL parameters. Every student
+takes --answers questions chosen by AdaptiveEngine (maximum information)
+with the online Elo-style update after each answer; a subset repeats the
+run with randomly chosen questions as a baseline. The whole answer
+history is then refit with the batched fit_2pl recalibration. Run from
+the repository root:
+
+    python -m benchmarks.bench_adaptive --students 100000 --answers 10
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from adaptive import AdaptiveEngine, fit_2pl
+from config import Config
+from question_bank import QuestionBank
+
+
+def make_bank(n_questions, rng):
+    true_b = rng.normal(0.0, 1.0, n_questions)
+    true_a = np.exp(rng.normal(0.0, 0.3, n_questions))
+    questions = [{
+        "question": f"Simulated question {i}", "options": ["a", "b", "c", "d"], "correct_option": 1,
+        "subject": "sim", "topic": "sim",
+        "difficulty": "easy" if b < -0.5 else "hard" if b > 0.5 else "medium",
+    } for i, b in enumerate(true_b)]
+    bank = QuestionBank.from_records(questions)
+    # The compiled bank orders questions by key; line the true parameters up with bank IDs
+    order = np.array([int(bank.text(qid).rsplit(" ", 1)[1]) for qid in range(len(bank))])
+    return bank, true_a[order], true_b[order]
+
+
+def simulate(engine, true_theta, true_a, true_b, answers, adaptive, seed, log=None):
+    """Run every student through a quiz; returns estimated theta after each answer as an array"""
+    rng = random.Random(seed)
+    n_questions = len(true_b)
+    estimates = np.zeros((len(true_theta), answers))
+    for s, theta in enumerate(true_theta):
+        user = f"{'a' if adaptive else 'r'}{s}"
+        asked = []
+        for t in range(answers):
+            if adaptive:
+                qid = engine.next_question(user, "sim", "sim", exclude=asked)
+            else:
+                qid = rng.randrange(n_questions)
+            p = 1.0 / (1.0 + np.exp(-true_a[qid] * (theta - true_b[qid])))
+            correct = rng.random() < p
+            estimates[s, t] = engine.update(user, qid, correct)
+            asked.append(qid)
+            if log is not None:
+                log.append((s, qid, correct))
+    return estimates
+
+
+def rmse(estimates, truth):
+    return float(np.sqrt(np.mean((estimates - truth) ** 2)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=100_000)
+    parser.add_argument("--questions", type=int, default=2000)
+    parser.add_argument("--answers", type=int, default=10)
+    parser.add_argument("--baseline-students", type=int, default=5000)
+    parser.add_argument("--epochs", type=int, default=300)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    bank, true_a, true_b = make_bank(args.questions, rng)
+    true_theta = rng.normal(0.0, 1.0, args.students)
+    Config.LEGACY_SCORE_FILES = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = AdaptiveEngine(bank, db_path=os.path.join(tmp, "sim.db"), persist_interval=0)
+        history = []
+        start = time.perf_counter()
+        adaptive = simulate(engine, true_theta, true_a, true_b, args.answers, True, 1, history)
+        seconds = time.perf_counter() - start
+        steps = args.students * args.answers
+        print(f"{args.students} students x {args.answers} answers: {steps / seconds:,.0f} "
+              f"select+update steps/s ({seconds / steps * 1e6:.0f} us each)")
+
+        start = time.perf_counter()
+        for _ in range(100_000):
+            engine.update("probe", 0, True)
+        print(f"online update alone: {(time.perf_counter() - start) / 100_000 * 1e6:.1f} us")
+
+        subset = true_theta[:args.baseline_students]
+        fresh = AdaptiveEngine(bank, db_path=os.path.join(tmp, "baseline.db"), persist_interval=0)
+        fresh.b[:] = engine.b  # Same question estimates, so only the selection policy differs
+        random_pick = simulate(fresh, subset, true_a, true_b, args.answers, False, 2)
+        adaptive_subset = adaptive[:args.baseline_students]
+        print(f"{'answers':>8} {'adaptive RMSE':>14} {'random RMSE':>12}")
+        for t in range(args.answers):
+            print(f"{t + 1:>8} {rmse(adaptive_subset[:, t], subset):>14.3f} {rmse(random_pick[:, t], subset):>12.3f}")
+        print(f"online difficulty estimates vs truth: r = {np.corrcoef(engine.b, true_b)[0, 1]:.3f}")
+
+        students, questions, correct = (np.array(column) for column in zip(*history))
+        start = time.perf_counter()
+        # Warm-started from the online estimates, as AdaptiveEngine.recalibrate does
+        theta0 = np.array([engine.students[f"a{s}"][0] for s in range(args.students)])
+        theta, a, b = fit_2pl(students, questions, correct, args.students, args.questions, epochs=args.epochs,
+                              theta=theta0, a=engine.a, b=engine.b)
+        print(f"batch recalibration over {len(students):,} answers: {time.perf_counter() - start:.1f}s, "
+              f"theta RMSE {rmse(theta, true_theta):.3f}, difficulty r = {np.corrcoef(b, true_b)[0, 1]:.3f}, "
+              f"discrimination r = {np.corrcoef(a, true_a)[0, 1]:.3f}")
+
+
+if __name__ == "__main__":
+    main()
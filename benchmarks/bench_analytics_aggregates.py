@@ -0,0 +1,116 @@
+"""Educator dashboard data prep: full-history groupby vs. reading the materialized aggregates.
+
+Fills a throwaway database with synthetic attempts, then times what one
+render of the teacher view needs before (every attempt loaded row by row
+into dicts, then grouped) and after (student_aggregates). Run from the
+repository root:
+
+    python -m benchmarks.bench_analytics_aggregates --attempts 1000000 --students 2000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from analytics_aggregates import TIMESTAMP_FORMAT, apply_attempts, db_timestamp, rebuild_aggregates
+from config import Config
+from score_store import ScoreStore
+
+SUBJECTS = {
+    "Math": ["Algebra", "Geometry", "Calculus"],
+    "Science": ["Physics", "Chemistry", "Biology"],
+    "History": ["Ancient", "Modern"],
+}
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+
+def synthetic_rows(count, students, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    subjects = list(SUBJECTS)
+    for n in range(count):
+        subject = rng.choice(subjects)
+        total = rng.choice((3, 5, 10))
+        yield (f"student{rng.randrange(students)}", subject, rng.choice(SUBJECTS[subject]),
+               rng.choice(DIFFICULTIES), rng.randint(0, total), total,
+               (start + timedelta(seconds=n * 30)).strftime(TIMESTAMP_FORMAT))
+
+
+def populate(store, count, students):
+    with store.connect() as conn:
+        conn.executemany(
+            "INSERT INTO quiz_results (user_id, subject, topic, difficulty, score, total, timestamp) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", synthetic_rows(count, students),
+        )
+        rebuild_aggregates(conn)
+        conn.commit()
+
+
+def before(store, subject):
+    """What the dashboard did per render: every attempt as a dict, then a fresh groupby"""
+    with store.connect() as conn:
+        rows = conn.execute("SELECT user_id, subject, topic, difficulty, score, total, timestamp FROM quiz_results")
+        records = [
+            {"username": r[0], "subject": r[1], "topic": r[2], "difficulty": r[3],
+             "score": r[4], "total": r[5], "timestamp": r[6]}
+            for r in rows
+        ]
+    df = pd.DataFrame(records)
+    if subject:
+        df = df[df["subject"] == subject]
+    return df.groupby("username")["score"].sum()
+
+
+def after(store, subject):
+    return store.student_summary(subject).set_index("username")["score"]
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attempts", type=int, default=1_000_000)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    Config.LEGACY_SCORE_FILES = []
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ScoreStore(os.path.join(tmp, "bench.db"))
+        start = time.perf_counter()
+        populate(store, args.attempts, args.students)
+        print(f"loaded {args.attempts} attempts for {args.students} students "
+              f"(incl. one-off aggregate backfill) in {time.perf_counter() - start:.1f}s")
+
+        print(f"{'filter':>10} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+        for subject in [None, "Math"]:
+            old_s, old = timed(lambda: before(store, subject), args.repeat)
+            new_s, new = timed(lambda: after(store, subject), args.repeat)
+            # Both paths must agree on every student's total
+            assert old.sort_index().astype(int).equals(new.sort_index().astype(int)), "aggregates disagree"
+            print(f"{subject or 'All':>10} {old_s * 1000:>10.0f} {new_s * 1000:>10.1f} {old_s / new_s:>7.0f}x")
+
+        # Incremental maintenance cost per recorded attempt
+        attempt = {"user_id": "student1", "subject": "Math", "topic": "Algebra", "difficulty": "easy",
+                   "score": 2, "total": 3, "timestamp": db_timestamp()}
+        with store.connect() as conn:
+            start = time.perf_counter()
+            for _ in range(1000):
+                apply_attempts(conn, [attempt])
+            conn.rollback()
+        print(f"incremental update: {(time.perf_counter() - start) * 1000:.0f}us per attempt")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Analytics loading: per-record dict building vs. the typed columnar path in ScoreStore.
+
+"before" is what the dashboards used to do: load every attempt from
+scores.json, rebuild each record with .get()/int() in Python, then filter
+for one student. "after" reads from SQLite straight into typed columns
+(categorical text, int32 scores, datetime64 timestamps), and the student
+view goes through the (user_id, timestamp) index. Run from the repository
+root:
+
+    python -m benchmarks.bench_analytics_loading --attempts 1000000
+"""
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.bench_analytics_aggregates import populate, synthetic_rows
+from config import Config
+from score_store import ScoreStore
+
+FIELDS = ["username", "subject", "topic", "difficulty", "score", "total", "timestamp"]
+
+
+def write_json(path, count, students):
+    with open(path, "w") as f:
+        json.dump([dict(zip(FIELDS, row)) for row in synthetic_rows(count, students)], f)
+
+
+def before_load(json_path, username=None):
+    with open(json_path, "r", encoding="utf-8-sig") as f:
+        data = json.load(f)
+    processed = []
+    for record in data:
+        if not isinstance(record, dict):
+            continue
+        processed.append({
+            "username": record.get("username", ""),
+            "subject": record.get("subject", "Unknown"),
+            "topic": record.get("topic", "Unknown"),
+            "difficulty": record.get("difficulty", "Unknown"),
+            "score": int(record.get("score", 0)),
+            "total": int(record.get("total", 1)),
+            "timestamp": record.get("timestamp", ""),
+        })
+    df = pd.DataFrame(processed)
+    if username is not None:
+        df = df[df["username"] == username]
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    return df
+
+
+def measure(fn):
+    """(seconds, peak traced MiB, result frame MiB, rows); timed untraced, since tracing slows allocation"""
+    gc.collect()
+    start = time.perf_counter()
+    df = fn()
+    seconds = time.perf_counter() - start
+    del df
+    gc.collect()
+    tracemalloc.start()
+    df = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak / 2**20, df.memory_usage(deep=True).sum() / 2**20, len(df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attempts", type=int, default=1_000_000)
+    parser.add_argument("--students", type=int, default=2000)
+    args = parser.parse_args()
+
+    Config.LEGACY_SCORE_FILES = []
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "scores.json")
+        write_json(json_path, args.attempts, args.students)
+        store = ScoreStore(os.path.join(tmp, "bench.db"))
+        populate(store, args.attempts, args.students)
+
+        cases = [
+            ("all, before", lambda: before_load(json_path)),
+            ("all, after", lambda: store.load_recent(limit=args.attempts)),
+            ("1 student, before", lambda: before_load(json_path, "student7")),
+            ("1 student, after", lambda: store.load_user("student7")),
+        ]
+        print(f"{'case':>18} {'rows':>8} {'seconds':>8} {'peak MiB':>9} {'frame MiB':>10}")
+        for label, fn in cases:
+            seconds, peak, frame, rows = measure(fn)
+            print(f"{label:>18} {rows:>8} {seconds:>8.3f} {peak:>9.1f} {frame:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
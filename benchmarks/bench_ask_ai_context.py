@@ -0,0 +1,71 @@
+"""Follow-up questions on one long passage: per-question pipeline calls vs the encode-once QAContext.
+
+The baseline sends each question with the full passage through the
+question-answering pipeline (as Ask AI did), which re-tokenizes the passage
+and runs its windows for every question. QAContext tokenizes it once and
+runs all (question, window) pairs as padded batches; asking the same
+questions again is served from its answer cache. Model forward calls are
+counted with a hook. Run from the repository root:
+
+    python -m benchmarks.bench_ask_ai_context --words 5000 --questions 5
+    python -m benchmarks.bench_ask_ai_context --backend int8 --pairs-per-pass 0
+"""
+import argparse
+import time
+
+from tests.helpers import FACTS, FILLER, make_passage, pipeline_answers
+
+
+def count_forward_calls(model):
+    calls = [0]
+    if hasattr(model, "register_forward_hook"):
+        model.register_forward_hook(lambda *_: calls.__setitem__(0, calls[0] + 1))
+    return calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, default=5000)
+    parser.add_argument("--questions", type=int, default=5, choices=range(1, len(FACTS) + 1))
+    parser.add_argument("--backend", default=None, help="torch, int8 or onnx (default: INFERENCE_BACKEND)")
+    parser.add_argument("--pairs-per-pass", type=int, default=None,
+                        help="(question, window) pairs per forward pass; 0 = all in one")
+    args = parser.parse_args()
+
+    from modules.inference_backends import load_qa
+    from modules.qa_context import QAContext
+
+    qa_pipeline = load_qa(args.backend)
+    calls = count_forward_calls(qa_pipeline.model)
+    passage, questions = make_passage(args.words, args.questions)
+    pipeline_answers(qa_pipeline, [(questions[0], FILLER)])  # Warm up outside the timings
+    print(f"passage: {len(passage.split())} words, {len(questions)} questions")
+    print(f"{'mode':>22} {'ms':>9} {'forward calls':>14}")
+
+    calls[0] = 0
+    start = time.perf_counter()
+    baseline = [pipeline_answers(qa_pipeline, [(question, passage)])[0] for question in questions]
+    print(f"{'pipeline per question':>22} {(time.perf_counter() - start) * 1000:>9.1f} {calls[0]:>14}")
+
+    calls[0] = 0
+    start = time.perf_counter()
+    context = QAContext(passage, qa_pipeline.tokenizer)
+    tokenized_ms = (time.perf_counter() - start) * 1000
+    answers = context.answer(qa_pipeline.model, questions, pairs_per_pass=args.pairs_per_pass)
+    print(f"{'QAContext, cold':>22} {(time.perf_counter() - start) * 1000:>9.1f} {calls[0]:>14}"
+          f"   (tokenize {tokenized_ms:.1f} ms, {context.pairs_encoded} pairs)")
+
+    calls[0] = 0
+    start = time.perf_counter()
+    context.answer(qa_pipeline.model, questions)
+    print(f"{'QAContext, repeated':>22} {(time.perf_counter() - start) * 1000:>9.1f} {calls[0]:>14}")
+
+    print()
+    for question, expected, result in zip(questions, baseline, answers):
+        same = "same" if expected["answer"].strip() == result["answer"].strip() else "DIFFERENT"
+        print(f"{question}\n  pipeline:  {expected['answer']!r} ({expected['score']:.2f})"
+              f"\n  QAContext: {result['answer']!r} ({result['score']:.2f})  {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Quiz submission latency and sustained ingest: write-behind recorder vs. one synchronous insert per attempt.
+
+Uses a throwaway database. Run from the repository root:
+
+    python -m benchmarks.bench_attempt_recorder --attempts 20000 --threads 8
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from attempt_recorder import AttemptRecorder
+from score_store import ScoreStore
+from config import Config
+
+
+def make_attempt(rng, n):
+    answers = [{"question_index": i, "question": f"Question {i}", "selected_option": rng.randint(1, 4),
+                "correct_option": 2, "is_correct": rng.random() < 0.6, "elapsed_ms": rng.randint(2000, 30000)}
+               for i in range(3)]
+    return dict(user_id=f"student{n % 500}", subject="Math", topic="Algebra", difficulty="easy",
+                score=sum(a["is_correct"] for a in answers), total=3, answers=answers,
+                started_at=time.time() - 60)
+
+
+def drive(submit, attempts, threads):
+    """Submit attempts from several threads; returns (submission latencies, wall seconds)"""
+    latencies = []
+    lock = threading.Lock()
+    per_thread = attempts // threads
+
+    def worker(offset):
+        rng = random.Random(offset)
+        local = []
+        for n in range(per_thread):
+            attempt = make_attempt(rng, offset + n)
+            t = time.perf_counter()
+            submit(attempt)
+            local.append(time.perf_counter() - t)
+        with lock:
+            latencies.extend(local)
+
+    pool = [threading.Thread(target=worker, args=(i * per_thread,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return sorted(latencies), time.perf_counter() - start
+
+
+def report(label, latencies, seconds, count):
+    p50 = latencies[len(latencies) // 2] * 1e6
+    p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+    print(f"{label:>14} {count / seconds:>12.0f} {p50:>9.0f} {p99:>9.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attempts", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--sync-attempts", type=int, default=2000,
+                        help="the synchronous baseline is slow, so it runs on fewer attempts")
+    args = parser.parse_args()
+
+    Config.LEGACY_SCORE_FILES = []
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'mode':>14} {'attempts/s':>12} {'p50 us':>9} {'p99 us':>9}")
+
+        store = ScoreStore(os.path.join(tmp, "sync.db"))
+        latencies, seconds = drive(
+            lambda a: store.add_score(a["user_id"], a["subject"], a["topic"], a["difficulty"], a["score"], a["total"]),
+            args.sync_attempts, args.threads)
+        report("sync insert", latencies, seconds, len(latencies))
+
+        recorder = AttemptRecorder(os.path.join(tmp, "behind.db"))
+        start = time.perf_counter()
+        latencies, _ = drive(lambda a: recorder.record(**a), args.attempts, args.threads)
+        recorder.flush()  # Ingest rate counts until everything is durably committed
+        seconds = time.perf_counter() - start
+        report("write-behind", latencies, seconds, len(latencies))
+        print(f"write-behind committed {recorder.written} attempts in {recorder.batches} batches")
+        recorder.close()
+
+
+if __name__ == "__main__":
+    main()
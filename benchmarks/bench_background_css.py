@@ -0,0 +1,53 @@
+"""Per-rerun cost of the background CSS: bytes pushed through st.markdown and time to build it.
+
+"before" re-reads and base64-encodes the PNG on every rerun, as app.py
+used to. The other rows use static_assets.background_css: a data URI
+memoized per process, and a short static URL. If a WebP variant has been
+built (python static_assets.py), it is reported as well. Run from the
+repository root:
+
+    python -m benchmarks.bench_background_css --reruns 50
+"""
+import argparse
+import base64
+import time
+
+import static_assets
+from config import Config
+
+
+def before():
+    with open(Config.BACKGROUND_IMAGE, "rb") as image_file:
+        encoded_string = base64.b64encode(image_file.read()).decode()
+    return static_assets.BACKGROUND_CSS.format(bg_image=f"url('data:image/png;base64,{encoded_string}')")
+
+
+def timed(build, reruns):
+    start = time.perf_counter()
+    for _ in range(reruns):
+        css = build()
+    return (time.perf_counter() - start) / reruns, len(css.encode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=50)
+    args = parser.parse_args()
+
+    cases = [
+        ("before: encode per rerun", before),
+        ("memoized data URI", lambda: static_assets.background_css(False)[0]),
+        ("static URL", lambda: static_assets.background_css(True)[0]),
+    ]
+    webp = static_assets.variant_path(".webp")
+    print(f"{'mode':>26} {'bytes/rerun':>12} {'ms/rerun':>9}")
+    for label, build in cases:
+        per_rerun, size = timed(build, args.reruns)
+        print(f"{label:>26} {size:>12,} {per_rerun * 1000:>9.3f}")
+    if webp.exists():
+        print(f"static WebP variant is {webp.stat().st_size:,} bytes, fetched once and then cached by the browser "
+              f"(PNG: {Config.BACKGROUND_IMAGE.stat().st_size:,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
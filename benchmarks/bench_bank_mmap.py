@@ -0,0 +1,99 @@
+"""Question bank load time and per-process memory: JSON parse vs. the memory-mapped compiled bank.
+
+Several fresh worker processes each load the same bank, serve a batch of
+random questions and report load time, RSS and PSS. PSS splits shared
+pages between the processes that map them, so it shows what each worker
+really costs once the compiled file is shared through the page cache.
+Linux only (reads /proc). Run from the repository root:
+
+    python -m benchmarks.bench_bank_mmap --questions 100000 --workers 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.bench_question_bank import synthetic_bank
+from question_bank import QuestionBank, ensure_compiled
+
+
+def memory_kib():
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                fields[parts[0][:-1]] = int(parts[1])
+    return fields["Rss"], fields["Pss"]
+
+
+def worker(mode, json_path, bank_path, lookups, start_barrier, done_barrier, results):
+    start = time.perf_counter()
+    if mode == "json":
+        # What QuizEngine did before: parse the whole file into Python objects
+        with open(json_path, "r", encoding="utf-8") as f:
+            questions = json.load(f)
+        fetch = questions.__getitem__
+        count = len(questions)
+    elif mode == "mmap":
+        bank = QuestionBank.open(bank_path)
+        fetch = bank.question
+        count = len(bank)
+    else:
+        fetch, count = (lambda i: None), 1
+    load_seconds = time.perf_counter() - start
+
+    rng = random.Random(os.getpid())
+    for _ in range(lookups):
+        fetch(rng.randrange(count))
+    start_barrier.wait()  # Everyone is loaded, so PSS reflects the sharing
+    rss, pss = memory_kib()
+    results.put((load_seconds, rss, pss))
+    done_barrier.wait()
+
+
+def run(mode, json_path, bank_path, workers, lookups):
+    ctx = multiprocessing.get_context("spawn")
+    start_barrier, done_barrier, results = ctx.Barrier(workers), ctx.Barrier(workers), ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(mode, json_path, bank_path, lookups, start_barrier,
+                                                done_barrier, results)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    rows = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--lookups", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "questions.json")
+        with open(json_path, "w") as f:
+            json.dump(synthetic_bank(args.questions), f)
+        start = time.perf_counter()
+        bank_path = ensure_compiled(json_path)
+        print(f"{args.questions} questions: JSON {os.path.getsize(json_path) / 2**20:.1f} MiB, compiled "
+              f"{os.path.getsize(bank_path) / 2**20:.1f} MiB in {time.perf_counter() - start:.1f}s (once)")
+
+        baseline = run("none", json_path, bank_path, 1, 0)[0]
+        print(f"interpreter with imports only: RSS {baseline[1] / 1024:.0f} MiB")
+        print(f"{'mode':>6} {'load ms':>9} {'RSS MiB':>9} {'PSS MiB':>9}")
+        for mode in ("json", "mmap"):
+            rows = run(mode, json_path, bank_path, args.workers, args.lookups)
+            load = sum(r[0] for r in rows) / len(rows)
+            rss = sum(r[1] for r in rows) / len(rows) / 1024
+            pss = sum(r[2] for r in rows) / len(rows) / 1024
+            print(f"{mode:>6} {load * 1000:>9.1f} {rss:>9.1f} {pss:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
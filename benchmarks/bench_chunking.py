@@ -0,0 +1,83 @@
+"""Whitespace-word chunks vs token-accurate overlapping chunks (TokenChunker) on a synthetic textbook.
+
+For each chunker: pages/sec, chunks produced, the largest chunk in real T5
+tokens, how many PDF_QA_TOP_K-chunk prompts would overflow T5's 512-token
+input, and peak Python memory while streaming. Needs the t5-small
+tokenizer (downloaded on first use). Run from the repository root:
+
+    python -m benchmarks.bench_chunking --pages 500
+    python -m benchmarks.bench_chunking --pages 2000 --chunk-tokens 150 --overlap 32
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from config import Config
+from modules.chunking import TokenChunker
+
+WORDS = ("energy cell matrix vector theorem equation molecule empire treaty grammar clause photosynthesis "
+         "gravity velocity derivative integral revolution 1648 H2O e=mc^2 (see Fig. 3.2) x_1+x_2").split()
+PROMPT_TOKENS = 512
+QUESTION = "question: What does the derivative of velocity describe? context: "
+
+
+def make_pages(num_pages, words_per_page=450, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(words_per_page)) for _ in range(num_pages)]
+
+
+def word_chunks(pages, max_words):
+    """The previous chunker: max_words whitespace words per chunk, no overlap"""
+    current = []
+    for page in pages:
+        for word in page.split():
+            current.append(word)
+            if len(current) >= max_words:
+                yield " ".join(current)
+                current = []
+    if current:
+        yield " ".join(current)
+
+
+def measure(label, make_chunks, pages, tokenizer, top_k):
+    tracemalloc.start()
+    start = time.perf_counter()
+    chunks = list(make_chunks(iter(pages)))
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    lengths = [len(ids) for ids in tokenizer(chunks, add_special_tokens=False)["input_ids"]]
+    question_tokens = len(tokenizer(QUESTION)["input_ids"])
+    prompts = [sum(lengths[i:i + top_k]) + question_tokens for i in range(0, len(lengths), top_k)]
+    overflow = sum(length > PROMPT_TOKENS for length in prompts)
+    print(f"{label:>24} {len(pages) / seconds:>10.1f} {len(chunks):>7} {max(lengths):>10} "
+          f"{overflow:>5}/{len(prompts):<5} {peak / 1e6:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--words", type=int, nargs="+", default=[120, 300], help="word chunk sizes to compare")
+    parser.add_argument("--chunk-tokens", type=int, default=Config.PDF_QA_CHUNK_TOKENS)
+    parser.add_argument("--overlap", type=int, default=Config.PDF_QA_CHUNK_OVERLAP)
+    parser.add_argument("--top-k", type=int, default=Config.PDF_QA_TOP_K)
+    args = parser.parse_args()
+
+    from transformers import T5TokenizerFast
+    from modules.inference_backends import T5_MODEL_NAME
+    tokenizer = T5TokenizerFast.from_pretrained(T5_MODEL_NAME)
+    pages = make_pages(args.pages)
+    chunker = TokenChunker(tokenizer, args.chunk_tokens, args.overlap)
+
+    print(f"{args.pages} pages, top_k={args.top_k}, prompt limit {PROMPT_TOKENS} tokens")
+    print(f"{'chunker':>24} {'pages/s':>10} {'chunks':>7} {'max tokens':>10} {'overflow':>11} {'peak MB':>8}")
+    for words in args.words:
+        measure(f"{words} words", lambda p, w=words: word_chunks(p, w), pages, tokenizer, args.top_k)
+    measure(f"{args.chunk_tokens} tokens, {args.overlap} overlap", lambda p: (c for c, _, _ in chunker.iter_chunks(p)),
+            pages, tokenizer, args.top_k)
+
+
+if __name__ == "__main__":
+    main()
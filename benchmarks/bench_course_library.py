@@ -0,0 +1,114 @@
+"""Course library at scale: index build, incremental updates vs a full rebuild, reload, query latency and memory.
+
+Synthetic documents are published to several classes through
+CourseLibrary, in a temporary database and index file. The default
+embedder hashes words into fixed random vectors, so the numbers measure
+the index and the database rather than the embedding model; pass
+--embedder minilm to use the real sentence-transformers model. Run from
+the repository root:
+
+    python -m benchmarks.bench_course_library --docs 10000
+    python -m benchmarks.bench_course_library --docs 10000 --encoding fp16 --queries 500
+"""
+import argparse
+import random
+import resource
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from modules.course_library import CourseLibrary
+from tests.helpers import HashEmbedder, make_document, page_chunks
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=10000)
+    parser.add_argument("--pages", type=int, default=4, help="pages (= chunks) per document")
+    parser.add_argument("--words", type=int, default=100, help="words per page")
+    parser.add_argument("--classes", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--encoding", choices=["flat", "fp16"], default="flat")
+    parser.add_argument("--embedder", choices=["hash", "minilm"], default="hash")
+    args = parser.parse_args()
+
+    if args.embedder == "minilm":
+        from sentence_transformers import SentenceTransformer
+        embedder = SentenceTransformer("all-MiniLM-L6-v2")
+    else:
+        embedder = HashEmbedder()
+    rng = random.Random(0)
+    classes = [f"class-{n}" for n in range(args.classes)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path, index_path = Path(tmp) / "library.db", Path(tmp) / "library.faiss"
+
+        def open_library():
+            return CourseLibrary(db_path, index_path, embedder=embedder, chunk_pages=page_chunks,
+                                 encoding=args.encoding)
+
+        rss_before = max_rss_mb()
+        library = open_library()
+        documents = []
+        start = time.perf_counter()
+        for n in range(args.docs):
+            pages = make_document(rng, args.pages, args.words)
+            document_id = library.add_pages(pages, f"Document {n}", classes[n % args.classes], save=False)
+            documents.append((document_id, classes[n % args.classes], pages))
+        build_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        library.save()
+        save_seconds = time.perf_counter() - start
+        print(f"{args.docs} documents, {len(library)} chunks, {args.classes} classes, {args.encoding} index")
+        print(f"build: {build_seconds:.1f}s ({args.docs / build_seconds:.0f} docs/s), save {save_seconds * 1000:.0f} ms, "
+              f"file {index_path.stat().st_size / 1e6:.1f} MB, index memory {library.nbytes() / 1e6:.1f} MB, "
+              f"max RSS +{max_rss_mb() - rss_before:.0f} MB")
+
+        # One more document added and one removed, each saved, vs re-embedding and re-adding every chunk
+        pages = make_document(rng, args.pages, args.words)
+        start = time.perf_counter()
+        new_id = library.add_pages(pages, "Late addition", classes[0])
+        add_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        library.remove_document(new_id)
+        remove_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        texts = [text for _, _, text in library.pool.query("SELECT id, class_id, text FROM library_chunks")]
+        rebuilt = library._new_index(library.index.d)
+        rebuilt.add_with_ids(library.embed(texts), np.arange(len(texts), dtype="int64"))
+        rebuild_ms = (time.perf_counter() - start) * 1000
+        print(f"incremental: add+save {add_ms:.0f} ms, remove+save {remove_ms:.0f} ms; "
+              f"full rebuild {rebuild_ms:.0f} ms (without saving)")
+
+        start = time.perf_counter()
+        reopened = open_library()
+        print(f"reload from disk: {(time.perf_counter() - start) * 1000:.0f} ms, {len(reopened)} chunks")
+
+        for label, filtered in (("whole library", False), ("one class", True)):
+            latencies, found = [], 0
+            for _ in range(args.queries):
+                document_id, class_name, pages = rng.choice(documents)
+                words = rng.choice(pages).split()
+                question = " ".join(words[i] for i in rng.sample(range(len(words)), 12))
+                start = time.perf_counter()
+                hits = reopened.search(question, k=3, class_name=class_name if filtered else None)
+                latencies.append((time.perf_counter() - start) * 1000)
+                found += bool(hits) and hits[0]["document_id"] == document_id
+            print(f"query ({label}): p50 {statistics.median(latencies):.2f} ms, p95 {percentile(latencies, 0.95):.2f} ms, "
+                  f"top-1 source document {found}/{args.queries}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Mixed read/write SQLite load from many threads: a connection per call vs. the per-thread pool.
+
+Worker threads share one database seeded with synthetic attempts. Each
+operation is either a dashboard-style read (one student's recent attempts
+plus their aggregates) or a quiz submission (insert an attempt and update
+its aggregates in one transaction). "connect" opens and closes a connection
+per operation, as the stores did before db.ConnectionPool; "pool" reuses
+each thread's connection and its prepared statements. Run from the
+repository root:
+
+    python -m benchmarks.bench_db_concurrency --threads 16 --seconds 5 --write-ratio 0.1
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing
+
+from analytics_aggregates import apply_attempts, db_timestamp
+from benchmarks.bench_analytics_aggregates import populate
+from config import Config
+from database import get_pool
+from score_store import ScoreStore
+
+READ_ATTEMPTS = ("SELECT subject, topic, score, total, timestamp FROM quiz_results "
+                 "WHERE user_id = ? ORDER BY timestamp DESC LIMIT 20")
+READ_AGGREGATES = "SELECT subject, attempts, score_sum, total_sum FROM student_aggregates WHERE user_id = ?"
+INSERT_ATTEMPT = ("INSERT INTO quiz_results (user_id, subject, topic, difficulty, score, total, timestamp) "
+                  "VALUES (:user_id, :subject, :topic, :difficulty, :score, :total, :timestamp)")
+
+
+def read(conn, user_id):
+    conn.execute(READ_ATTEMPTS, (user_id,)).fetchall()
+    conn.execute(READ_AGGREGATES, (user_id,)).fetchall()
+
+
+def write(conn, user_id):
+    attempt = {"user_id": user_id, "subject": "Math", "topic": "Algebra", "difficulty": "easy",
+               "score": 2, "total": 3, "timestamp": db_timestamp()}
+    with conn:
+        conn.execute(INSERT_ATTEMPT, attempt)
+        apply_attempts(conn, [attempt])
+
+
+def worker(mode, db_path, pool, students, write_ratio, deadline, seed, results):
+    rng = random.Random(seed)
+    reads, writes, errors = [], [], 0
+    while time.perf_counter() < deadline:
+        user_id = f"student{rng.randrange(students)}"
+        op = write if rng.random() < write_ratio else read
+        start = time.perf_counter()
+        try:
+            if mode == "pool":
+                op(pool.connection(), user_id)
+            else:
+                # What the stores did before: open, configure, use and close a connection per call
+                with closing(sqlite3.connect(db_path, timeout=Config.DB_BUSY_TIMEOUT_MS / 1000)) as conn:
+                    conn.execute("PRAGMA synchronous=NORMAL")
+                    op(conn, user_id)
+        except sqlite3.OperationalError:
+            errors += 1
+            continue
+        (writes if op is write else reads).append(time.perf_counter() - start)
+    results.append((reads, writes, errors))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] * 1000 if values else float("nan")
+
+
+def run(mode, db_path, threads, seconds, students, write_ratio):
+    pool = get_pool(db_path)
+    results = []
+    deadline = time.perf_counter() + seconds
+    workers = [threading.Thread(target=worker, args=(mode, db_path, pool, students, write_ratio, deadline, n, results))
+               for n in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    reads = [v for r, _, _ in results for v in r]
+    writes = [v for _, w, _ in results for v in w]
+    errors = sum(e for _, _, e in results)
+    return (len(reads) + len(writes)) / seconds, reads, writes, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--attempts", type=int, default=200_000)
+    parser.add_argument("--students", type=int, default=2000)
+    args = parser.parse_args()
+
+    Config.LEGACY_SCORE_FILES = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        populate(ScoreStore(db_path), args.attempts, args.students)
+        print(f"{args.threads} threads, {args.write_ratio:.0%} writes, {args.seconds:.0f}s per mode, "
+              f"{args.attempts} seeded attempts")
+        print(f"{'mode':>8} {'ops/s':>9} {'read p50':>9} {'read p99':>9} {'write p50':>10} {'write p99':>10} {'errors':>7}")
+        for mode in ("connect", "pool"):
+            throughput, reads, writes, errors = run(mode, db_path, args.threads, args.seconds,
+                                                    args.students, args.write_ratio)
+            print(f"{mode:>8} {throughput:>9.0f} {percentile(reads, 0.5):>8.2f}ms {percentile(reads, 0.99):>8.2f}ms "
+                  f"{percentile(writes, 0.5):>9.2f}ms {percentile(writes, 0.99):>9.2f}ms {errors:>7}")
+        print(f"pool connections opened: {get_pool(db_path).opened}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Latency, throughput, resident memory and fp32 parity for each CPU inference backend.
+
+Every backend runs in its own subprocess so peak RSS is not polluted by
+the others. Answers from each backend are compared with the fp32 torch
+answers; the script exits non-zero when parity drops below --min-parity,
+so it can be used as a deployment gate. Run from the repository root:
+
+    python -m benchmarks.bench_inference_backends --backends torch int8 onnx
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from tests.helpers import CONTEXT, PARITY_SET, QUESTIONS, pipeline_answers
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def run_worker(backend, iterations, batch_size):
+    from modules.inference_backends import load_t5, load_qa, resolve_backend
+    from modules.pdf_qa import generate_answers
+
+    start = time.perf_counter()
+    tokenizer, model = load_t5(backend)
+    qa_pipeline = load_qa(backend)
+    load_seconds = time.perf_counter() - start
+
+    prompts = [f"question: {q} context: {c}" for q, c in PARITY_SET]
+    report = {"backend": resolve_backend(backend), "load_s": load_seconds}
+    report["t5_answers"] = generate_answers(tokenizer, model, prompts)
+    report["qa_answers"] = [{"answer": r["answer"], "score": float(r["score"])}
+                            for r in pipeline_answers(qa_pipeline, PARITY_SET)]
+
+    for name, run in (
+        ("t5", lambda batch: generate_answers(tokenizer, model,
+                                             [f"question: {q} context: {CONTEXT}" for q in batch])),
+        ("qa", lambda batch: pipeline_answers(qa_pipeline, [(q, CONTEXT) for q in batch])),
+    ):
+        batch = [QUESTIONS[i % len(QUESTIONS)] for i in range(batch_size)]
+        run(batch)  # warm-up
+        latencies = []
+        for _ in range(iterations):
+            t = time.perf_counter()
+            run(batch)
+            latencies.append(time.perf_counter() - t)
+        report[f"{name}_p50_ms"] = percentile(latencies, 0.5) * 1000
+        report[f"{name}_p95_ms"] = percentile(latencies, 0.95) * 1000
+        report[f"{name}_answers_per_s"] = batch_size * iterations / sum(latencies)
+
+    # ru_maxrss is KiB on Linux
+    report["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps(report))
+
+
+def parity(reference, report):
+    t5_match = sum(a == b for a, b in zip(reference["t5_answers"], report["t5_answers"])) / len(PARITY_SET)
+    qa_match = sum(a["answer"] == b["answer"]
+                   for a, b in zip(reference["qa_answers"], report["qa_answers"])) / len(PARITY_SET)
+    score_drift = max(abs(a["score"] - b["score"])
+                      for a, b in zip(reference["qa_answers"], report["qa_answers"]))
+    return t5_match, qa_match, score_drift
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=["torch", "int8", "onnx"])
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--min-parity", type=float, default=0.75,
+                        help="minimum fraction of answers identical to fp32 torch")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.iterations, args.batch_size)
+        return
+
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    reports = {}
+    for backend in backends:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_inference_backends", "--worker", backend,
+             "--iterations", str(args.iterations), "--batch-size", str(args.batch_size)],
+            capture_output=True, text=True, check=True,
+        )
+        reports[backend] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    print(f"{'backend':>8} {'load s':>7} {'t5 p50':>8} {'t5 p95':>8} {'t5 ans/s':>9} "
+          f"{'qa p50':>8} {'qa p95':>8} {'qa ans/s':>9} {'RSS MB':>8} {'t5 eq':>6} {'qa eq':>6} {'dScore':>7}")
+    failed = False
+    for backend, r in reports.items():
+        t5_match, qa_match, drift = parity(reports["torch"], r)
+        failed |= min(t5_match, qa_match) < args.min_parity
+        label = backend if r["backend"] == backend else f"{backend}*"
+        print(f"{label:>8} {r['load_s']:>7.1f} {r['t5_p50_ms']:>8.1f} {r['t5_p95_ms']:>8.1f} "
+              f"{r['t5_answers_per_s']:>9.1f} {r['qa_p50_ms']:>8.1f} {r['qa_p95_ms']:>8.1f} "
+              f"{r['qa_answers_per_s']:>9.1f} {r['peak_rss_mb']:>8.0f} {t5_match:>6.0%} "
+              f"{qa_match:>6.0%} {drift:>7.3f}")
+
+    if any(r["backend"] != backend for backend, r in reports.items()):
+        print("* backend unavailable here, fell back to torch")
+    if failed:
+        print(f"Parity below {args.min_parity:.0%} of fp32 answers")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Concurrent load generator for the shared micro-batching inference service.
+
+Each client thread plays one student sending questions back to back.
+Every model is measured unbatched (max batch size 1, i.e. one call per
+request as before) and micro-batched, reporting answers/sec and latency
+percentiles. Run from the repository root:
+
+    python -m benchmarks.bench_inference_load --model fake --clients 32
+    python -m benchmarks.bench_inference_load --model t5 --clients 16 --requests 4
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from modules.inference_server import MicroBatcher
+from tests.helpers import CONTEXT, QUESTIONS
+
+
+def fake_model(fixed_ms, per_item_ms):
+    """Stand-in with a fixed per-call overhead plus a small per-item cost, like a padded forward pass"""
+    def run_batch(items):
+        time.sleep((fixed_ms + per_item_ms * len(items)) / 1000.0)
+        return [f"answer to {item}" for item in items]
+    return run_batch, lambda i: QUESTIONS[i % len(QUESTIONS)]
+
+
+def t5_model():
+    from modules.pdf_qa import load_model, generate_answers
+    tokenizer, model = load_model()
+    return (lambda prompts: generate_answers(tokenizer, model, prompts),
+            lambda i: f"question: {QUESTIONS[i % len(QUESTIONS)]} context: {CONTEXT}")
+
+
+def qa_model():
+    """(question, window) pairs as Ask AI queues them; CONTEXT fits in one window, so one pair per question"""
+    from modules.ask_ai import load_qa_pipeline
+    from modules.qa_context import QAContext, forward_pairs
+    qa_pipeline = load_qa_pipeline()
+    context = QAContext(CONTEXT, qa_pipeline.tokenizer)
+    sequences = [(ids, window_at) for question in QUESTIONS
+                 for _, _, ids, window_at in context._pairs({question: question})]
+    return (lambda items: forward_pairs(qa_pipeline.model, qa_pipeline.tokenizer, items),
+            lambda i: sequences[i % len(sequences)])
+
+
+def run_load(batcher, make_request, clients, requests_per_client):
+    latencies = []
+    lock = threading.Lock()
+
+    def client(client_id):
+        for n in range(requests_per_client):
+            start = time.perf_counter()
+            batcher(make_request(client_id * requests_per_client + n))
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+    return len(latencies) / elapsed, statistics.median(latencies), p95
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", choices=["fake", "t5", "qa"], default="fake")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=8, help="requests per client")
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=int, default=15)
+    parser.add_argument("--fake-fixed-ms", type=float, default=40.0)
+    parser.add_argument("--fake-per-item-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    if args.model == "fake":
+        run_batch, make_request = fake_model(args.fake_fixed_ms, args.fake_per_item_ms)
+    elif args.model == "t5":
+        run_batch, make_request = t5_model()
+    else:
+        run_batch, make_request = qa_model()
+
+    print(f"model={args.model} clients={args.clients} requests/client={args.requests}")
+    print(f"{'mode':>22} {'answers/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'mean batch':>11}")
+    for label, batch_size, wait_ms in (("unbatched", 1, 0),
+                                       (f"batch<={args.max_batch_size}, {args.max_wait_ms}ms",
+                                        args.max_batch_size, args.max_wait_ms)):
+        batcher = MicroBatcher(run_batch, max_batch_size=batch_size, max_wait_ms=wait_ms)
+        throughput, p50, p95 = run_load(batcher, make_request, args.clients, args.requests)
+        print(f"{label:>22} {throughput:>10.1f} {p50 * 1000:>8.1f} {p95 * 1000:>8.1f} "
+              f"{batcher.mean_batch_size:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Drive the LLM gateway against the local stub with injected latency and failures.
+
+Reports success rate, time to first token vs. time to full answer, how
+many failures were retried, and how often the circuit breaker tripped.
+Run from the repository root:
+
+    python -m benchmarks.bench_llm_gateway --requests 200 --error-rate 0.2 --hang-rate 0.02
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+from benchmarks.llm_stub_server import StubLLMServer
+from llm_gateway import HTTPStubBackend, LLMError, LLMGateway
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else float("nan")
+
+
+async def one_request(gateway, n, users, ttft, totals, outcomes):
+    start = time.perf_counter()
+    first = None
+    try:
+        async for _ in gateway.stream(f"question {n} about photosynthesis", user_id=f"student{n % users}"):
+            if first is None:
+                first = time.perf_counter() - start
+        ttft.append(first)
+        totals.append(time.perf_counter() - start)
+        outcomes["ok"] += 1
+    except LLMError as e:
+        outcomes[type(e).__name__] += 1
+
+
+async def run(args):
+    stub = StubLLMServer(args.first_token_ms, args.token_ms, args.error_rate, args.hang_rate, seed=1)
+    port = await stub.start()
+    gateway = LLMGateway(HTTPStubBackend(f"http://127.0.0.1:{port}"), max_concurrency=args.concurrency,
+                         user_calls_per_minute=args.user_rate, timeout=args.timeout,
+                         first_token_timeout=args.first_token_timeout)
+
+    ttft, totals, outcomes = [], [], Counter()
+    start = time.perf_counter()
+    await asyncio.gather(*(one_request(gateway, n, args.users, ttft, totals, outcomes)
+                           for n in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    await stub.stop()
+
+    print(f"{args.requests} requests in {elapsed:.1f}s, upstream calls={stub.requests}, "
+          f"retries={gateway.retries}, breaker trips={gateway.breaker.trips}")
+    print("outcomes:", dict(outcomes))
+    print(f"time to first token  p50={percentile(ttft, 0.5) * 1000:.0f}ms  p95={percentile(ttft, 0.95) * 1000:.0f}ms")
+    print(f"time to full answer  p50={percentile(totals, 0.5) * 1000:.0f}ms  p95={percentile(totals, 0.95) * 1000:.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--user-rate", type=int, default=20, help="calls per user per minute")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--first-token-timeout", type=float, default=2.0)
+    parser.add_argument("--first-token-ms", type=float, default=200.0)
+    parser.add_argument("--token-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--hang-rate", type=float, default=0.02)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
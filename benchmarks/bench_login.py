@@ -0,0 +1,107 @@
+"""Login latency at 100k accounts: plaintext full-table scan vs. indexed lookup plus bcrypt, under concurrency.
+
+Seeds two throwaway databases with the same accounts: the old users table
+(no index, plaintext, SELECT * ... AND password = ?) and the current one
+(unique index, bcrypt at the tuned cost). All accounts share one
+precomputed hash, because hashing 100k passwords would only time the
+setup. Concurrent threads then log in as random users. Lookup shows the
+database part alone; the new login total is dominated by bcrypt on
+purpose. Run from the repository root:
+
+    python -m benchmarks.bench_login --users 100000 --threads 8 --logins 200
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing
+
+from credentials import CredentialStore, LoginThrottle, get_rounds, hash_password
+from database import get_pool
+
+PASSWORD = "correct horse battery staple"
+
+
+def seed_old(db_path, users):
+    with closing(sqlite3.connect(db_path)) as conn:
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, password TEXT, "
+                     "email TEXT, role TEXT)")
+        conn.executemany("INSERT INTO users (username, password, email, role) VALUES (?, ?, ?, 'student')",
+                         ((f"user{n}", PASSWORD, f"user{n}@example.com") for n in range(users)))
+        conn.commit()
+
+
+def seed_new(pool, users):
+    hashed = hash_password(PASSWORD)
+    with pool.transaction() as conn:
+        conn.executemany("INSERT INTO users (username, password, email, role) VALUES (?, ?, ?, 'student')",
+                         ((f"user{n}", hashed, f"user{n}@example.com") for n in range(users)))
+
+
+def concurrent(login, users, threads, logins):
+    latencies, lock = [], threading.Lock()
+
+    def worker(seed, count):
+        rng = random.Random(seed)
+        for _ in range(count):
+            username = f"user{rng.randrange(users)}"
+            start = time.perf_counter()
+            assert login(username), username
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=worker, args=(n, logins // threads)) for n in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return (latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.95)] * 1000,
+            len(latencies) / elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--logins", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old_path = os.path.join(tmp, "old.db")
+        seed_old(old_path, args.users)
+        local = threading.local()
+
+        def old_lookup(username):
+            if not hasattr(local, "conn"):
+                local.conn = sqlite3.connect(old_path)
+            return local.conn.execute("SELECT * FROM users WHERE username = ? AND password = ?",
+                                      (username, PASSWORD)).fetchone()
+
+        pool = get_pool(os.path.join(tmp, "new.db"))
+        seed_new(pool, args.users)
+        store = CredentialStore(pool, throttle=LoginThrottle(max_failures=10**9))
+
+        def new_lookup(username):
+            return pool.execute("SELECT id, username, email, role, password FROM users WHERE username = ?",
+                                (username,)).fetchone()
+
+        print(f"{args.users} users, {args.threads} threads, {args.logins} logins each row, "
+              f"bcrypt cost {get_rounds()} ({os.cpu_count()} CPUs)")
+        print(f"{'':>24} {'p50 ms':>8} {'p95 ms':>8} {'logins/s':>9}")
+        for label, login, logins in [
+            ("old lookup (scan)", old_lookup, args.logins),
+            ("new lookup (index)", new_lookup, args.logins * 10),
+            ("new login (bcrypt)", lambda u: store.authenticate(u, PASSWORD), args.logins),
+        ]:
+            p50, p95, rate = concurrent(login, args.users, args.threads, logins)
+            print(f"{label:>24} {p50:>8.2f} {p95:>8.2f} {rate:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Google-style login round trips: provider metadata fetched per login vs. cached, against the local stub IdP.
+
+"uncached" builds a fresh provider per login, which is what rebuilding the
+Flow and calling verify_oauth2_token did: discovery, JWKS and the token
+exchange every time. "cached" reuses one OIDCProvider, so a warm login is
+the token exchange alone. The browser hop to /authorize is made directly
+and not timed. Session validation is the per-rerun check afterwards. Run
+from the repository root:
+
+    python -m benchmarks.bench_oauth --logins 20 --latency-ms 80
+"""
+import argparse
+import http.client
+import time
+import urllib.parse
+
+from benchmarks.oidc_stub_server import StubIdentityProvider
+from oauth import OIDCProvider, SessionSigner
+
+
+def authorize(provider):
+    """Follow the authorization URL like a browser would and return the code and state"""
+    url = urllib.parse.urlparse(provider.authorization_url())
+    conn = http.client.HTTPConnection(url.netloc)
+    conn.request("GET", f"{url.path}?{url.query}")
+    location = conn.getresponse().getheader("Location")
+    conn.close()
+    query = dict(urllib.parse.parse_qsl(urllib.parse.urlparse(location).query))
+    return query["code"], query["state"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="added to every IdP response")
+    args = parser.parse_args()
+
+    idp = StubIdentityProvider()
+    discovery_url = idp.start()
+    signer = SessionSigner("benchmark-secret")
+
+    def make_provider():
+        return OIDCProvider(discovery_url=discovery_url, client_id=idp.client_id, client_secret="secret",
+                            redirect_uri="http://localhost:8501", signer=signer)
+
+    shared = make_provider()
+    print(f"{args.logins} logins, {args.latency_ms:.0f} ms IdP latency")
+    print(f"{'mode':>9} {'login ms':>9} {'IdP requests/login':>19}")
+    for mode in ("uncached", "cached"):
+        provider = shared if mode == "cached" else None
+        if provider is not None:
+            provider.metadata()  # Warm, as after the first login of the process
+        idp.latency_ms = 0
+        pending = [authorize(provider or make_provider()) for _ in range(args.logins)]
+        idp.latency_ms = args.latency_ms
+        before = sum(idp.requests.values()) - idp.requests["/authorize"]
+        elapsed = 0.0
+        for code, state in pending:
+            start = time.perf_counter()
+            (provider or make_provider()).complete_login(code, state)
+            elapsed += time.perf_counter() - start
+        requests = sum(idp.requests.values()) - idp.requests["/authorize"] - before
+        print(f"{mode:>9} {elapsed / args.logins * 1000:>9.1f} {requests / args.logins:>19.1f}")
+
+    token = signer.sign({"username": "student", "role": "student"})
+    start = time.perf_counter()
+    for _ in range(10000):
+        signer.verify(token)
+    print(f"session token check: {(time.perf_counter() - start) / 10000 * 1e6:.1f} us, no network")
+    idp.stop()
+
+
+if __name__ == "__main__":
+    main()
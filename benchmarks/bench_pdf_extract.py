@@ -0,0 +1,78 @@
+"""Serial vs. page-parallel PDF text extraction on synthetic textbooks.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pdf_extract --pages 200 500 --workers 4
+"""
+import argparse
+import random
+import time
+
+from modules.pdf_extract import iter_pages
+
+WORDS = ("energy cell matrix vector theorem equation molecule empire treaty grammar "
+         "clause photosynthesis gravity velocity derivative integral revolution").split()
+
+
+def make_synthetic_pdf(num_pages, lines_per_page=45, seed=0):
+    """Build a minimal multi-page PDF with plain Helvetica text, no external libraries"""
+    rng = random.Random(seed)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Pages tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_refs = []
+    for page_number in range(num_pages):
+        lines = [f"Page {page_number + 1}"]
+        lines += [" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(lines_per_page)]
+        body = "BT /F1 10 Tf 14 TL 50 760 Td " + " ".join(f"({line}) '" for line in lines) + " ET"
+        stream = body.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_ref = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref)
+        page_refs.append(len(objects))
+
+    kids = " ".join(f"{ref} 0 R" for ref in page_refs).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, num_pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, obj)
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return bytes(out)
+
+
+def measure(data, workers):
+    start = time.perf_counter()
+    first_page_at = None
+    pages = 0
+    for _ in iter_pages(data, workers=workers, max_pages=0, max_total_chars=0):
+        if first_page_at is None:
+            first_page_at = time.perf_counter() - start
+        pages += 1
+    return pages, time.perf_counter() - start, first_page_at or 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[200, 500])
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'pages':>6} {'mode':>10} {'seconds':>9} {'pages/sec':>10} {'first page':>11}")
+    for num_pages in args.pages:
+        data = make_synthetic_pdf(num_pages)
+        for label, workers in (("serial", 1), (f"{args.workers} procs", args.workers)):
+            pages, seconds, first = measure(data, workers)
+            print(f"{pages:>6} {label:>10} {seconds:>9.2f} {pages / seconds:>10.1f} {first:>10.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Question bank at scale: compile time and per-quiz sampling latency with and without seen-sets.
+
+Builds a synthetic flat-list bank (default 200k questions), then samples
+quizzes for one student as their seen-set fills up, uniform and weighted.
+The baseline is the old approach: random.sample over the raw list, with a
+list comprehension to drop seen questions. Run from the repository root:
+
+    python -m benchmarks.bench_question_bank --questions 200000 --k 10
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from question_bank import QuestionBank, SeenSets
+
+SUBJECTS = {"math": ["algebra", "geometry"], "science": ["physics", "biology"], "history": ["world history"]}
+DIFFICULTIES = ["easy", "medium", "hard"]
+TAGS = ["exam", "review", "challenge", "warmup"]
+
+
+def synthetic_bank(count, seed=0):
+    rng = random.Random(seed)
+    subjects = list(SUBJECTS)
+    questions = []
+    for n in range(count):
+        subject = rng.choice(subjects)
+        questions.append({
+            "question": f"Synthetic question {n}?", "options": ["a", "b", "c", "d"],
+            "correct_option": rng.randint(1, 4), "subject": subject, "topic": rng.choice(SUBJECTS[subject]),
+            "difficulty": rng.choice(DIFFICULTIES), "tags": rng.sample(TAGS, 2), "weight": rng.uniform(0.5, 2.0),
+        })
+    return questions
+
+
+def old_sample(raw, seen_texts, k):
+    pool = [q for q in raw if q["question"] not in seen_texts]
+    return random.sample(pool, min(k, len(pool)))
+
+
+def per_call_us(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=200_000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bank.json")
+        with open(path, "w") as f:
+            json.dump(synthetic_bank(args.questions), f)
+        start = time.perf_counter()
+        bank = QuestionBank.from_json(path)
+        print(f"compiled {len(bank)} questions in {time.perf_counter() - start:.2f}s")
+
+    key = ("math", "algebra", "easy")
+    pool = bank.candidates(*key)
+    raw = [bank.question(i) for i in pool]
+    print(f"pool {key}: {len(pool)} questions; seen-set is {SeenSets(len(bank)).words * 8} bytes per user")
+    print(f"{'seen':>6} {'old us':>10} {'uniform us':>11} {'weighted us':>12} {'tagged us':>10}")
+
+    seen_sets = SeenSets(len(bank))
+    rng = random.Random(1)
+    for fraction in (0.0, 0.5, 0.9, 0.99):
+        user = f"student-{fraction}"
+        seen_ids = rng.sample(list(pool), int(len(pool) * fraction))
+        seen_sets.add(user, seen_ids)
+        bits = seen_sets.get(user)
+        seen_texts = {bank.text(i) for i in seen_ids}
+
+        old = per_call_us(lambda: old_sample(raw, seen_texts, args.k), max(1, args.calls // 20))
+        uniform = per_call_us(lambda: bank.sample(*key, args.k, seen=bits), args.calls)
+        weighted = per_call_us(lambda: bank.sample(*key, args.k, seen=bits, weighted=True), args.calls)
+        tagged = per_call_us(lambda: bank.sample(*key, args.k, seen=bits, tags=["exam"]), args.calls)
+        picked = bank.sample(*key, args.k, seen=bits)
+        assert len(set(picked)) == len(picked), "sample repeated a question"
+        print(f"{fraction:>6.0%} {old:>10.0f} {uniform:>11.0f} {weighted:>12.0f} {tagged:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
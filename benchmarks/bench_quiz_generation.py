@@ -0,0 +1,66 @@
+"""Time to start a quiz on generated topics: generating on demand vs. a pre-generated pool.
+
+Uses StubQuestionGenerator with a fixed latency standing in for the LLM
+round trip. "cold" asks for topics nobody has requested yet, so the student
+waits on generation; "warm" asks again after QuestionPregenerator.top_up()
+has filled every pool. Run from the repository root:
+
+    python -m benchmarks.bench_quiz_generation --topics 20 --latency 1.5
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from attempt_recorder import AttemptRecorder
+from quiz import QuizEngine
+from quiz_generator import StubQuestionGenerator
+
+
+def time_quizzes(engine, topics, user_id):
+    times = []
+    for topic in topics:
+        start = time.perf_counter()
+        questions = engine.get_questions("general", topic, "medium", 3, user_id=user_id)
+        times.append(time.perf_counter() - start)
+        assert len(questions) == 3, topic
+    times.sort()
+    return times[len(times) // 2], times[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--topics", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=1.5, help="seconds per generation call")
+    parser.add_argument("--min-pool", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "questions.json")
+        with open(json_path, "w") as f:
+            json.dump([], f)
+        generator = StubQuestionGenerator(latency=args.latency)
+        engine = QuizEngine(json_path, recorder=AttemptRecorder(os.path.join(tmp, "bench.db")),
+                            generator=generator)
+        engine.pregenerator.min_pool = args.min_pool
+        engine.pregenerator.budget.max_calls = 10 ** 6  # measure generation, not the worker's LLM budget
+        topics = [f"topic {i}" for i in range(args.topics)]
+
+        cold = time_quizzes(engine, topics, "student-1")
+        start = time.perf_counter()
+        added = engine.pregenerator.top_up()
+        fill_seconds = time.perf_counter() - start
+        calls = generator.calls
+        warm = time_quizzes(engine, topics, "student-2")
+
+        print(f"{args.topics} topics, {args.latency:.1f}s per generation call, min pool {args.min_pool}")
+        print(f"{'':>6} {'median ms':>10} {'max ms':>10}")
+        print(f"{'cold':>6} {cold[0] * 1000:>10.1f} {cold[1] * 1000:>10.1f}")
+        print(f"{'warm':>6} {warm[0] * 1000:>10.1f} {warm[1] * 1000:>10.1f}")
+        print(f"background top-up: {added} questions in {fill_seconds:.1f}s; "
+              f"{generator.calls - calls} generation calls while serving warm quizzes")
+
+
+if __name__ == "__main__":
+    main()
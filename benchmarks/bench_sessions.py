@@ -0,0 +1,84 @@
+"""Session resume cost and memory: in-memory hit vs. SQLite reload vs. logging in again.
+
+Creates many sessions shaped like a student mid-quiz (user identity,
+session token and a three-question current_quiz), then times reconnects
+for sessions still in the LRU and for sessions evicted to SQLite. Both are
+compared with a full re-login, which is one bcrypt check at the tuned
+cost. Memory per idle session is measured with tracemalloc and with
+SessionStore.memory_bytes(). Run from the repository root:
+
+    python -m benchmarks.bench_sessions --sessions 50000 --capacity 40000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from credentials import hash_password, verify_password
+from oauth import SessionSigner
+from session_store import SessionStore
+
+
+def session_data(n, signer):
+    user = {"username": f"student{n}", "email": f"student{n}@example.com", "role": "student"}
+    questions = [{"id": n * 3 + i, "question": f"Question {i} for student {n}: what is {i} + {n % 10}?",
+                  "options": [str(i + n % 10 + d) for d in range(4)], "correct_option": 1,
+                  "subject": "math", "topic": "algebra", "difficulty": "easy"} for i in range(3)]
+    return {"user": user, "session_token": signer.sign(user), "current_quiz": {
+        "questions": questions, "length": 3, "adaptive": False, "user_answers": [1, 0, 0],
+        "current_question": 1, "subject": "Math", "topic": "Algebra", "difficulty": "easy",
+        "started_at": time.time(), "question_shown_at": time.time(), "answer_ms": [4200, None, None]}}
+
+
+def timed(fn, items):
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=50_000)
+    parser.add_argument("--capacity", type=int, default=40_000)
+    parser.add_argument("--samples", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        signer = SessionSigner("benchmark-secret")
+        store = SessionStore(os.path.join(tmp, "bench.db"), capacity=args.capacity, signer=signer)
+        data = [session_data(n, signer) for n in range(args.sessions)]
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        sids = [store.create(d) for d in data]
+        create_us = (time.perf_counter() - start) / args.sessions * 1e6
+        traced = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+
+        rng = random.Random(0)
+        evicted = sids[:args.sessions - args.capacity]
+        resident = sids[args.sessions - args.capacity:]
+        cookies = [store.cookie_for(sid) for sid in rng.sample(resident, args.samples)]
+        hit_us = timed(lambda c: store.load(store.sid_from_cookie(c)), cookies)
+        miss_us = timed(store.load, rng.sample(evicted, min(args.samples, len(evicted)))) if evicted else float("nan")
+        unchanged_us = timed(lambda sid: store.save(sid, store.load(sid)), rng.sample(resident, args.samples))
+
+        hashed = hash_password("password")
+        relogin_us = timed(lambda _: verify_password("password", hashed), range(5))
+
+        print(f"{args.sessions} sessions, LRU capacity {args.capacity}")
+        print(f"create: {create_us:.0f} us/session (one SQLite write each)")
+        print(f"memory per idle session: {traced / len(store):.0f} B traced, "
+              f"{store.memory_bytes() / len(store):.0f} B by memory_bytes()")
+        print(f"{'resume path':>28} {'us':>10}")
+        print(f"{'cookie check + LRU hit':>28} {hit_us:>10.1f}")
+        print(f"{'evicted, SQLite reload':>28} {miss_us:>10.1f}")
+        print(f"{'unchanged save (no write)':>28} {unchanged_us:>10.1f}")
+        print(f"{'full re-login (bcrypt)':>28} {relogin_us:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
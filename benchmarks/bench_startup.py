@@ -0,0 +1,75 @@
+"""Cold-start cost: import time per module and time to first render of the landing page.
+
+Each measurement runs in a fresh interpreter so nothing is already
+imported. Time to first render uses Streamlit's AppTest harness and is
+skipped if it is unavailable. Run from the repository root:
+
+    python -m benchmarks.bench_startup
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+MODULES = [
+    "config",
+    "database",
+    "static_assets",
+    "score_store",
+    "analytics",
+    "quiz",
+    "auth",
+    "llm_client",
+    "modules.pdf_qa",
+    "modules.ask_ai",
+    "app",
+]
+
+FIRST_RENDER = """
+import time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file("app.py", default_timeout=600).run()
+print(time.perf_counter() - start)
+"""
+
+
+def import_time(module):
+    """Cumulative import time in ms reported by -X importtime for one module"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, env=dict(os.environ))
+    if result.returncode != 0:
+        return None
+    for line in reversed(result.stderr.splitlines()):
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000
+    return None
+
+
+def first_render():
+    result = subprocess.run([sys.executable, "-c", FIRST_RENDER], capture_output=True, text=True)
+    return float(result.stdout.strip().splitlines()[-1]) if result.returncode == 0 else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="best of N fresh interpreters")
+    args = parser.parse_args()
+
+    print(f"{'module':>16} {'import ms':>10}")
+    for module in MODULES:
+        times = [t for t in (import_time(module) for _ in range(args.repeat)) if t is not None]
+        print(f"{module:>16} {min(times):>10.0f}" if times else f"{module:>16} {'failed':>10}")
+
+    start = time.perf_counter()
+    seconds = first_render()
+    if seconds is None:
+        print("time to first render: unavailable (streamlit.testing could not run app.py)")
+    else:
+        print(f"time to first render: {seconds:.2f}s (subprocess total {time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
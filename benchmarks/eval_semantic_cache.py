@@ -0,0 +1,140 @@
+"""Offline evaluation of the semantic answer cache: false hits vs paraphrase hits per similarity threshold.
+
+The labelled set groups phrasings of the same question per document;
+phrasings in one group are paraphrases, and different groups on the same
+document are not, including near misses such as "When did World War I
+start?" vs "...end?". For each threshold it reports the share of
+paraphrase pairs that would hit and the share of non-paraphrase pairs that
+would wrongly hit. It then replays a stream of student questions through
+SemanticCache and reports hit rate, false hits and model time saved. The
+replay stores answers without evidence, so it measures the threshold
+alone; in the app the evidence check can only turn some of these hits
+into misses.
+Run from the repository root:
+
+    python -m benchmarks.eval_semantic_cache
+    python -m benchmarks.eval_semantic_cache --pairs my_pairs.jsonl --thresholds 0.85 0.9 0.95
+
+A --pairs file holds one {"document": ..., "a": ..., "b": ..., "paraphrase": true|false} object per line.
+"""
+import argparse
+import itertools
+import json
+import random
+
+import numpy as np
+
+from config import Config
+from modules.semantic_cache import SemanticCache
+
+GROUPS = {
+    "cell-biology": [
+        ["What produces ATP in the cell?", "Which organelle makes ATP?", "Where is ATP produced in cells?",
+         "what makes atp in a cell"],
+        ["What do chloroplasts do?", "What is the function of chloroplasts?", "Explain the role of chloroplasts."],
+        ["Where does cellular respiration take place?", "In which part of the cell does respiration happen?",
+         "Location of cellular respiration?"],
+        ["What does the cell membrane do?", "What is the function of the cell membrane?",
+         "Role of the plasma membrane?"],
+        ["What does the nucleus contain?", "What is stored in the nucleus?", "What's inside the cell nucleus?"],
+    ],
+    "world-war-1": [
+        ["When did World War I start?", "In what year did the First World War begin?", "When did WW1 begin?"],
+        ["When did World War I end?", "In what year did the First World War end?", "When was WW1 over?"],
+        ["What triggered World War I?", "What caused the outbreak of the First World War?", "Why did WW1 start?"],
+        ["Which countries formed the Triple Entente?", "Who was in the Triple Entente?",
+         "Members of the Triple Entente?"],
+        ["Which countries formed the Triple Alliance?", "Who belonged to the Triple Alliance?",
+         "Members of the Triple Alliance?"],
+    ],
+    "algebra": [
+        ["What is the quadratic formula?", "State the quadratic formula.",
+         "Give me the formula for solving quadratics."],
+        ["How do you find the slope of a line?", "How is the slope of a line calculated?",
+         "Formula for the gradient of a line?"],
+        ["What is the y-intercept?", "Define the y-intercept of a line.", "What does y-intercept mean?"],
+        ["How do you factor x^2 - 9?", "Factorise x squared minus nine.", "What are the factors of x^2 - 9?"],
+        ["How do you factor x^2 + 6x + 9?", "Factorise x squared plus six x plus nine.",
+         "What are the factors of x^2 + 6x + 9?"],
+    ],
+}
+
+
+def labelled_pairs():
+    """(document, a, b, is_paraphrase) for every pair of phrasings on the same document"""
+    pairs = []
+    for document, groups in GROUPS.items():
+        phrasings = [(group_id, text) for group_id, group in enumerate(groups) for text in group]
+        for (group_a, a), (group_b, b) in itertools.combinations(phrasings, 2):
+            pairs.append((document, a, b, group_a == group_b))
+    return pairs
+
+
+def load_pairs(path):
+    with open(path, encoding="utf-8") as f:
+        return [(p["document"], p["a"], p["b"], bool(p["paraphrase"])) for p in map(json.loads, f) if p]
+
+
+def make_embed(name):
+    if name == "hash":
+        from tests.helpers import HashEmbedder
+        embedder = HashEmbedder()
+    else:
+        from sentence_transformers import SentenceTransformer
+        embedder = SentenceTransformer("all-MiniLM-L6-v2")
+    return lambda texts: np.asarray(embedder.encode(texts, convert_to_numpy=True, normalize_embeddings=True),
+                                    dtype="float32")
+
+
+def sweep(cache, pairs, thresholds):
+    texts = sorted({text for _, a, b, _ in pairs for text in (a, b)})
+    vectors = dict(zip(texts, cache.vectors(texts)))
+    similarities = np.array([float(vectors[a] @ vectors[b]) for _, a, b, _ in pairs])
+    labels = np.array([paraphrase for _, _, _, paraphrase in pairs])
+    print(f"{labels.sum()} paraphrase pairs, {(~labels).sum()} non-paraphrase pairs")
+    print(f"{'threshold':>9} {'paraphrase hits':>16} {'false hits':>11}")
+    for threshold in thresholds:
+        hits = similarities >= threshold
+        print(f"{threshold:>9.2f} {hits[labels].mean():>16.1%} {hits[~labels].mean():>11.1%}")
+
+
+def replay(cache, questions, model_ms, seed=0):
+    """Students ask random phrasings; a hit is false when it returns another group's answer"""
+    rng = random.Random(seed)
+    false_hits = 0
+    for _ in range(questions):
+        document = rng.choice(list(GROUPS))
+        group_id = rng.randrange(len(GROUPS[document]))
+        question = rng.choice(GROUPS[document][group_id])
+        answer = cache.lookup(document, question)
+        if answer is None:
+            cache.store(document, question, group_id, model_ms / 1000)
+        elif answer != group_id:
+            false_hits += 1
+    stats = cache.stats()
+    print(f"replay of {questions} questions at threshold {cache.threshold:.2f}: hit rate {stats['hit_rate']:.1%}, "
+          f"false hits {false_hits}, model time saved {stats['saved_seconds']:.1f}s "
+          f"({model_ms:.0f} ms per answer), mean lookup {stats['mean_lookup_ms']:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--embedder", choices=["minilm", "hash"], default="minilm")
+    parser.add_argument("--pairs", help="JSONL file of labelled pairs (default: the built-in set)")
+    parser.add_argument("--thresholds", type=float, nargs="+",
+                        default=[0.75, 0.8, 0.85, 0.88, 0.9, 0.92, 0.95, 0.97])
+    parser.add_argument("--threshold", type=float, default=Config.SEMANTIC_CACHE_THRESHOLD,
+                        help="threshold for the replay")
+    parser.add_argument("--questions", type=int, default=500)
+    parser.add_argument("--model-ms", type=float, default=1500.0, help="model time per uncached answer")
+    args = parser.parse_args()
+
+    embed = make_embed(args.embedder)
+    pairs = load_pairs(args.pairs) if args.pairs else labelled_pairs()
+    sweep(SemanticCache(embed), pairs, args.thresholds)
+    print()
+    replay(SemanticCache(embed, threshold=args.threshold), args.questions, args.model_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Local stand-in for the Gemini API that injects latency, errors and hangs.
+
+The gateway's HTTPStubBackend POSTs a prompt to /generate and reads one
+token per line. Start it standalone and point the app at it with
+LLM_BACKEND=stub LLM_STUB_URL=http://127.0.0.1:8765:
+
+    python -m benchmarks.llm_stub_server --port 8765 --error-rate 0.2 --first-token-ms 300
+"""
+import argparse
+import asyncio
+import random
+
+
+class StubLLMServer:
+    def __init__(self, first_token_ms=200.0, token_ms=20.0, error_rate=0.0, hang_rate=0.0,
+                 tokens=30, seed=None):
+        self.first_token_ms = first_token_ms
+        self.token_ms = token_ms
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.tokens = tokens
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.server = None
+        self._handlers = set()
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Start listening and return the bound port"""
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        for task in list(self._handlers):
+            task.cancel()  # Hung responses would otherwise keep the server open
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self.requests += 1
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            length = 0
+            await reader.readline()  # Request line
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode().partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            prompt = (await reader.readexactly(length)).decode("utf-8") if length else ""
+
+            roll = self.rng.random()
+            if roll < self.hang_rate:
+                await asyncio.sleep(3600)  # Upstream never answers
+            if roll < self.hang_rate + self.error_rate:
+                writer.write(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n\r\n")
+                await writer.drain()
+                return
+
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\n\r\n")
+            await asyncio.sleep(self.first_token_ms / 1000.0)
+            words = (prompt.split() or ["answer"]) * self.tokens
+            for word in words[:self.tokens]:
+                writer.write(f"{word} \n".encode("utf-8"))
+                await writer.drain()
+                await asyncio.sleep(self.token_ms / 1000.0)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._handlers.discard(task)
+            writer.close()
+
+
+async def serve(args):
+    server = StubLLMServer(args.first_token_ms, args.token_ms, args.error_rate, args.hang_rate)
+    port = await server.start(args.host, args.port)
+    print(f"LLM stub listening on http://{args.host}:{port}")
+    await server.server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--first-token-ms", type=float, default=200.0)
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    asyncio.run(serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Local OpenID Connect identity provider for exercising oauth.py without Google.
+
+Serves a discovery document and JWKS (with Cache-Control max-age), an
+/authorize endpoint that immediately redirects back with a code, and a
+/token endpoint that returns an RS256-signed ID token. The RSA key is
+generated at startup in pure Python. Every endpoint can add latency, and
+request counts are kept per path. Point the app at it with
+GOOGLE_DISCOVERY_URL=http://127.0.0.1:8766/.well-known/openid-configuration:
+
+    python -m benchmarks.oidc_stub_server --port 8766 --latency-ms 80
+"""
+import argparse
+import hashlib
+import json
+import secrets
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tests.helpers import StubSigningKey
+
+
+class StubIdentityProvider:
+    def __init__(self, client_id="stub-client", key_bits=2048, latency_ms=0.0, jwks_max_age=3600,
+                 email="student@example.com", seed=None):
+        self.client_id = client_id
+        self.latency_ms = latency_ms
+        self.jwks_max_age = jwks_max_age
+        self.email = email
+        self.key = StubSigningKey(key_bits, seed)
+        self.codes = {}
+        self.requests = Counter()
+        self.server = None
+        self.issuer = None
+
+    def start(self, host="127.0.0.1", port=0):
+        """Serve on a background thread and return the discovery URL"""
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                provider._handle(self, "GET")
+
+            def do_POST(self):
+                provider._handle(self, "POST")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.issuer = f"http://{host}:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, name="oidc-stub", daemon=True).start()
+        return f"{self.issuer}/.well-known/openid-configuration"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def sign_jwt(self, claims):
+        return self.key.sign_jwt(claims)
+
+    def _handle(self, handler, method):
+        url = urllib.parse.urlparse(handler.path)
+        self.requests[url.path] += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        if method == "GET" and url.path == "/.well-known/openid-configuration":
+            self._json(handler, {
+                "issuer": self.issuer,
+                "authorization_endpoint": f"{self.issuer}/authorize",
+                "token_endpoint": f"{self.issuer}/token",
+                "jwks_uri": f"{self.issuer}/jwks",
+                "id_token_signing_alg_values_supported": ["RS256"],
+            }, max_age=86400)
+        elif method == "GET" and url.path == "/jwks":
+            self._json(handler, {"keys": [self.key.jwk()]}, max_age=self.jwks_max_age)
+        elif method == "GET" and url.path == "/authorize":
+            query = dict(urllib.parse.parse_qsl(url.query))
+            code = secrets.token_urlsafe(16)
+            self.codes[code] = (query.get("login_hint") or self.email, query.get("nonce"))
+            location = f"{query['redirect_uri']}?{urllib.parse.urlencode({'code': code, 'state': query.get('state', '')})}"
+            handler.send_response(302)
+            handler.send_header("Location", location)
+            handler.end_headers()
+        elif method == "POST" and url.path == "/token":
+            length = int(handler.headers.get("Content-Length") or 0)
+            form = dict(urllib.parse.parse_qsl(handler.rfile.read(length).decode("ascii")))
+            entry = self.codes.pop(form.get("code"), None)
+            if entry is None or form.get("client_id") != self.client_id:
+                self._json(handler, {"error": "invalid_grant"}, status=400)
+                return
+            email, nonce = entry
+            now = int(time.time())
+            claims = {"iss": self.issuer, "aud": self.client_id, "sub": hashlib.sha1(email.encode()).hexdigest(),
+                      "email": email, "email_verified": True, "name": email.split("@")[0].title(),
+                      "iat": now, "exp": now + 3600}
+            if nonce:
+                claims["nonce"] = nonce
+            self._json(handler, {"access_token": secrets.token_urlsafe(24), "token_type": "Bearer",
+                                 "expires_in": 3600, "id_token": self.sign_jwt(claims)})
+        else:
+            self._json(handler, {"error": "not_found"}, status=404)
+
+    def _json(self, handler, document, status=200, max_age=None):
+        body = json.dumps(document).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        if max_age is not None:
+            handler.send_header("Cache-Control", f"public, max-age={max_age}")
+        handler.end_headers()
+        handler.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--client-id", default="stub-client")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--email", default="student@example.com")
+    args = parser.parse_args()
+    provider = StubIdentityProvider(args.client_id, latency_ms=args.latency_ms, email=args.email)
+    print(f"OIDC stub listening; GOOGLE_DISCOVERY_URL={provider.start(args.host, args.port)} "
+          f"GOOGLE_CLIENT_ID={args.client_id}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        provider.stop()
+
+
+if __name__ == "__main__":
+    main()
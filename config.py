@@ -1,31 +1,162 @@
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-import google.generativeai as genai
-import sqlite3  # ✅ Required for get_db_connection()
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Database path (for user accounts)
-DB_PATH = os.getenv("DB_PATH", "users.db")
-
 class Config:
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
     BASE_DIR = Path(__file__).parent
     DATA_DIR = BASE_DIR / 'data'
     DATABASE_URI = str(DATA_DIR / 'quiz.db')  # ✅ For quiz DB
+    EDUTUTOR_DB_PATH = str(DATA_DIR / 'edututor.db')  # Users, scores and everything else (see database.py)
+    # Old standalone account database, imported once into EDUTUTOR_DB_PATH's users table
+    LEGACY_USERS_DB = Path(os.getenv("DB_PATH", "users.db"))
+    # Per-thread SQLite connections (db.py): how long a writer waits for the lock, and prepared statements kept
+    DB_BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', '30000'))
+    DB_STATEMENT_CACHE = int(os.getenv('DB_STATEMENT_CACHE', '256'))
+    # Local logins: bcrypt cost (0 = the highest that hashes within the budget on this machine)
+    AUTH_BCRYPT_ROUNDS = int(os.getenv('AUTH_BCRYPT_ROUNDS', '0'))
+    AUTH_LOGIN_BUDGET_MS = float(os.getenv('AUTH_LOGIN_BUDGET_MS', '250'))
+    AUTH_HASH_WORKERS = int(os.getenv('AUTH_HASH_WORKERS', '0'))  # 0 = one per CPU
+    # Simultaneous logins the budget must hold for when tuning (0 = one per hash worker)
+    AUTH_CONCURRENT_LOGINS = int(os.getenv('AUTH_CONCURRENT_LOGINS', '0'))
+    # Failed logins allowed per username and per client address within the window
+    AUTH_THROTTLE_FAILURES = int(os.getenv('AUTH_THROTTLE_FAILURES', '5'))
+    AUTH_THROTTLE_WINDOW_SECONDS = float(os.getenv('AUTH_THROTTLE_WINDOW_SECONDS', '300'))
+    # Compiled into an indexed QuestionBank at startup (nested by subject/topic/difficulty, or a flat list)
+    QUESTION_BANK_PATH = Path(os.getenv('QUESTION_BANK_PATH', str(DATA_DIR / 'questions.json')))
+    # How often the memory-mapped compiled bank checks whether the JSON changed
+    QUESTION_BANK_CHECK_SECONDS = float(os.getenv('QUESTION_BANK_CHECK_SECONDS', '2'))
+    # Adaptive quizzes: Elo-style step sizes K / (1 + decay * answers so far), persisted every few seconds
+    ADAPTIVE_K_STUDENT = float(os.getenv('ADAPTIVE_K_STUDENT', '0.8'))
+    ADAPTIVE_K_QUESTION = float(os.getenv('ADAPTIVE_K_QUESTION', '0.4'))
+    ADAPTIVE_K_DECAY = float(os.getenv('ADAPTIVE_K_DECAY', '0.05'))
+    ADAPTIVE_PERSIST_SECONDS = float(os.getenv('ADAPTIVE_PERSIST_SECONDS', '5'))
+    # Generated quiz questions: 'llm' (ai_helper.ask_ai), 'stub' (offline, deterministic) or 'none'
+    QUIZ_GENERATOR = os.getenv('QUIZ_GENERATOR', 'llm' if GEMINI_API_KEY else 'none')
+    # The pre-generation worker keeps at least this many questions per subject/topic/difficulty
+    QUIZ_MIN_POOL = int(os.getenv('QUIZ_MIN_POOL', '10'))
+    QUIZ_PREGEN_BATCH = int(os.getenv('QUIZ_PREGEN_BATCH', '5'))
+    QUIZ_PREGEN_INTERVAL_SECONDS = float(os.getenv('QUIZ_PREGEN_INTERVAL_SECONDS', '60'))
+    # Extra topics to pre-generate, as "subject/topic,subject/topic"
+    QUIZ_PREGEN_TOPICS = [tuple(item.strip().lower().split('/', 1))
+                          for item in os.getenv('QUIZ_PREGEN_TOPICS', '').split(',') if '/' in item]
+    # Topics students type in are kept filled for a while, oldest dropped first beyond the cap
+    QUIZ_PREGEN_MAX_REQUESTED = int(os.getenv('QUIZ_PREGEN_MAX_REQUESTED', '50'))
+    QUIZ_PREGEN_REQUEST_TTL_SECONDS = float(os.getenv('QUIZ_PREGEN_REQUEST_TTL_SECONDS', '86400'))
+    # LLM calls per minute the background worker may make; it has no user of its own to throttle
+    QUIZ_PREGEN_CALLS_PER_MINUTE = int(os.getenv('QUIZ_PREGEN_CALLS_PER_MINUTE', '10'))
+    QUIZ_TOPIC_MAX_LENGTH = int(os.getenv('QUIZ_TOPIC_MAX_LENGTH', '40'))
+    # JSON score files imported once into quiz_results
+    LEGACY_SCORE_FILES = [BASE_DIR / 'scores.json', DATA_DIR / 'quiz.db']
+    # Write-behind quiz attempt recorder
+    ATTEMPT_BATCH_SIZE = int(os.getenv('ATTEMPT_BATCH_SIZE', '500'))
+    ATTEMPT_FLUSH_SECONDS = float(os.getenv('ATTEMPT_FLUSH_SECONDS', '0.5'))
+    ATTEMPT_MAX_PENDING = int(os.getenv('ATTEMPT_MAX_PENDING', '100000'))
+    # Number of most recent percentages kept per student/topic for trend lines
+    ANALYTICS_TREND_LENGTH = int(os.getenv('ANALYTICS_TREND_LENGTH', '10'))
 
     GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')
     GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET')
-    GOOGLE_DISCOVERY_URL = "https://accounts.google.com/.well-known/openid-configuration"
+    GOOGLE_DISCOVERY_URL = os.getenv('GOOGLE_DISCOVERY_URL', "https://accounts.google.com/.well-known/openid-configuration")
+    # Discovery/JWKS responses without cache headers are reused this long
+    OAUTH_CACHE_DEFAULT_SECONDS = int(os.getenv('OAUTH_CACHE_DEFAULT_SECONDS', '300'))
 
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
     OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
 
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-here')
     BASE_URL = os.getenv('BASE_URL', 'http://localhost:8501')
+    GOOGLE_REDIRECT_URI = os.getenv('GOOGLE_REDIRECT_URI', BASE_URL)
+    # Lifetime of the signed session token issued at login
+    SESSION_TTL_SECONDS = int(os.getenv('SESSION_TTL_SECONDS', str(12 * 3600)))
+    # Server-side sessions (session_store.py): cookie name, idle expiry and how many stay in memory
+    SESSION_COOKIE_NAME = os.getenv('SESSION_COOKIE_NAME', 'edututor_session')
+    SESSION_IDLE_SECONDS = int(os.getenv('SESSION_IDLE_SECONDS', str(8 * 3600)))
+    SESSION_CACHE_CAPACITY = int(os.getenv('SESSION_CACHE_CAPACITY', '10000'))
+    # Browsers send a Secure cookie only over HTTPS (and to http://localhost); turn off for plain-HTTP hosts
+    SESSION_COOKIE_SECURE = os.getenv('SESSION_COOKIE_SECURE', '1').lower() in ('1', 'true', 'yes')
+
+    # PDF Q&A retrieval: "bm25", "dense" or "hybrid"
+    PDF_QA_RETRIEVER = os.getenv('PDF_QA_RETRIEVER', 'hybrid')
+    # Chunks are cut by T5 tokens, overlapping by PDF_QA_CHUNK_OVERLAP; PDF_QA_TOP_K of them plus the
+    # question must fit the model's 512-token input
+    PDF_QA_CHUNK_TOKENS = int(os.getenv('PDF_QA_CHUNK_TOKENS', '150'))
+    PDF_QA_CHUNK_OVERLAP = int(os.getenv('PDF_QA_CHUNK_OVERLAP', '32'))
+    PDF_QA_TOKENIZE_BATCH = int(os.getenv('PDF_QA_TOKENIZE_BATCH', '32'))
+    PDF_QA_TOP_K = int(os.getenv('PDF_QA_TOP_K', '3'))
+
+    # Shared course library: chunk vectors in a FAISS file ("flat" float32 or "fp16", half the memory)
+    COURSE_LIBRARY_INDEX = DATA_DIR / 'course_library.faiss'
+    COURSE_INDEX_ENCODING = os.getenv('COURSE_INDEX_ENCODING', 'flat')
+    COURSE_EMBED_BATCH = int(os.getenv('COURSE_EMBED_BATCH', '64'))
+
+    # Answers reused for paraphrased questions about the same document (modules/semantic_cache.py):
+    # minimum cosine similarity of the question embeddings, and the LRU's entry and memory bounds.
+    # Kept strict until benchmarks/eval_semantic_cache.py has been run on real questions with MiniLM
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.95'))
+    SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', '10000'))
+    SEMANTIC_CACHE_MAX_MB = int(os.getenv('SEMANTIC_CACHE_MAX_MB', '64'))
+
+    # Parsed-PDF cache keyed by content hash
+    PDF_CACHE_DIR = DATA_DIR / 'pdf_cache'
+    PDF_CACHE_MEMORY_MB = int(os.getenv('PDF_CACHE_MEMORY_MB', '256'))
+    PDF_CACHE_DISK_MB = int(os.getenv('PDF_CACHE_DISK_MB', '2048'))
+
+    # Page-parallel PDF extraction limits
+    PDF_EXTRACT_WORKERS = int(os.getenv('PDF_EXTRACT_WORKERS', str(min(4, os.cpu_count() or 1))))
+    PDF_EXTRACT_BATCH_PAGES = int(os.getenv('PDF_EXTRACT_BATCH_PAGES', '16'))
+    PDF_EXTRACT_PARALLEL_MIN_PAGES = int(os.getenv('PDF_EXTRACT_PARALLEL_MIN_PAGES', '32'))
+    PDF_EXTRACT_MAX_PAGES = int(os.getenv('PDF_EXTRACT_MAX_PAGES', '1000'))
+    PDF_EXTRACT_MAX_PAGE_CHARS = int(os.getenv('PDF_EXTRACT_MAX_PAGE_CHARS', '20000'))
+    PDF_EXTRACT_MAX_TOTAL_CHARS = int(os.getenv('PDF_EXTRACT_MAX_TOTAL_CHARS', '5000000'))
+    # Address space a worker may add beyond what it starts with
+    PDF_EXTRACT_WORKER_MEMORY_MB = int(os.getenv('PDF_EXTRACT_WORKER_MEMORY_MB', '1024'))
+
+    # Shared micro-batching inference for the T5 and DistilBERT models
+    INFERENCE_MAX_BATCH_SIZE = int(os.getenv('INFERENCE_MAX_BATCH_SIZE', '8'))
+    INFERENCE_MAX_WAIT_MS = int(os.getenv('INFERENCE_MAX_WAIT_MS', '15'))
+
+    # CPU inference backend for the QA models: "torch" (fp32), "int8" or "onnx"
+    INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'torch')
+    ONNX_MODEL_DIR = DATA_DIR / 'onnx_models'
+
+    # Ask AI passages (modules/qa_context.py): window length and overlap in tokens, longest answer,
+    # (question, window) pairs per forward pass (0 = all in one) and passages kept tokenized
+    ASK_AI_MAX_LENGTH = int(os.getenv('ASK_AI_MAX_LENGTH', '384'))
+    ASK_AI_DOC_STRIDE = int(os.getenv('ASK_AI_DOC_STRIDE', '128'))
+    ASK_AI_MAX_ANSWER_TOKENS = int(os.getenv('ASK_AI_MAX_ANSWER_TOKENS', '30'))
+    ASK_AI_PAIRS_PER_PASS = int(os.getenv('ASK_AI_PAIRS_PER_PASS', '32'))
+    ASK_AI_CONTEXT_CACHE = int(os.getenv('ASK_AI_CONTEXT_CACHE', '32'))
+
+    # Shared LLM client and its response cache: "gemini", the local "stub" server or the offline "fake" backend
+    LLM_BACKEND = os.getenv('LLM_BACKEND', 'gemini')
+    LLM_MODEL = os.getenv('LLM_MODEL', 'gemini-pro')
+    LLM_CACHE_DB = DATA_DIR / 'llm_cache.db'
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '2048'))
+    LLM_CACHE_TTL_SECONDS = int(os.getenv('LLM_CACHE_TTL_SECONDS', str(24 * 3600)))
+
+    # Async LLM gateway: concurrency, per-user rate limit, deadlines, retries, circuit breaker
+    LLM_STUB_URL = os.getenv('LLM_STUB_URL', 'http://127.0.0.1:8765')
+    LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '16'))
+    LLM_USER_CALLS_PER_MINUTE = int(os.getenv('LLM_USER_CALLS_PER_MINUTE', '20'))
+    LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', '30'))
+    LLM_FIRST_TOKEN_TIMEOUT_SECONDS = float(os.getenv('LLM_FIRST_TOKEN_TIMEOUT_SECONDS', '10'))
+    LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))
+    LLM_RETRY_BASE_SECONDS = float(os.getenv('LLM_RETRY_BASE_SECONDS', '0.5'))
+    LLM_RETRY_MAX_BACKOFF_SECONDS = float(os.getenv('LLM_RETRY_MAX_BACKOFF_SECONDS', '4'))
+    LLM_BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', '5'))
+    LLM_BREAKER_RESET_SECONDS = float(os.getenv('LLM_BREAKER_RESET_SECONDS', '30'))
+    # Background image: served from static/ (see static_assets.py) when static serving is on
+    STATIC_DIR = BASE_DIR / 'static'
+    BACKGROUND_IMAGE = BASE_DIR / 'assets' / 'image_classification.png'
+    BACKGROUND_STATIC_NAME = 'background'
+    BACKGROUND_MAX_WIDTH = int(os.getenv('BACKGROUND_MAX_WIDTH', '1920'))
+    # Preload the local QA models in a background thread after the first page is served
+    WARMUP_MODELS = os.getenv('WARMUP_MODELS', '0').lower() in ('1', 'true', 'yes')
 
     @classmethod
     def ensure_data_dir(cls):
@@ -33,11 +164,3 @@ class Config:
 
 # Ensure the data directory exists
 Config.ensure_data_dir()
-
-# Configure Gemini if API key is present
-if Config.GEMINI_API_KEY:
-    genai.configure(api_key=Config.GEMINI_API_KEY)
-
-# ✅ Function to get SQLite DB connection
-def get_db_connection():
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
@@ -0,0 +1,199 @@
+"""Password hashing, verification and login throttling for local accounts.
+
+Passwords are stored as bcrypt hashes of a SHA-256 pre-hash, so passwords
+longer than bcrypt's 72-byte limit are not truncated. The bcrypt cost is
+the highest one at which the expected simultaneous logins still fit the
+login latency budget on this machine, measured once per process. Hashing runs on a small shared worker pool:
+bcrypt releases the GIL, and the pool bounds how many hashes compete for
+CPU when many people log in at once. Rows still holding a plaintext
+password, or a hash with a lower cost than the current one, are rehashed
+on the next successful login.
+"""
+import base64
+import hashlib
+import hmac
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from config import Config
+
+MIN_ROUNDS = 10
+MAX_ROUNDS = 16
+
+_rounds = None
+_executor = None
+_lock = threading.Lock()
+
+
+class LoginThrottled(Exception):
+    """Too many failed logins for this username or client; retry_after is in seconds"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Too many failed login attempts. Try again in {math.ceil(retry_after)} seconds.")
+        self.retry_after = retry_after
+
+
+def _prehash(password):
+    return base64.b64encode(hashlib.sha256(password.encode("utf-8")).digest())
+
+
+def _hash_workers():
+    return Config.AUTH_HASH_WORKERS or os.cpu_count() or 1
+
+
+def tune_rounds(budget_ms=None, concurrent=None):
+    """Highest bcrypt cost at which `concurrent` simultaneous logins each finish within budget_ms here.
+
+    Logins beyond the number of hash workers queue, so the per-hash budget
+    shrinks with them; each extra round doubles the work.
+    """
+    budget_ms = budget_ms or Config.AUTH_LOGIN_BUDGET_MS
+    workers = _hash_workers()
+    concurrent = max(concurrent or Config.AUTH_CONCURRENT_LOGINS or workers, workers)
+    start = time.perf_counter()
+    bcrypt.hashpw(b"calibration", bcrypt.gensalt(8))
+    base_ms = max((time.perf_counter() - start) * 1000, 0.01)
+    per_hash_ms = budget_ms * workers / concurrent
+    return max(MIN_ROUNDS, min(MAX_ROUNDS, 8 + int(math.log2(max(per_hash_ms / base_ms, 1)))))
+
+
+def get_rounds():
+    """AUTH_BCRYPT_ROUNDS if set, otherwise tune_rounds() measured once per process"""
+    global _rounds
+    if _rounds is None:
+        with _lock:
+            if _rounds is None:
+                _rounds = Config.AUTH_BCRYPT_ROUNDS or tune_rounds()
+    return _rounds
+
+
+def get_hash_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=_hash_workers(), thread_name_prefix="password-hash")
+    return _executor
+
+
+def hash_password(password, rounds=None):
+    return bcrypt.hashpw(_prehash(password), bcrypt.gensalt(rounds or get_rounds())).decode("ascii")
+
+
+def is_hashed(stored):
+    return bool(stored) and stored.startswith(("$2a$", "$2b$", "$2y$")) and len(stored) == 60
+
+
+def needs_rehash(stored, rounds=None):
+    """True for plaintext legacy rows and for hashes made with a lower cost than the current one"""
+    return not is_hashed(stored) or int(stored[4:6]) < (rounds or get_rounds())
+
+
+def verify_password(password, stored):
+    """Constant-time check against a bcrypt hash or a legacy plaintext value"""
+    if not stored:
+        return False
+    if is_hashed(stored):
+        return bcrypt.checkpw(_prehash(password), stored.encode("ascii"))
+    return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+
+
+class LoginThrottle:
+    """Sliding-window count of failed logins per key (username or client address), in memory"""
+
+    def __init__(self, max_failures=None, window_seconds=None, max_keys=100_000):
+        self.max_failures = max_failures or Config.AUTH_THROTTLE_FAILURES
+        self.window_seconds = window_seconds or Config.AUTH_THROTTLE_WINDOW_SECONDS
+        self.max_keys = max_keys
+        self._failures = {}  # key -> deque of failure times, oldest first
+        self._lock = threading.Lock()
+
+    def retry_after(self, key, now=None):
+        """Seconds until key may try again; 0 if it is not throttled"""
+        now = now or time.monotonic()
+        with self._lock:
+            failures = self._failures.get(key)
+            if not failures:
+                return 0.0
+            while failures and failures[0] <= now - self.window_seconds:
+                failures.popleft()
+            if len(failures) < self.max_failures:
+                return 0.0
+            return failures[-self.max_failures] + self.window_seconds - now
+
+    def record_failure(self, key, now=None):
+        now = now or time.monotonic()
+        with self._lock:
+            if key not in self._failures and len(self._failures) >= self.max_keys:
+                self._prune(now)
+            self._failures.setdefault(key, deque(maxlen=self.max_failures)).append(now)
+
+    def reset(self, key):
+        with self._lock:
+            self._failures.pop(key, None)
+
+    def _prune(self, now):
+        for key in [k for k, f in self._failures.items() if not f or f[-1] <= now - self.window_seconds]:
+            del self._failures[key]
+
+
+class CredentialStore:
+    """Local accounts in the users table (unique username and email), with hashed passwords"""
+
+    def __init__(self, pool, throttle=None, rounds=None):
+        self.pool = pool
+        self.throttle = throttle or LoginThrottle()
+        self.rounds = rounds
+        # Verified against when the username does not exist, so a miss costs as much as a wrong password
+        self._dummy_hash = None
+
+    def _run(self, fn, *args):
+        """Run hashing work on the shared pool and wait for it"""
+        return get_hash_executor().submit(fn, *args).result()
+
+    def register(self, username, password, email=None, role="student"):
+        """Create an account; raises sqlite3.IntegrityError if the username or email is taken"""
+        hashed = self._run(hash_password, password, self.rounds)
+        with self.pool.transaction() as conn:
+            conn.execute("INSERT INTO users (username, password, email, role) VALUES (?, ?, NULLIF(?, ''), ?)",
+                         (username, hashed, email, role))
+
+    def authenticate(self, username, password, client=None):
+        """The (id, username, email, role) row for valid credentials, else None; raises LoginThrottled"""
+        keys = [f"user:{username}"] + ([f"client:{client}"] if client else [])
+        wait = max(self.throttle.retry_after(key) for key in keys)
+        if wait > 0:
+            raise LoginThrottled(wait)
+
+        row = self.pool.execute("SELECT id, username, email, role, password FROM users WHERE username = ?",
+                                (username,)).fetchone()
+        if row is None:
+            if self._dummy_hash is None:
+                self._dummy_hash = hash_password("dummy password", self.rounds)
+            self._run(verify_password, password, self._dummy_hash)
+            ok = False
+        else:
+            ok = self._run(verify_password, password, row[4])
+
+        if not ok:
+            for key in keys:
+                self.throttle.record_failure(key)
+            return None
+        # Only the account's own count: a client's failures age out of the window, or a valid
+        # login of its own could wipe the record of its guessing at other accounts
+        self.throttle.reset(f"user:{username}")
+        if needs_rehash(row[4], self.rounds):
+            self._rehash(row[0], row[4], password)
+        return row[:4]
+
+    def _rehash(self, user_id, old, password):
+        hashed = self._run(hash_password, password, self.rounds)
+        with self.pool.transaction() as conn:
+            # Only replace what was verified, in case the password changed meanwhile
+            conn.execute("UPDATE users SET password = ? WHERE id = ? AND password = ?", (hashed, user_id, old))
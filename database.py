@@ -1,53 +1,300 @@
 import sqlite3
-import os
+import threading
+import time
 from pathlib import Path
+from config import Config
+from db import ConnectionPool
+from analytics_aggregates import ensure_aggregates, rebuild_aggregates
 
-def init_db(db_path="data/edututor.db"):
-    """Initialize the SQLite database with proper error handling"""
+_pools = {}
+_pools_lock = threading.Lock()
+
+# Attempts at migrating while another process holds the write lock, each waiting busy_timeout first
+MIGRATE_ATTEMPTS = 3
+# Result codes that mean the file itself is damaged or not a database at all
+CORRUPT_CODES = (sqlite3.SQLITE_CORRUPT, sqlite3.SQLITE_NOTADB)
+CORRUPT_MESSAGES = ("database disk image is malformed", "file is not a database")
+
+def get_pool(db_path=None):
+    """The process-wide connection pool for a database file, migrated to the current schema on first use"""
+    db_path = str(db_path or Config.EDUTUTOR_DB_PATH)
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = _pools[db_path] = _open_pool(db_path)
+        return pool
+
+def init_db(db_path=None):
+    """Initialize the SQLite database; returns its shared connection pool (do not close it)"""
+    return get_pool(db_path)
+
+def _open_pool(db_path):
     db_file = Path(db_path)
     
     # Ensure directory exists
     db_file.parent.mkdir(parents=True, exist_ok=True)
     
-    try:
-        conn = sqlite3.connect(db_path)
-        c = conn.cursor()
-        
-        # Create users table if not exists
-        c.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id TEXT PRIMARY KEY,
-            username TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            role TEXT NOT NULL CHECK (role IN ('student', 'educator')),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-        
-        # Create quiz_results table if not exists
-        c.execute("""
-        CREATE TABLE IF NOT EXISTS quiz_results (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT NOT NULL,
-            subject TEXT NOT NULL,
-            topic TEXT NOT NULL,
-            difficulty TEXT NOT NULL,
-            score INTEGER NOT NULL,
-            total INTEGER NOT NULL,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-        """)
-        
+    for attempt in range(1, MIGRATE_ATTEMPTS + 1):
+        try:
+            return ConnectionPool(db_path, setup=migrate)
+        except sqlite3.OperationalError as e:
+            # Another process is migrating and held the lock past busy_timeout; wait for it and retry.
+            # A pool that skipped the migration is never handed out: it would run on the old schema for good.
+            if ("locked" in str(e) or "busy" in str(e)) and attempt < MIGRATE_ATTEMPTS:
+                print(f"Database busy, retrying migration ({attempt}/{MIGRATE_ATTEMPTS}): {e}")
+                time.sleep(attempt)
+                continue
+            raise
+        except sqlite3.DatabaseError as e:
+            if not _is_corrupt(e):
+                raise  # e.g. an IntegrityError in a migration step: the data is fine, the step is not
+            print(f"Database {db_file} is corrupt ({e}); moving it aside and starting a new one")
+            _move_aside(db_file)
+            return ConnectionPool(db_path, setup=migrate)
+
+def _is_corrupt(error):
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in CORRUPT_CODES  # Extended codes keep the primary code in the low byte
+    return any(message in str(error) for message in CORRUPT_MESSAGES)
+
+def _move_aside(db_file):
+    """Rename a corrupt database together with its -wal and -shm files, so it can still be inspected"""
+    suffix = time.strftime(".corrupt-%Y%m%d-%H%M%S")
+    for path in (db_file, Path(f"{db_file}-wal"), Path(f"{db_file}-shm")):
+        if path.exists():
+            path.rename(path.with_name(path.name + suffix))
+
+def migrate(conn):
+    """Bring a database up to the latest schema version (PRAGMA user_version), one transaction per step"""
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= len(MIGRATIONS):
+        return
+    for version, migration in enumerate(MIGRATIONS, 1):
+        # IMMEDIATE takes the write lock first, so concurrent processes run each step exactly once
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("PRAGMA user_version").fetchone()[0] < version:
+                migration(conn.cursor())
+                conn.execute(f"PRAGMA user_version = {version}")
+        except BaseException:
+            conn.rollback()
+            raise
         conn.commit()
-        return conn
-        
-    except sqlite3.Error as e:
-        print(f"Database error: {e}")
-        # If database is corrupted, delete and recreate
-        if db_file.exists():
-            db_file.unlink()
-        return init_db(db_path)  # Retry
-    except Exception as e:
-        print(f"Unexpected error: {e}")
-        raise
\ No newline at end of file
+
+def _create_schema(c):
+    """Version 1: quiz, adaptive and analytics tables (idempotent, so it also adopts databases from before versioning)"""
+    # Create quiz_results table if not exists
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS quiz_results (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        topic TEXT NOT NULL,
+        difficulty TEXT NOT NULL,
+        score INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+    """)
+    
+    _upgrade_legacy_quiz_results(c)
+    _add_column_if_missing(c, "quiz_results", "duration_ms", "INTEGER")
+
+    # Per-question answers of each attempt
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS quiz_answers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        result_id INTEGER NOT NULL,
+        question_index INTEGER NOT NULL,
+        question TEXT,
+        selected_option INTEGER,
+        correct_option INTEGER,
+        is_correct INTEGER NOT NULL,
+        elapsed_ms INTEGER,
+        FOREIGN KEY (result_id) REFERENCES quiz_results (id)
+    )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_quiz_answers_result ON quiz_answers (result_id)")
+    # Bank ID of the question at the time it was asked
+    _add_column_if_missing(c, "quiz_answers", "question_id", "INTEGER")
+
+    # LLM-generated quiz questions, merged into the compiled question bank
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS generated_questions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        text_hash TEXT UNIQUE NOT NULL,
+        subject TEXT NOT NULL,
+        topic TEXT NOT NULL,
+        difficulty TEXT NOT NULL,
+        record TEXT NOT NULL,
+        source TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+    # Adaptive engine estimates; questions are keyed by text so they survive bank edits
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS student_ability (
+        user_id TEXT PRIMARY KEY,
+        theta REAL NOT NULL,
+        answers INTEGER NOT NULL
+    )
+    """)
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS question_params (
+        question TEXT PRIMARY KEY,
+        difficulty REAL NOT NULL,
+        discrimination REAL NOT NULL,
+        answers INTEGER NOT NULL
+    )
+    """)
+
+    # Append-only score history: per-student timelines and subject/topic filters stay index lookups
+    c.execute("CREATE INDEX IF NOT EXISTS idx_quiz_results_user_time ON quiz_results (user_id, timestamp)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_quiz_results_subject_topic ON quiz_results (subject, topic)")
+
+    # One-shot data migrations that have already run
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS applied_migrations (
+        name TEXT PRIMARY KEY,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+    # Materialized per-student aggregates, kept current by every writer
+    ensure_aggregates(c)
+
+def _unify_users(c):
+    """Version 2: one users table for local and Google accounts, replacing the TEXT-id 'educator' variant"""
+    columns = {row[1] for row in c.execute("PRAGMA table_info(users)")}
+    c.execute("""
+    CREATE TABLE users_unified (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT NOT NULL,
+        password TEXT,
+        email TEXT,
+        role TEXT NOT NULL DEFAULT 'student' CHECK (role IN ('student', 'teacher')),
+        auth_method TEXT NOT NULL DEFAULT 'local',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    if columns:
+        def column(name, default="NULL"):
+            return name if name in columns else default
+        c.execute(f"""
+        INSERT INTO users_unified (username, password, email, role, auth_method)
+        SELECT username, {column('password')}, NULLIF({column('email')}, ''),
+               CASE WHEN {column('role')} IN ('teacher', 'educator') THEN 'teacher' ELSE 'student' END,
+               COALESCE({column('auth_method')}, 'local')
+        FROM users WHERE username IS NOT NULL
+        """)
+        c.execute("DROP TABLE users")
+    # Renamed last so quiz_results' foreign key keeps naming users
+    c.execute("ALTER TABLE users_unified RENAME TO users")
+
+def _unique_credentials(c):
+    """Version 3: unique usernames and emails (later duplicates get 'name#id' and lose the email)"""
+    c.execute("UPDATE users SET username = username || '#' || id "
+              "WHERE id NOT IN (SELECT MIN(id) FROM users GROUP BY username)")
+    c.execute("UPDATE users SET email = NULL WHERE email IS NOT NULL "
+              "AND id NOT IN (SELECT MIN(id) FROM users WHERE email IS NOT NULL GROUP BY lower(email))")
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username ON users (username)")
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users (lower(email)) WHERE email IS NOT NULL")
+
+def _create_sessions(c):
+    """Version 4: server-side sessions behind the signed session cookie (session_store.py)"""
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS sessions (
+        id TEXT PRIMARY KEY,
+        user_id TEXT,
+        data TEXT NOT NULL,
+        last_seen REAL NOT NULL
+    )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_seen ON sessions (last_seen)")
+
+def _create_course_library(c):
+    """Version 5: shared course library (modules/course_library.py); chunk vectors live in a FAISS file"""
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS library_classes (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    )
+    """)
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS library_documents (
+        id INTEGER PRIMARY KEY,
+        class_id INTEGER NOT NULL REFERENCES library_classes (id),
+        doc_hash TEXT NOT NULL,
+        title TEXT NOT NULL,
+        uploaded_by TEXT,
+        pages INTEGER NOT NULL DEFAULT 0,
+        chunks INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (class_id, doc_hash)
+    )
+    """)
+    # AUTOINCREMENT: a deleted chunk's ID is never reused, so a stale vector cannot match a new chunk
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS library_chunks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        document_id INTEGER NOT NULL REFERENCES library_documents (id),
+        class_id INTEGER NOT NULL,
+        page INTEGER NOT NULL,
+        text TEXT NOT NULL
+    )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_library_chunks_document ON library_chunks (document_id)")
+
+def _normalize_timestamps(c):
+    """Version 6: attempts stamped in local ISO 8601 ('T') move to UTC CURRENT_TIMESTAMP format, aggregates redone"""
+    c.execute("UPDATE quiz_results SET timestamp = datetime(timestamp, 'utc') "
+              "WHERE timestamp LIKE '____-__-__T%' AND datetime(timestamp, 'utc') IS NOT NULL")
+    rebuild_aggregates(c)
+
+def _create_adaptive_calibration(c):
+    """Version 7: a counter bumped by every adaptive.py recalibration, so running apps reload the refit estimates"""
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS adaptive_calibration (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    )
+    """)
+    c.execute("INSERT OR IGNORE INTO adaptive_calibration (id, version) VALUES (1, 0)")
+
+# Append only: each entry upgrades the schema from version N-1 to N
+MIGRATIONS = [_create_schema, _unify_users, _unique_credentials, _create_sessions, _create_course_library,
+              _normalize_timestamps, _create_adaptive_calibration]
+
+def _add_column_if_missing(c, table, column, definition):
+    columns = {row[1] for row in c.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def _upgrade_legacy_quiz_results(c):
+    """Older databases have quiz_results(quiz_topic, total_questions, ...); move them to the current columns"""
+    columns = {row[1] for row in c.execute("PRAGMA table_info(quiz_results)")}
+    if {"topic", "difficulty", "total"} <= columns:
+        return
+
+    c.execute("ALTER TABLE quiz_results RENAME TO quiz_results_legacy")
+    c.execute("""
+    CREATE TABLE quiz_results (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        topic TEXT NOT NULL,
+        difficulty TEXT NOT NULL,
+        score INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+    """)
+    c.execute("""
+    INSERT INTO quiz_results (user_id, subject, topic, difficulty, score, total, timestamp)
+    SELECT CAST(user_id AS TEXT), subject, quiz_topic, 'Unknown', score, total_questions, timestamp
+    FROM quiz_results_legacy
+    """)
+    c.execute("DROP TABLE quiz_results_legacy")
@@ -0,0 +1,96 @@
+"""Thread-safe SQLite connection pool shared by every module that reads or writes a database file.
+
+SQLite connections must not be used by two threads at once, and opening one
+per call repeats the file open, PRAGMA setup and statement compilation each
+time. ConnectionPool keeps one long-lived connection per thread instead:
+WAL mode so readers never block the writer, a busy_timeout so concurrent
+writers wait for the lock instead of failing, and a per-connection cache of
+prepared statements. Connections of threads that have exited are closed the
+next time a thread opens one.
+"""
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+
+from config import Config
+
+
+class ConnectionPool:
+    """One SQLite connection per thread for a single database file.
+
+    setup(conn) runs once, on the creating thread, before the pool is
+    handed out (schema creation and migrations go there).
+    """
+
+    def __init__(self, db_path, setup=None, busy_timeout_ms=None, cached_statements=None, synchronous="NORMAL"):
+        self.db_path = str(db_path)
+        self.busy_timeout_ms = busy_timeout_ms if busy_timeout_ms is not None else Config.DB_BUSY_TIMEOUT_MS
+        self.cached_statements = cached_statements or Config.DB_STATEMENT_CACHE
+        self.synchronous = synchronous
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = {}  # thread ident -> (weakref to thread, connection)
+        self.opened = 0
+        if setup is not None:
+            setup(self.connection())
+
+    def _open(self):
+        # check_same_thread=False only so close() can run from another thread; each connection stays thread-local
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000,
+                               cached_statements=self.cached_statements, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        return conn
+
+    def connection(self):
+        """This thread's connection, opened on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._open()
+            thread = threading.current_thread()
+            with self._lock:
+                self._prune()
+                self._connections[thread.ident] = (weakref.ref(thread), conn)
+                self.opened += 1
+        return conn
+
+    def _prune(self):
+        """Close connections whose threads have exited (Streamlit runs every rerun on a fresh thread)"""
+        for ident, (thread_ref, conn) in list(self._connections.items()):
+            thread = thread_ref()
+            if thread is None or not thread.is_alive():
+                conn.close()
+                del self._connections[ident]
+
+    @property
+    def size(self):
+        with self._lock:
+            return len(self._connections)
+
+    @contextmanager
+    def transaction(self, immediate=True):
+        """Commit on success, roll back on error; BEGIN IMMEDIATE takes the write lock up front"""
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def execute(self, sql, params=()):
+        return self.connection().execute(sql, params)
+
+    def query(self, sql, params=()):
+        return self.connection().execute(sql, params).fetchall()
+
+    def close(self):
+        """Close every connection; threads that use the pool afterwards open new ones"""
+        with self._lock:
+            for _, conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
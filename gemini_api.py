@@ -1,13 +1,5 @@
-import os
-import google.generativeai as genai
-from config import Config
+from llm_client import get_llm_client
 
-genai.configure(api_key=Config.OPENAI_API_KEY)
-
-def query_gemini(prompt):
-    try:
-        model = genai.GenerativeModel("gemini-pro")
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        return f"⚠️ Gemini Error: {str(e)}"
+def query_gemini(prompt, user_id=None):
+    """The full answer; raises llm_gateway.LLMError on failure"""
+    return get_llm_client().ask(prompt, user_id=user_id)
@@ -0,0 +1,229 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from config import Config
+from db import ConnectionPool
+from llm_gateway import RateLimitedError
+
+
+def normalize_prompt(prompt):
+    """Case- and whitespace-insensitive form of a prompt, so trivially different phrasings share a cache entry"""
+    return re.sub(r"\s+", " ", prompt).strip().casefold()
+
+
+def cache_key(model_name, prompt):
+    return hashlib.sha256(f"{model_name}\x00{normalize_prompt(prompt)}".encode("utf-8")).hexdigest()
+
+
+class GatewayBackend:
+    """Blocking adapter over the async LLM gateway (Gemini or the local stub)"""
+
+    def __init__(self, gateway):
+        self.gateway = gateway
+        self.model_name = gateway.model_name
+
+    def generate(self, prompt, user_id=None):
+        return self.gateway.generate_sync(prompt, user_id=user_id)
+
+    def stream(self, prompt, user_id=None):
+        return self.gateway.stream_sync(prompt, user_id=user_id)
+
+
+class FakeBackend:
+    """Offline stand-in that answers from a dict or echoes the prompt, counting upstream calls"""
+
+    def __init__(self, responses=None, latency=0.0, model_name="fake"):
+        self.responses = responses or {}
+        self.latency = latency
+        self.model_name = model_name
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, user_id=None):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self.responses.get(prompt, f"[fake answer] {prompt}")
+
+    def stream(self, prompt, user_id=None):
+        for word in self.generate(prompt, user_id).split(" "):
+            yield word + " "
+
+
+class ResponseCache:
+    """TTL + LRU in-memory cache in front of a persistent SQLite tier"""
+
+    def __init__(self, max_entries=None, ttl_seconds=None, db_path=None):
+        self.max_entries = max_entries or Config.LLM_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else Config.LLM_CACHE_TTL_SECONDS
+        self.db_path = str(db_path or Config.LLM_CACHE_DB)
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        # Not database.get_pool(): the cache lives in its own file (LLM_CACHE_DB), outside the versioned
+        # schema, so it can be deleted at any time and its writes never wait on the main database's lock
+        self.pool = ConnectionPool(self.db_path, setup=self._create_table)
+
+    @staticmethod
+    def _create_table(conn):
+        with conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """)
+            conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, expires_at = entry
+                if expires_at >= now:
+                    self._memory.move_to_end(key)
+                    return response
+                del self._memory[key]
+
+        row = self.pool.execute(
+            "SELECT response, expires_at FROM llm_cache WHERE key = ? AND expires_at >= ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        self._remember(key, row[0], row[1])
+        return row[0]
+
+    def set(self, key, model_name, response):
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, response, expires_at)
+        with self.pool.connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, response, expires_at) VALUES (?, ?, ?, ?)",
+                (key, model_name, response, expires_at),
+            )
+
+    def _remember(self, key, response, expires_at):
+        with self._lock:
+            self._memory[key] = (response, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+
+class LLMClient:
+    """Cached, single-flight access to an LLM backend shared by every session"""
+
+    def __init__(self, backend, cache=None):
+        self.backend = backend
+        self.cache = cache
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def ask(self, prompt, user_id=None):
+        """Return the response text; raises if the upstream call fails (errors are never cached)"""
+        key = cache_key(self.backend.model_name, prompt)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                with self._lock:
+                    self.hits += 1
+                return cached
+
+        while True:
+            with self._lock:
+                future = self._in_flight.get(key)
+                leader = future is None
+                if leader:
+                    future = self._in_flight[key] = Future()
+                    self.misses += 1
+                else:
+                    # Identical prompt already on its way upstream: wait for that answer
+                    self.coalesced += 1
+                    self.hits += 1
+            if leader:
+                break
+            try:
+                return future.result()
+            except RateLimitedError:
+                # The leader hit its own per-user limit, not ours: ask again, leading if nobody else is
+                with self._lock:
+                    self.coalesced -= 1
+                    self.hits -= 1
+
+        try:
+            response = self.backend.generate(prompt, user_id=user_id)
+            if self.cache is not None:
+                self.cache.set(key, self.backend.model_name, response)
+        except Exception as e:
+            # Leave the in-flight table before waking followers, so a retrying follower starts a new request
+            self._finish(key)
+            future.set_exception(e)
+            raise
+        self._finish(key)
+        future.set_result(response)
+        return response
+
+    def _finish(self, key):
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+    def stream(self, prompt, user_id=None):
+        """Yield the response piece by piece; a cached answer arrives as a single piece"""
+        key = cache_key(self.backend.model_name, prompt)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                with self._lock:
+                    self.hits += 1
+                yield cached
+                return
+
+        with self._lock:
+            self.misses += 1
+        pieces = []
+        for piece in self.backend.stream(prompt, user_id=user_id):
+            pieces.append(piece)
+            yield piece
+        if self.cache is not None:
+            self.cache.set(key, self.backend.model_name, "".join(pieces))
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def make_backend(name=None):
+    name = (name or Config.LLM_BACKEND).lower()
+    if name == "fake":
+        return FakeBackend()
+    from llm_gateway import get_gateway
+    return GatewayBackend(get_gateway())
+
+
+def get_llm_client():
+    """Process-wide client used by ai_helper and gemini_api"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = LLMClient(make_backend(), ResponseCache())
+        return _default_client
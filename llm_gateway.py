@@ -0,0 +1,320 @@
+import asyncio
+import queue
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from urllib.parse import urlparse
+
+from config import Config
+
+
+class LLMError(Exception):
+    """An LLM request failed and should not be retried"""
+
+
+class TransientLLMError(LLMError):
+    """Upstream overload, 5xx or a dropped connection; safe to retry"""
+
+
+class LLMTimeoutError(TransientLLMError):
+    """No token arrived before the request deadline"""
+
+
+class QueueTimeoutError(LLMError):
+    """Every LLM slot stayed busy until the deadline; upstream was never called"""
+
+
+class RateLimitedError(LLMError):
+    """The user has sent too many requests in the current window"""
+
+
+class CircuitOpenError(LLMError):
+    """Upstream has been failing; requests are rejected until it recovers"""
+
+
+class SlidingWindowLimiter:
+    """At most max_calls per key in any window_seconds span"""
+
+    def __init__(self, max_calls, window_seconds=60.0):
+        self.max_calls = max_calls
+        self.window_seconds = window_seconds
+        self._calls = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        now = time.monotonic()
+        with self._lock:
+            calls = self._calls[key]
+            while calls and calls[0] <= now - self.window_seconds:
+                calls.popleft()
+            if len(calls) >= self.max_calls:
+                return False
+            calls.append(now)
+            return True
+
+
+class CircuitBreaker:
+    """Open after failure_threshold consecutive failures, let one trial call through after reset_seconds"""
+
+    def __init__(self, failure_threshold=5, reset_seconds=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_progress = False
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == "open" or (state == "half-open" and self.trial_in_progress):
+                raise CircuitOpenError("Upstream LLM is unavailable, please try again shortly")
+            if state == "half-open":
+                self.trial_in_progress = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_progress = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial_in_progress or (self.opened_at is None and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self.trips += 1
+            self.trial_in_progress = False
+
+    def abandon_trial(self):
+        """The trial call ended without a verdict (cancelled); let the next caller try"""
+        with self._lock:
+            self.trial_in_progress = False
+
+
+class AsyncGeminiBackend:
+    """Streams Gemini tokens with google-generativeai's async API"""
+
+    def __init__(self, model_name=None):
+        import google.generativeai as genai
+
+        # Configured here rather than in config.py, so importing Config stays cheap
+        if Config.GEMINI_API_KEY:
+            genai.configure(api_key=Config.GEMINI_API_KEY)
+        self.model_name = model_name or Config.LLM_MODEL
+        self.model = genai.GenerativeModel(self.model_name)
+
+    async def stream(self, prompt):
+        from google.api_core import exceptions as api_exceptions
+
+        transient = (api_exceptions.ServiceUnavailable, api_exceptions.ResourceExhausted,
+                     api_exceptions.DeadlineExceeded, api_exceptions.InternalServerError)
+        try:
+            response = await self.model.generate_content_async(prompt, stream=True)
+            async for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+        except transient as e:
+            raise TransientLLMError(str(e)) from e
+        except api_exceptions.GoogleAPIError as e:
+            raise LLMError(str(e)) from e
+
+
+class HTTPStubBackend:
+    """Talks to benchmarks/llm_stub_server.py: POST the prompt, read one token per line"""
+
+    def __init__(self, url=None, model_name="stub"):
+        parsed = urlparse(url or Config.LLM_STUB_URL)
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.model_name = model_name
+
+    async def stream(self, prompt):
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        except OSError as e:
+            raise TransientLLMError(f"Cannot reach LLM stub: {e}") from e
+        try:
+            body = prompt.encode("utf-8")
+            writer.write(b"POST /generate HTTP/1.1\r\nHost: stub\r\nContent-Length: %d\r\n\r\n%s"
+                         % (len(body), body))
+            await writer.drain()
+
+            status_line = await reader.readline()
+            if not status_line:
+                raise TransientLLMError("LLM stub closed the connection")
+            status = int(status_line.split()[1])
+            while (await reader.readline()) not in (b"\r\n", b""):
+                pass  # Skip headers
+            if status >= 500 or status == 429:
+                raise TransientLLMError(f"LLM stub returned {status}")
+            if status >= 400:
+                raise LLMError(f"LLM stub returned {status}")
+
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                yield line.decode("utf-8").rstrip("\n")
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            raise TransientLLMError(str(e)) from e
+        finally:
+            writer.close()
+
+
+class LLMGateway:
+    """Concurrency-limited, rate-limited, deadline-bound access to a streaming LLM backend"""
+
+    def __init__(self, backend, max_concurrency=None, user_calls_per_minute=None, timeout=None,
+                 first_token_timeout=None, max_retries=None, breaker=None):
+        self.backend = backend
+        self.model_name = backend.model_name
+        self.max_concurrency = max_concurrency or Config.LLM_MAX_CONCURRENCY
+        self.limiter = SlidingWindowLimiter(user_calls_per_minute or Config.LLM_USER_CALLS_PER_MINUTE)
+        self.timeout = timeout or Config.LLM_TIMEOUT_SECONDS
+        self.first_token_timeout = first_token_timeout or Config.LLM_FIRST_TOKEN_TIMEOUT_SECONDS
+        self.max_retries = max_retries if max_retries is not None else Config.LLM_MAX_RETRIES
+        self.breaker = breaker or CircuitBreaker(Config.LLM_BREAKER_FAILURES, Config.LLM_BREAKER_RESET_SECONDS)
+        self.retries = 0
+        self._semaphore = None
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    async def stream(self, prompt, user_id=None, timeout=None):
+        """Yield response text pieces as they arrive.
+
+        Transient failures are retried with full-jitter backoff, but only
+        before the first token has been handed to the caller.
+        """
+        if user_id is not None and not self.limiter.allow(user_id):
+            raise RateLimitedError("Too many questions in a short time, please wait a moment")
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+        attempt = 0
+        while True:
+            # Waiting for a local slot says nothing about upstream health, so it
+            # happens before the breaker is consulted and a timeout here is
+            # neither recorded as a failure nor retried
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                raise QueueTimeoutError("The assistant is busy, please try again in a moment") from None
+            try:
+                self.breaker.before_call()
+            except BaseException:
+                self._semaphore.release()
+                raise
+            yielded = False
+            try:
+                try:
+                    chunks = self.backend.stream(prompt)
+                    try:
+                        while True:
+                            remaining = deadline - loop.time()
+                            if not yielded:
+                                remaining = min(remaining, self.first_token_timeout)
+                            if remaining <= 0:
+                                raise LLMTimeoutError("LLM request timed out")
+                            try:
+                                chunk = await asyncio.wait_for(chunks.__anext__(), remaining)
+                            except StopAsyncIteration:
+                                break
+                            except asyncio.TimeoutError:
+                                raise LLMTimeoutError("LLM request timed out") from None
+                            yielded = True
+                            yield chunk
+                    finally:
+                        await chunks.aclose()
+                finally:
+                    self._semaphore.release()
+                self.breaker.record_success()
+                return
+            except TransientLLMError:
+                self.breaker.record_failure()
+                backoff = random.uniform(0, min(Config.LLM_RETRY_MAX_BACKOFF_SECONDS,
+                                                Config.LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+                if yielded or attempt >= self.max_retries or loop.time() + backoff >= deadline:
+                    raise
+                attempt += 1
+                self.retries += 1
+                await asyncio.sleep(backoff)
+            except LLMError:
+                # Upstream answered, it just refused this request
+                self.breaker.record_success()
+                raise
+            except (GeneratorExit, asyncio.CancelledError):
+                self.breaker.abandon_trial()
+                raise
+
+    async def generate(self, prompt, user_id=None, timeout=None):
+        return "".join([chunk async for chunk in self.stream(prompt, user_id, timeout)])
+
+    def _event_loop(self):
+        """Background event loop shared by all Streamlit script threads"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="llm-gateway", daemon=True).start()
+            return self._loop
+
+    def generate_sync(self, prompt, user_id=None, timeout=None):
+        """Blocking call for synchronous code such as Streamlit scripts"""
+        future = asyncio.run_coroutine_threadsafe(self.generate(prompt, user_id, timeout), self._event_loop())
+        return future.result()
+
+    def stream_sync(self, prompt, user_id=None, timeout=None):
+        """Synchronous generator over stream(), suitable for st.write_stream"""
+        pieces = queue.Queue()
+
+        async def pump():
+            try:
+                async for chunk in self.stream(prompt, user_id, timeout):
+                    pieces.put(("chunk", chunk))
+                pieces.put(("done", None))
+            except BaseException as e:
+                pieces.put(("error", e))
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self._event_loop())
+        try:
+            while True:
+                kind, value = pieces.get()
+                if kind == "chunk":
+                    yield value
+                elif kind == "error":
+                    raise value
+                else:
+                    return
+        finally:
+            future.cancel()  # The reader went away early; stop the upstream request too
+
+
+_default_gateway = None
+_default_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """Process-wide gateway for the configured upstream ("gemini" or "stub")"""
+    global _default_gateway
+    with _default_gateway_lock:
+        if _default_gateway is None:
+            if Config.LLM_BACKEND.lower() == "stub":
+                backend = HTTPStubBackend()
+            else:
+                backend = AsyncGeminiBackend()
+            _default_gateway = LLMGateway(backend)
+        return _default_gateway
@@ -1,14 +1,19 @@
+import time
 import streamlit as st
-from transformers import pipeline
 from transformers.pipelines import PipelineException
+from config import Config
+from modules.inference_backends import load_qa
+from modules.inference_server import MicroBatcher
+from modules.qa_context import ContextCache, forward_pairs
+from modules.semantic_cache import get_semantic_cache, sentence_around
+from ai_helper import stream_ai
+from llm_gateway import LLMError
 
 @st.cache_resource(show_spinner="Loading QA model...")
-def load_qa_pipeline():
+def load_qa_pipeline(backend=None):
     try:
-        # Load a lightweight, fast local model
-        model_name = "distilbert-base-cased-distilled-squad"
-        qa_pipeline = pipeline("question-answering", model=model_name, tokenizer=model_name)
-        return qa_pipeline
+        # Load a lightweight, fast local model on the configured CPU backend
+        return load_qa(backend or Config.INFERENCE_BACKEND)
     except PipelineException as e:
         st.error("❌ Failed to load model pipeline. Please check your internet or model name.")
         raise e
@@ -16,27 +21,83 @@ def load_qa_pipeline():
         st.error(f"❌ An unexpected error occurred: {e}")
         raise e
 
+@st.cache_resource
+def get_qa_batcher():
+    """Process-wide DistilBERT micro-batcher over (question, window) pairs, shared by every session"""
+    qa_pipeline = load_qa_pipeline()
+    return MicroBatcher(
+        lambda sequences: forward_pairs(qa_pipeline.model, qa_pipeline.tokenizer, sequences),
+        # 0 (everything in one pass) lets a batch take whatever is queued
+        max_batch_size=Config.ASK_AI_PAIRS_PER_PASS or float("inf"),
+        max_wait_ms=Config.INFERENCE_MAX_WAIT_MS,
+        name="qa-batcher",
+    )
+
+@st.cache_resource
+def get_context_cache():
+    """Process-wide cache of tokenized passages and their answers, shared by every session"""
+    return ContextCache()
+
 class AskAI:
     def __init__(self, api_key=None):
         self.api_key = api_key  # For future use with cloud APIs if needed
         self.qa_pipeline = load_qa_pipeline()
+        self.qa_batcher = get_qa_batcher()
+        self.contexts = get_context_cache()
+        self.answer_cache = get_semantic_cache()
+
+    def answer(self, passage, questions):
+        """Answers about a passage; paraphrases of questions already asked about it reuse their answers"""
+        namespace = ("ask-ai", passage.hash)
+        vectors = self.answer_cache.vectors(questions)
+        results = [self.answer_cache.lookup(namespace, q, v) for q, v in zip(questions, vectors)]
+        misses = [i for i, result in enumerate(results) if result is None]
+        if misses:
+            start = time.perf_counter()
+            answered = passage.answer(self.qa_pipeline.model, [questions[i] for i in misses],
+                                      batcher=self.qa_batcher)
+            cost = (time.perf_counter() - start) / len(misses)
+            for i, result in zip(misses, answered):
+                evidence = sentence_around(passage.text, result["start"], result["end"])
+                self.answer_cache.store(namespace, questions[i], result, cost, vectors[i], evidence)
+                results[i] = result
+        return [dict(result, question=q) for q, result in zip(questions, results)]
 
     def show_interface(self):
         st.title("💬 Ask AI (Offline - Local Model)")
 
-        st.markdown("This uses a local transformer model (`distilbert-base-cased-distilled-squad`) for QA.")
+        st.markdown(f"This uses a local transformer model (`distilbert-base-cased-distilled-squad`, "
+                    f"`{Config.INFERENCE_BACKEND}` backend) for QA.")
         
         context = st.text_area("📄 Enter context or paragraph:")
-        question = st.text_input("❓ Ask a question about the above context:")
+        questions = st.text_area("❓ Ask questions about the above context (one per line):")
+        questions = [q.strip() for q in questions.splitlines() if q.strip()]
 
-        if st.button("Get Answer"):
-            if context.strip() and question.strip():
+        if st.button("Get Answers"):
+            if context.strip() and questions:
                 with st.spinner("Thinking..."):
                     try:
-                        result = self.qa_pipeline(question=question, context=context)
-                        st.success("✅ Answer:")
-                        st.write(f"**{result['answer']}**")
+                        # The passage is tokenized once; its (question, window) pairs share
+                        # batched passes with other sessions' questions
+                        passage = self.contexts.get(context, self.qa_pipeline.tokenizer)
+                        for result in self.answer(passage, questions):
+                            st.markdown(f"**❓ {result['question']}**")
+                            st.success(f"✅ {result['answer'] or 'No answer found.'}")
+                            st.caption(f"Confidence: {result['score']:.2f}")
                     except Exception as e:
                         st.error(f"❌ Failed to get answer: {e}")
             else:
-                st.warning("⚠️ Please enter both context and question.")
\ No newline at end of file
+                st.warning("⚠️ Please enter both context and at least one question.")
+
+        with st.expander("🌐 Ask Gemini (online)"):
+            prompt = st.text_area("💭 Ask anything:", key="gemini_prompt")
+            if st.button("Ask Gemini"):
+                if prompt.strip():
+                    user = st.session_state.get('user', {})
+                    try:
+                        # Tokens are rendered as they arrive instead of after the full answer
+                        st.write_stream(stream_ai(prompt, user_id=user.get('username')))
+                    except LLMError as e:
+                        st.error(f"❌ {e}")
+                else:
+                    st.warning("⚠️ Please enter a question.")
\ No newline at end of file
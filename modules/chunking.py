@@ -0,0 +1,81 @@
+"""Token-accurate, overlapping chunks of a page stream, for retrieval in front of a fixed-window model.
+
+Counting whitespace words says little about how many model tokens a chunk
+takes, so chunks overflowed T5's window unpredictably. TokenChunker
+tokenizes pages in batches with a fast (Rust) tokenizer, which also gives
+each token's character offsets. It then cuts chunks of exactly max_tokens
+tokens, each repeating the last `overlap` tokens of the one before so that
+an answer straddling a boundary appears whole in one of them. Chunks carry
+their character span in the pages joined by newlines (the layout
+ParsedDocument.text uses), so a chunk maps back to its page. It is a
+generator holding only the current chunk's pages, so memory stays bounded
+on large documents.
+"""
+from collections import deque
+from itertools import islice
+
+from config import Config
+
+
+class TokenChunker:
+    """Cuts page texts into chunks of at most max_tokens tokens, consecutive chunks sharing overlap tokens"""
+
+    def __init__(self, tokenizer, max_tokens=None, overlap=None, batch_pages=None):
+        if not getattr(tokenizer, "is_fast", False):
+            raise ValueError("TokenChunker needs a fast tokenizer for character offsets")
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens or Config.PDF_QA_CHUNK_TOKENS
+        self.overlap = overlap if overlap is not None else Config.PDF_QA_CHUNK_OVERLAP
+        if not 0 <= self.overlap < self.max_tokens:
+            raise ValueError("overlap must be smaller than max_tokens")
+        self.batch_pages = batch_pages or Config.PDF_QA_TOKENIZE_BATCH
+
+    def _tokenized(self, pages):
+        """(page, token character spans) for each page, tokenizing batch_pages pages per call"""
+        pages = iter(pages)
+        while True:
+            batch = list(islice(pages, self.batch_pages))
+            if not batch:
+                return
+            encoding = self.tokenizer(batch, add_special_tokens=False, return_offsets_mapping=True,
+                                      verbose=False)
+            yield from zip(batch, encoding["offset_mapping"])
+
+    def iter_chunks(self, pages):
+        """Yield (text, start, end) per chunk; start and end are character offsets into "\\n".join(pages)"""
+        segments = deque()  # (offset, page text) of the pages the pending tokens come from
+        starts = deque()  # Character offset of each pending token
+        end = 0  # Where the last token ends
+        fresh = 0  # Pending tokens not yet part of any emitted chunk
+        offset = 0
+        for page, spans in self._tokenized(pages):
+            segments.append((offset, page))
+            for token_start, token_end in spans:
+                starts.append(offset + token_start)
+                end = offset + token_end
+                fresh += 1
+                if len(starts) == self.max_tokens:
+                    yield self._chunk(segments, starts[0], end)
+                    for _ in range(self.max_tokens - self.overlap):
+                        starts.popleft()
+                    fresh = 0
+                    while segments and starts and segments[0][0] + len(segments[0][1]) < starts[0]:
+                        segments.popleft()
+            offset += len(page) + 1
+            if not starts:
+                segments.clear()
+        if fresh:
+            yield self._chunk(segments, starts[0], end)
+
+    @staticmethod
+    def _chunk(segments, start, end):
+        parts = []
+        for offset, page in segments:
+            if offset > end:
+                break
+            if offset + len(page) >= start:
+                parts.append(page[max(start - offset, 0):end - offset])
+        return "\n".join(parts), start, end
+
+    def chunk_text(self, text):
+        return [chunk for chunk, _, _ in self.iter_chunks([text])]
@@ -0,0 +1,322 @@
+"""Course library: material educators publish once for a whole class, searchable by every student in it.
+
+Documents are parsed and chunked like PDF Q&A uploads (token-accurate T5
+chunks) and each chunk is embedded once. Chunk text and metadata live in
+the library_* tables; the normalized embeddings live in one FAISS
+IndexIDMap2 saved next to the database. Adding or removing a document adds
+or removes just its vectors, never a rebuild. A vector's ID carries its
+class in the high bits, so a student's search is limited to their class by
+an ID range selector. SQLite is the source of truth: on load, chunks the
+index file is missing (a crash between the commit and the save) are
+embedded again and vectors of deleted chunks are dropped.
+"""
+import bisect
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+import faiss
+import numpy as np
+import streamlit as st
+
+from config import Config
+from database import get_pool
+from modules.document_store import hash_document
+from modules.pdf_extract import describe_failures, iter_pages
+
+# Vector ID = class ID << CLASS_SHIFT | chunk ID
+CLASS_SHIFT = 40
+CHUNK_MASK = (1 << CLASS_SHIFT) - 1
+
+
+def vector_id(class_id, chunk_id):
+    return (class_id << CLASS_SHIFT) | chunk_id
+
+
+class CourseLibrary:
+    """Documents grouped by class, with one incrementally updated vector index over all their chunks"""
+
+    def __init__(self, db_path=None, index_path=None, embedder=None, chunk_pages=None, encoding=None):
+        self.pool = get_pool(db_path)
+        self.index_path = Path(index_path or Config.COURSE_LIBRARY_INDEX)
+        self.encoding = (encoding or Config.COURSE_INDEX_ENCODING).lower()
+        self._embedder = embedder
+        self._chunk_pages = chunk_pages
+        self._lock = threading.RLock()
+        self.index = None
+        self.dirty = False
+        self._load()
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            from modules.retrieval import load_embedder
+            self._embedder = load_embedder()
+            if self._embedder is None:
+                raise RuntimeError("The course library needs the sentence-transformers embedding model")
+        return self._embedder
+
+    def chunk_pages(self, pages):
+        """(text, start, end) chunks of an iterable of page texts; T5-token chunks unless given another chunker"""
+        if self._chunk_pages is None:
+            from modules.chunking import TokenChunker
+            from modules.pdf_qa import load_model
+            self._chunk_pages = TokenChunker(load_model()[0]).iter_chunks
+        return self._chunk_pages(pages)
+
+    def embed(self, texts):
+        return self.embedder.encode(list(texts), batch_size=Config.COURSE_EMBED_BATCH, convert_to_numpy=True,
+                                    normalize_embeddings=True).astype("float32")
+
+    def _new_index(self, dimension):
+        if self.encoding == "fp16":
+            vectors = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT)
+        else:
+            vectors = faiss.IndexFlatIP(dimension)
+        return faiss.IndexIDMap2(vectors)
+
+    def _load(self):
+        if self.index_path.exists():
+            try:
+                self.index = faiss.read_index(str(self.index_path))
+            except RuntimeError as e:
+                print(f"Rebuilding unreadable course index {self.index_path}: {e}")
+        self._reconcile()
+
+    def _reconcile(self):
+        """Make the index hold exactly the chunks in the database"""
+        wanted = {vid for vid, in self.pool.query(f"SELECT (class_id << {CLASS_SHIFT}) | id FROM library_chunks")}
+        stored = set(faiss.vector_to_array(self.index.id_map).tolist()) if self.index is not None else set()
+        stale, missing = stored - wanted, sorted(wanted - stored)
+        if stale:
+            self.index.remove_ids(np.array(sorted(stale), dtype="int64"))
+        for begin in range(0, len(missing), 1000):
+            batch = [vid & CHUNK_MASK for vid in missing[begin:begin + 1000]]
+            rows = self.pool.query(f"SELECT id, class_id, text FROM library_chunks WHERE id IN "
+                                   f"({','.join('?' * len(batch))})", batch)
+            self._add_vectors(self.embed(text for _, _, text in rows),
+                              [vector_id(class_id, chunk_id) for chunk_id, class_id, _ in rows])
+        if stale or missing:
+            print(f"Course index caught up with the library: {len(missing)} chunks added, {len(stale)} removed")
+            self.save()
+
+    def _add_vectors(self, vectors, ids):
+        if self.index is None:
+            self.index = self._new_index(vectors.shape[1])
+        elif self.index.d != vectors.shape[1]:
+            raise ValueError(f"Embeddings have {vectors.shape[1]} dimensions but the course index has {self.index.d}")
+        self.index.add_with_ids(vectors, np.array(ids, dtype="int64"))
+        self.dirty = True
+
+    def save(self):
+        """Write the index to disk (atomically) if it changed since the last save"""
+        with self._lock:
+            if self.index is None or not self.dirty:
+                return
+            tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+            faiss.write_index(self.index, str(tmp_path))
+            os.replace(tmp_path, self.index_path)
+            self.dirty = False
+
+    def _class_id(self, conn, class_name, create=False):
+        row = conn.execute("SELECT id FROM library_classes WHERE name = ?", (class_name,)).fetchone()
+        if row is None and create:
+            return conn.execute("INSERT INTO library_classes (name) VALUES (?)", (class_name,)).lastrowid
+        return row[0] if row else None
+
+    def _existing(self, class_name, doc_hash):
+        row = self.pool.execute("SELECT d.id FROM library_documents d JOIN library_classes c ON c.id = d.class_id "
+                                "WHERE c.name = ? AND d.doc_hash = ?", (class_name, doc_hash)).fetchone()
+        return row[0] if row else None
+
+    def add_document(self, data, title, class_name, uploaded_by=None, save=True, failed=None):
+        """Publish a PDF (raw bytes) to a class; returns its document ID, or None if it has no text.
+
+        Pages whose text could not be extracted are appended to failed (see iter_pages).
+        """
+        doc_hash = hash_document(data)
+        existing = self._existing(class_name.strip(), doc_hash)
+        if existing is not None:
+            return existing
+        return self.add_pages((text for _, text in iter_pages(data, failed=failed)), title, class_name, uploaded_by,
+                              doc_hash=doc_hash, save=save)
+
+    def add_pages(self, pages, title, class_name, uploaded_by=None, doc_hash=None, save=True):
+        """Publish a document given as page texts; returns its document ID, or None if it has no text"""
+        class_name = class_name.strip()
+        page_offsets = []
+        digest = hashlib.sha256()
+
+        def stream_pages():
+            offset = 0
+            for page in pages:
+                page_offsets.append(offset)
+                digest.update(page.encode("utf-8") + b"\n")
+                offset += len(page) + 1
+                yield page
+
+        chunks, chunk_pages = [], []
+        for text, start, _ in self.chunk_pages(stream_pages()):
+            chunks.append(text)
+            chunk_pages.append(max(bisect.bisect_right(page_offsets, start) - 1, 0))
+        doc_hash = doc_hash or digest.hexdigest()
+        existing = self._existing(class_name, doc_hash)
+        if existing is not None or not chunks:
+            return existing
+        vectors = self.embed(chunks)
+
+        with self._lock:
+            with self.pool.transaction() as conn:
+                class_id = self._class_id(conn, class_name, create=True)
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO library_documents (class_id, doc_hash, title, uploaded_by, pages, chunks) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", (class_id, doc_hash, title, uploaded_by, len(page_offsets), len(chunks)))
+                if not cursor.rowcount:
+                    return self._existing(class_name, doc_hash)  # Published meanwhile by someone else
+                document_id = cursor.lastrowid
+                chunk_ids = [conn.execute("INSERT INTO library_chunks (document_id, class_id, page, text) "
+                                          "VALUES (?, ?, ?, ?)", (document_id, class_id, page, text)).lastrowid
+                             for text, page in zip(chunks, chunk_pages)]
+            self._add_vectors(vectors, [vector_id(class_id, chunk_id) for chunk_id in chunk_ids])
+            if save:
+                self.save()
+        return document_id
+
+    def remove_document(self, document_id, uploaded_by=None, save=True):
+        """Unpublish a document and drop its vectors; returns whether it was removed.
+
+        With uploaded_by, only a document that user published is removed.
+        """
+        with self._lock:
+            with self.pool.transaction() as conn:
+                owner = conn.execute("SELECT uploaded_by FROM library_documents WHERE id = ?",
+                                     (document_id,)).fetchone()
+                if owner is None or (uploaded_by is not None and owner[0] != uploaded_by):
+                    return False
+                ids = [vid for vid, in conn.execute(f"SELECT (class_id << {CLASS_SHIFT}) | id FROM library_chunks "
+                                                    "WHERE document_id = ?", (document_id,))]
+                conn.execute("DELETE FROM library_chunks WHERE document_id = ?", (document_id,))
+                removed = conn.execute("DELETE FROM library_documents WHERE id = ?", (document_id,)).rowcount
+            if ids and self.index is not None:
+                self.index.remove_ids(np.array(ids, dtype="int64"))
+                self.dirty = True
+            if save:
+                self.save()
+        return bool(removed)
+
+    def classes(self):
+        """Names of the classes that have at least one document"""
+        return [name for name, in self.pool.query(
+            "SELECT name FROM library_classes c WHERE EXISTS "
+            "(SELECT 1 FROM library_documents d WHERE d.class_id = c.id) ORDER BY name")]
+
+    def documents(self, class_name=None):
+        sql = ("SELECT d.id, d.title, c.name, d.uploaded_by, d.pages, d.chunks, d.created_at "
+               "FROM library_documents d JOIN library_classes c ON c.id = d.class_id")
+        if class_name:
+            rows = self.pool.query(sql + " WHERE c.name = ? ORDER BY d.title", (class_name,))
+        else:
+            rows = self.pool.query(sql + " ORDER BY c.name, d.title")
+        keys = ("id", "title", "class_name", "uploaded_by", "pages", "chunks", "created_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def search(self, question, k=None, class_name=None):
+        """The k chunks closest to the question (in one class, or the whole library), best first"""
+        k = k or Config.PDF_QA_TOP_K
+        if self.index is None or self.index.ntotal == 0:
+            return []
+        params = None
+        if class_name is not None:
+            class_id = self._class_id(self.pool.connection(), class_name)
+            if class_id is None:
+                return []
+            # Only vectors whose IDs fall in this class's range are scored
+            selector = faiss.IDSelectorRange(class_id << CLASS_SHIFT, (class_id + 1) << CLASS_SHIFT)
+            params = faiss.SearchParameters(sel=selector)
+        query = self.embed([question])
+        with self._lock:
+            scores, ids = self.index.search(query, k, params=params)
+        hits = {int(vid) & CHUNK_MASK: float(score) for vid, score in zip(ids[0], scores[0]) if vid >= 0}
+        if not hits:
+            return []
+        rows = self.pool.query(
+            "SELECT c.id, c.text, c.page, d.id, d.title FROM library_chunks c "
+            f"JOIN library_documents d ON d.id = c.document_id WHERE c.id IN ({','.join('?' * len(hits))})", list(hits))
+        results = [{"text": text, "page": page, "document_id": document_id, "title": title, "score": hits[chunk_id]}
+                   for chunk_id, text, page, document_id, title in rows]
+        return sorted(results, key=lambda hit: hit["score"], reverse=True)
+
+    def __len__(self):
+        return self.index.ntotal if self.index is not None else 0
+
+    def nbytes(self):
+        """Approximate memory held by the index: vector codes plus the two ID maps"""
+        if self.index is None:
+            return 0
+        return self.index.ntotal * (self.index.index.sa_code_size() + 8 + 16)
+
+    def show_educator_interface(self, user):
+        st.title("📚 Course Library")
+        st.caption("Documents published here can be searched by every student in the class.")
+
+        classes = self.classes()
+        choice = st.selectbox("Class", classes + ["➕ New class"])
+        class_name = st.text_input("New class name") if choice == "➕ New class" else choice
+
+        uploaded = st.file_uploader("Add PDF documents", type=["pdf"], accept_multiple_files=True)
+        if st.button("Publish to class") and uploaded:
+            if not class_name or not class_name.strip():
+                st.warning("⚠️ Please name the class.")
+            else:
+                for file in uploaded:
+                    with st.spinner(f"Processing {file.name}..."):
+                        failed = []
+                        try:
+                            if self.add_document(file.getvalue(), file.name, class_name, user.get('username'),
+                                                 failed=failed):
+                                st.success(f"✅ Published {file.name}")
+                            else:
+                                st.warning(f"No text found in {file.name}.")
+                        except Exception as e:
+                            st.error(f"❌ Could not publish {file.name}: {e}")
+                        if failed:
+                            st.warning(f"{file.name}: {describe_failures(failed)}")
+
+        if class_name and class_name.strip():
+            for document in self.documents(class_name.strip()):
+                col1, col2 = st.columns([4, 1])
+                col1.markdown(f"**{document['title']}** · {document['pages']} pages, {document['chunks']} chunks"
+                              f" · by {document['uploaded_by'] or 'unknown'}")
+                # Educators can only unpublish what they published themselves
+                if document['uploaded_by'] == user.get('username') and \
+                        col2.button("Remove", key=f"library_remove_{document['id']}"):
+                    if self.remove_document(document['id'], uploaded_by=user.get('username')):
+                        st.rerun()
+                    st.error(f"❌ Could not remove {document['title']}.")
+
+    def show_student_interface(self, pdf_qa):
+        st.title("📚 Course Library")
+        classes = self.classes()
+        if not classes:
+            st.info("Your teachers have not published any course material yet.")
+            return
+        # There is no class enrollment yet, so every student can read every class's material
+        class_name = st.selectbox("Class", classes)
+        question = st.text_input("Ask a question about your course material:")
+        if question:
+            with st.spinner("Searching the course material..."):
+                hits = self.search(question, class_name=class_name)
+                if not hits:
+                    st.warning("Nothing relevant found in this class's material.")
+                    return
+                answer = pdf_qa.ask_question(" ".join(hit["text"] for hit in hits), question)
+            st.write(f"🧠 Answer: **{answer}**")
+            sources = dict.fromkeys(f"{hit['title']} (page {hit['page'] + 1})" for hit in hits)
+            st.caption("Sources: " + "; ".join(sources))
+
+
+@st.cache_resource(show_spinner="Loading course library...")
+def get_course_library():
+    """Process-wide course library shared by all sessions"""
+    return CourseLibrary()
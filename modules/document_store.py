@@ -0,0 +1,170 @@
+import bisect
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import streamlit as st
+from config import Config
+
+
+def hash_document(data):
+    """SHA-256 hex digest of the raw uploaded bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ParsedDocument:
+    """Everything derived from one PDF: text, page offsets, chunks and retrieval index"""
+
+    # Bumped whenever parsing or chunking changes, so older cached documents are parsed again
+    VERSION = 3
+
+    def __init__(self, doc_hash, text, page_offsets, chunks, index=None, chunk_offsets=None, complete=True):
+        self.doc_hash = doc_hash
+        self.text = text
+        self.page_offsets = page_offsets  # character offset where each page starts in text
+        self.chunks = chunks
+        self.index = index
+        self.chunk_offsets = chunk_offsets  # (start, end) of each chunk in text
+        self.complete = complete  # False if some pages could not be read; such documents are not cached
+        self.version = self.VERSION
+
+    @property
+    def num_pages(self):
+        return len(self.page_offsets)
+
+    def page_for_offset(self, offset):
+        """Return the 0-based page number containing a character offset"""
+        return max(bisect.bisect_right(self.page_offsets, offset) - 1, 0)
+
+    def pages_for_chunk(self, chunk_id):
+        """0-based page numbers a chunk spans"""
+        start, end = self.chunk_offsets[chunk_id]
+        return list(range(self.page_for_offset(start), self.page_for_offset(max(end - 1, start)) + 1))
+
+    def size_bytes(self):
+        """Rough in-memory footprint, used to bound the memory tier"""
+        size = len(self.text) + sum(len(c) for c in self.chunks) + 8 * len(self.page_offsets)
+        if self.index is not None:
+            size += self.index.nbytes()
+        return size
+
+
+class DocumentStore:
+    """Two-tier cache of parsed PDFs keyed by content hash: in-memory LRU plus pickles on disk"""
+
+    def __init__(self, cache_dir=None, max_memory_bytes=None, max_disk_bytes=None):
+        self.cache_dir = Path(cache_dir or Config.PDF_CACHE_DIR)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_memory_bytes = max_memory_bytes or Config.PDF_CACHE_MEMORY_MB * 1024 * 1024
+        self.max_disk_bytes = max_disk_bytes or Config.PDF_CACHE_DISK_MB * 1024 * 1024
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        # One lock per hash so concurrent uploads of the same file are parsed once
+        self._parse_locks = {}
+
+    def _path(self, doc_hash):
+        return self.cache_dir / f"{doc_hash}.pkl"
+
+    def get(self, doc_hash):
+        """Return a cached document from memory or disk, or None"""
+        with self._lock:
+            doc = self._memory.get(doc_hash)
+            if doc is not None:
+                self._memory.move_to_end(doc_hash)
+                return doc
+
+        path = self._path(doc_hash)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "rb") as f:
+                doc = pickle.load(f)
+            os.utime(path)  # Disk tier evicts by least recent access
+        except Exception as e:
+            print(f"Discarding unreadable cached document {doc_hash}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+        if getattr(doc, "version", None) != ParsedDocument.VERSION:
+            path.unlink(missing_ok=True)
+            return None
+
+        self._remember(doc)
+        return doc
+
+    def put(self, doc):
+        """Store a document in both tiers"""
+        self._remember(doc)
+        path = self._path(doc.doc_hash)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(doc, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Could not write document cache {path}: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return
+        self._prune_disk()
+
+    def get_or_parse(self, data, parse):
+        """Return the parsed document for these bytes, calling parse(data, doc_hash) only on a miss.
+
+        Incomplete or empty parses are returned but not stored, so the next
+        upload of the same file is parsed again instead of staying broken.
+        """
+        doc_hash = hash_document(data)
+        doc = self.get(doc_hash)
+        if doc is not None:
+            return doc
+
+        with self._lock:
+            parse_lock = self._parse_locks.setdefault(doc_hash, threading.Lock())
+        with parse_lock:
+            doc = self.get(doc_hash)
+            if doc is None:
+                doc = parse(data, doc_hash)
+                if doc.complete and doc.chunks:
+                    self.put(doc)
+        with self._lock:
+            self._parse_locks.pop(doc_hash, None)
+        return doc
+
+    def _remember(self, doc):
+        size = doc.size_bytes()
+        with self._lock:
+            old = self._memory.pop(doc.doc_hash, None)
+            if old is not None:
+                self._memory_bytes -= old.size_bytes()
+            if size > self.max_memory_bytes:
+                return  # Too big for the memory tier; served from disk instead
+            self._memory[doc.doc_hash] = doc
+            self._memory_bytes += size
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted.size_bytes()
+
+    def _prune_disk(self):
+        entries = []
+        for path in self.cache_dir.glob("*.pkl"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+@st.cache_resource
+def get_document_store():
+    """Process-wide document store shared by all sessions"""
+    return DocumentStore()
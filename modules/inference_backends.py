@@ -0,0 +1,81 @@
+from pathlib import Path
+
+import torch
+from transformers import (
+    AutoModelForQuestionAnswering,
+    AutoTokenizer,
+    T5ForConditionalGeneration,
+    T5TokenizerFast,
+    pipeline,
+)
+from config import Config
+
+T5_MODEL_NAME = "t5-small"
+QA_MODEL_NAME = "distilbert-base-cased-distilled-squad"
+
+# "torch" is full fp32, "int8" is dynamic int8 quantization of the Linear layers,
+# "onnx" exports the model once and runs it with ONNX Runtime
+BACKENDS = ("torch", "int8", "onnx")
+
+
+def resolve_backend(backend=None):
+    backend = (backend or Config.INFERENCE_BACKEND).lower()
+    if backend not in BACKENDS:
+        print(f"Unknown inference backend '{backend}', using torch")
+        return "torch"
+    if backend == "onnx":
+        try:
+            import optimum.onnxruntime  # noqa: F401
+        except ImportError:
+            print("ONNX backend needs `optimum[onnxruntime]`; using torch")
+            return "torch"
+    return backend
+
+
+def quantize_int8(model):
+    """Dynamic int8 quantization: weights stored as int8, activations quantized on the fly"""
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _onnx_dir(model_name):
+    return Path(Config.ONNX_MODEL_DIR) / model_name.replace("/", "--")
+
+
+def _load_onnx(ort_class, model_name):
+    """Load an exported model, exporting and saving it on first use"""
+    export_dir = _onnx_dir(model_name)
+    if export_dir.exists():
+        return ort_class.from_pretrained(export_dir)
+    model = ort_class.from_pretrained(model_name, export=True)
+    model.save_pretrained(export_dir)
+    return model
+
+
+def load_t5(backend=None):
+    """Return (tokenizer, model) for the PDF Q&A generator on the selected backend"""
+    backend = resolve_backend(backend)
+    # The Rust tokenizer: much faster on whole documents, and it reports character offsets
+    tokenizer = T5TokenizerFast.from_pretrained(T5_MODEL_NAME)
+    if backend == "onnx":
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        return tokenizer, _load_onnx(ORTModelForSeq2SeqLM, T5_MODEL_NAME)
+
+    model = T5ForConditionalGeneration.from_pretrained(T5_MODEL_NAME).eval()
+    if backend == "int8":
+        model = quantize_int8(model)
+    return tokenizer, model
+
+
+def load_qa(backend=None):
+    """Return the extractive question-answering pipeline on the selected backend"""
+    backend = resolve_backend(backend)
+    # Fast (Rust) tokenizer: Ask AI needs its character offsets
+    tokenizer = AutoTokenizer.from_pretrained(QA_MODEL_NAME, use_fast=True)
+    if backend == "onnx":
+        from optimum.onnxruntime import ORTModelForQuestionAnswering
+        model = _load_onnx(ORTModelForQuestionAnswering, QA_MODEL_NAME)
+    else:
+        model = AutoModelForQuestionAnswering.from_pretrained(QA_MODEL_NAME).eval()
+        if backend == "int8":
+            model = quantize_int8(model)
+    return pipeline("question-answering", model=model, tokenizer=tokenizer)
@@ -0,0 +1,81 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+
+class MicroBatcher:
+    """Queue requests from many sessions and run them through run_batch in dynamic micro-batches.
+
+    A single worker thread waits for the first request, then keeps
+    collecting until max_batch_size requests are queued or max_wait_ms
+    has passed, and hands the whole batch to run_batch(items), which must
+    return one result per item in the same order.
+    """
+
+    def __init__(self, run_batch, max_batch_size=8, max_wait_ms=15, name="micro-batcher"):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self._worker = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, item):
+        """Queue one request and return a Future for its result"""
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item, timeout=None):
+        """Block the calling session until its request has been answered"""
+        future = self.submit(item)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    @property
+    def mean_batch_size(self):
+        with self._stats_lock:
+            return self.items / self.batches if self.batches else 0.0
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            # Callers that timed out or were cancelled no longer need an answer
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                results = self.run_batch([item for item, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"run_batch returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+            with self._stats_lock:
+                self.batches += 1
+                self.items += len(batch)
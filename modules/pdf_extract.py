@@ -0,0 +1,149 @@
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import PyPDF2
+from config import Config
+
+# Set once per worker process by _init_worker
+_worker_reader = None
+
+
+def _address_space_bytes():
+    """This process's current virtual memory size (VmSize), or None where /proc is unavailable"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmSize:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _init_worker(data, memory_limit_mb):
+    """Parse the PDF cross-reference table once per worker and cap what the worker may allocate.
+
+    RLIMIT_AS bounds the whole address space, including the interpreter and
+    libraries the worker starts with, so the cap is memory_limit_mb on top of
+    that baseline. Without /proc the baseline is unknown and only the
+    character caps apply.
+    """
+    global _worker_reader
+    baseline = _address_space_bytes()
+    if memory_limit_mb and baseline is not None:
+        try:
+            import resource
+            limit = baseline + memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError):
+            pass  # Not supported on this platform; the character caps still apply
+    _worker_reader = PyPDF2.PdfReader(io.BytesIO(data))
+
+
+def _extract_page(reader, page_number, max_page_chars):
+    """(text, None) for a page, or ("", reason) if its text could not be extracted"""
+    try:
+        text = reader.pages[page_number].extract_text() or ""
+    except MemoryError:
+        return "", "out of memory"
+    except Exception as e:
+        return "", str(e) or type(e).__name__
+    return (text[:max_page_chars] if max_page_chars else text), None
+
+
+def _extract_range(start, stop, max_page_chars):
+    return [_extract_page(_worker_reader, i, max_page_chars) for i in range(start, stop)]
+
+
+def _record_failure(failed, page_number, reason):
+    print(f"Could not extract page {page_number + 1}: {reason}")
+    if failed is not None:
+        failed.append((page_number, reason))
+
+
+def describe_failures(failed):
+    """One line naming the pages in a failed list from iter_pages, for showing to the user"""
+    pages = ", ".join(str(page_number + 1) for page_number, _ in failed[:10])
+    more = f" and {len(failed) - 10} more" if len(failed) > 10 else ""
+    return f"Could not read the text of page(s) {pages}{more}: {failed[0][1]}"
+
+
+def resolve_page_range(num_pages, page_range=None, max_pages=None):
+    """Clamp an optional (first, last) 1-based inclusive range and page limit to the document"""
+    start, stop = 0, num_pages
+    if page_range:
+        first, last = page_range
+        start = max(first - 1, 0)
+        stop = min(last, num_pages)
+    if max_pages:
+        stop = min(stop, start + max_pages)
+    return start, max(stop, start)
+
+
+def iter_pages(data, page_range=None, max_pages=None, workers=None, batch_pages=None,
+               max_page_chars=None, max_total_chars=None, memory_limit_mb=None, failed=None):
+    """Yield (page_number, text) for a PDF's bytes in page order while later pages are still parsing.
+
+    Small documents are read in-process; larger ones are split into page
+    ranges spread across a process pool. Extraction stops early once
+    max_total_chars of text have been produced. A page whose text could not
+    be extracted (or whose worker died) is yielded as "" and, if failed is a
+    list, (page_number, reason) is appended to it.
+    """
+    max_pages = max_pages if max_pages is not None else Config.PDF_EXTRACT_MAX_PAGES
+    workers = workers if workers is not None else Config.PDF_EXTRACT_WORKERS
+    batch_pages = batch_pages or Config.PDF_EXTRACT_BATCH_PAGES
+    max_page_chars = max_page_chars if max_page_chars is not None else Config.PDF_EXTRACT_MAX_PAGE_CHARS
+    max_total_chars = max_total_chars if max_total_chars is not None else Config.PDF_EXTRACT_MAX_TOTAL_CHARS
+    memory_limit_mb = memory_limit_mb if memory_limit_mb is not None else Config.PDF_EXTRACT_WORKER_MEMORY_MB
+
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    start, stop = resolve_page_range(len(reader.pages), page_range, max_pages)
+    total_chars = 0
+
+    if workers <= 1 or stop - start < Config.PDF_EXTRACT_PARALLEL_MIN_PAGES:
+        for page_number in range(start, stop):
+            text, error = _extract_page(reader, page_number, max_page_chars)
+            if error is not None:
+                _record_failure(failed, page_number, error)
+            yield page_number, text
+            total_chars += len(text)
+            if max_total_chars and total_chars >= max_total_chars:
+                return
+        return
+
+    del reader  # Workers hold their own parsed copy
+    ranges = [(s, min(s + batch_pages, stop)) for s in range(start, stop, batch_pages)]
+    # Spawned, not forked: a forked worker would inherit the app's models and threads, and its memory cap with them
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(data, memory_limit_mb)) as pool:
+        # Bound in-flight ranges so results that are not consumed yet do not pile up
+        in_flight = []
+        pending = iter(ranges)
+        for s, e in pending:
+            in_flight.append((s, e, pool.submit(_extract_range, s, e, max_page_chars)))
+            if len(in_flight) >= workers * 2:
+                break
+
+        while in_flight:
+            range_start, range_stop, future = in_flight.pop(0)
+            try:
+                results = future.result()
+            except Exception as e:
+                # A worker that dies (e.g. past its memory cap) fails its whole range; later ranges still run
+                reason = str(e) or type(e).__name__
+                results = [("", reason)] * (range_stop - range_start)
+            for offset, (text, error) in enumerate(results):
+                if error is not None:
+                    _record_failure(failed, range_start + offset, error)
+                yield range_start + offset, text
+                total_chars += len(text)
+                if max_total_chars and total_chars >= max_total_chars:
+                    for _, _, f in in_flight:
+                        f.cancel()
+                    return
+            next_range = next(pending, None)
+            if next_range is not None:
+                s, e = next_range
+                in_flight.append((s, e, pool.submit(_extract_range, s, e, max_page_chars)))
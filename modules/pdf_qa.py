@@ -1,76 +1,167 @@
 import streamlit as st
-import PyPDF2
-from transformers import T5Tokenizer, T5ForConditionalGeneration
 import torch
+from config import Config
+from modules.retrieval import ChunkIndex
+from modules.chunking import TokenChunker
+from modules.pdf_extract import describe_failures, iter_pages
+from modules.document_store import ParsedDocument, get_document_store, hash_document
+from modules.inference_server import MicroBatcher
+from modules.inference_backends import load_t5
+from modules.semantic_cache import answer_evidence, get_semantic_cache
 
 @st.cache_resource
-def load_model(_self=None):
-    tokenizer = T5Tokenizer.from_pretrained("t5-small")
-    model = T5ForConditionalGeneration.from_pretrained("t5-small")
-    return tokenizer, model
+def load_model(backend=None):
+    return load_t5(backend or Config.INFERENCE_BACKEND)
+
+def generate_answers(tokenizer, model, prompts):
+    """Run a padded batch of T5 prompts through beam search in one generate call"""
+    inputs = tokenizer(prompts, return_tensors="pt", max_length=512, truncation=True, padding=True)
+    with torch.inference_mode():
+        outputs = model.generate(**inputs, max_length=100, num_beams=4, early_stopping=True)
+    return tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+@st.cache_resource
+def get_answer_batcher():
+    """Process-wide T5 micro-batcher shared by every session"""
+    tokenizer, model = load_model()
+    return MicroBatcher(
+        lambda prompts: generate_answers(tokenizer, model, prompts),
+        max_batch_size=Config.INFERENCE_MAX_BATCH_SIZE,
+        max_wait_ms=Config.INFERENCE_MAX_WAIT_MS,
+        name="t5-batcher",
+    )
 
 class PDFQASystem:
+    """PDF parsing and answering around the shared T5 model.
+
+    One instance is shared by every session, so it holds no per-user state:
+    the current document lives in the caller (or in the session's own
+    file_uploader widget) and is passed in.
+    """
+
     def __init__(self):
         self.tokenizer, self.model = load_model()
-        self.text_chunks = []
 
-    def extract_text_from_pdf(self, pdf_file):
+    def extract_pages(self, pdf_file, page_range=None):
+        """Return the text of each page; pdf_file may be a path, raw bytes or a file-like object"""
+        failed = []
         try:
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
+            data = self._read_bytes(pdf_file)
+            pages = [text for _, text in iter_pages(data, page_range=page_range, failed=failed)]
         except Exception as e:
             st.error(f"Error reading PDF: {e}")
-            return ""
+            return []
+        if failed:
+            st.warning(describe_failures(failed))
+        return pages
+
+    def extract_text_from_pdf(self, pdf_file):
+        return "".join(page + "\n" for page in self.extract_pages(pdf_file))
+
+    def parse_document(self, data, doc_hash):
+        """Extract, chunk and index raw PDF bytes into a ParsedDocument, marked incomplete if reading failed"""
+        pages = []
+        page_offsets = []
+        failed = []
+        errors = []
 
-    def chunk_text(self, text, max_tokens=300):
-        words = text.split()
+        def stream_pages():
+            offset = 0
+            try:
+                for _, page in iter_pages(data, failed=failed):
+                    page_offsets.append(offset)
+                    pages.append(page)
+                    offset += len(page) + 1
+                    yield page
+            except Exception as e:
+                errors.append(e)
+                st.error(f"Error reading PDF: {e}")
+
+        # Chunks are cut as pages arrive, while later pages are still being parsed
         chunks = []
-        current_chunk = []
-        current_length = 0
+        chunk_offsets = []
+        for chunk, start, end in self.chunk_pages(stream_pages()):
+            chunks.append(chunk)
+            chunk_offsets.append((start, end))
+        if failed:
+            st.warning(describe_failures(failed))
+        text = "".join(page + "\n" for page in pages)
+        index = self.index_chunks(chunks)
+        return ParsedDocument(doc_hash, text, page_offsets, chunks, index, chunk_offsets,
+                              complete=not (errors or failed))
+
+    def chunk_pages(self, pages, max_tokens=None, overlap=None):
+        """Yield (chunk, start, end) of overlapping max_tokens-token chunks from an iterable of page texts"""
+        return TokenChunker(self.tokenizer, max_tokens, overlap).iter_chunks(pages)
+
+    def chunk_text(self, text, max_tokens=None, overlap=None):
+        return [chunk for chunk, _, _ in self.chunk_pages([text], max_tokens, overlap)]
+
+    def index_chunks(self, chunks):
+        """Build the retrieval index over already-chunked text"""
+        return ChunkIndex(chunks, mode=Config.PDF_QA_RETRIEVER)
+
+    def build_index(self, text):
+        """Chunk the document once and build its retrieval index"""
+        return self.index_chunks(self.chunk_text(text))
 
-        for word in words:
-            current_chunk.append(word)
-            current_length += 1
-            if current_length >= max_tokens:
-                chunks.append(" ".join(current_chunk))
-                current_chunk = []
-                current_length = 0
+    @staticmethod
+    def _read_bytes(pdf_file):
+        if isinstance(pdf_file, (bytes, bytearray)):
+            return bytes(pdf_file)
+        if hasattr(pdf_file, "read"):
+            return pdf_file.read()
+        with open(pdf_file, "rb") as f:
+            return f.read()
 
-        if current_chunk:
-            chunks.append(" ".join(current_chunk))
+    def answer_with_sources(self, context, question, top_k=None, doc_hash=None):
+        """(answer, chunk IDs) from a ChunkIndex, or (answer, None) from a literal context string.
 
-        return chunks
+        The top-k chunks are joined best first, so truncation drops the
+        weakest. Paraphrases of a question already answered for the same
+        document (doc_hash, else its text) reuse the answer and its chunk IDs,
+        so neither retrieval nor generation runs again.
+        """
+        indexed = isinstance(context, ChunkIndex)
+        if doc_hash is None:
+            doc_hash = hash_document((" ".join(context.chunks) if indexed else context).encode("utf-8"))
 
-    def ask_question(self, context, question):
-        input_text = f"question: {question} context: {context}"
-        input_ids = self.tokenizer.encode(input_text, return_tensors="pt", max_length=512, truncation=True)
-        outputs = self.model.generate(input_ids, max_length=100, num_beams=4, early_stopping=True)
-        answer = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-        return answer
+        def sources(result):
+            return [context.chunks[i] for i in result["chunk_ids"]] if indexed else [context]
+
+        def generate():
+            chunk_ids = context.search(question, top_k or Config.PDF_QA_TOP_K) if indexed else None
+            text = " ".join(context.chunks[i] for i in chunk_ids) if indexed else context
+            return {"answer": get_answer_batcher()(f"question: {question} context: {text}"), "chunk_ids": chunk_ids}
+
+        result = get_semantic_cache().get_or_compute(
+            doc_hash, question, generate, lambda result: answer_evidence(result["answer"], sources(result)))
+        return result["answer"], result["chunk_ids"]
+
+    def ask_question(self, context, question, top_k=None, doc_hash=None):
+        """The answer alone; see answer_with_sources"""
+        return self.answer_with_sources(context, question, top_k, doc_hash)[0]
 
     def show_interface(self):
         st.title("📄 PDF Question Answering")
 
+        # The uploader widget is per session, so each user only ever sees their own document
         uploaded_pdf = st.file_uploader("Upload a PDF file", type=["pdf"])
-        if uploaded_pdf:
-            with st.spinner("Reading and processing PDF..."):
-                text = self.extract_text_from_pdf(uploaded_pdf)
-                if not text:
-                    st.warning("No text found in PDF.")
-                    return
-
-                self.text_chunks = self.chunk_text(text)
-                st.success("PDF processed successfully!")
-
-        if self.text_chunks:
-            question = st.text_input("Ask a question based on the PDF:")
-
-            if st.button("Get Answer"):
-                with st.spinner("Generating answer..."):
-                    context = " ".join(self.text_chunks[:3])  # Use first 3 chunks
-                    answer = self.ask_question(context, question)
-                    st.subheader("Answer:")
-                    st.write(answer)
+        if not uploaded_pdf:
+            return
+        with st.spinner("Reading and processing PDF..."):
+            document = get_document_store().get_or_parse(uploaded_pdf.getvalue(), self.parse_document)
+        if not document.chunks:
+            st.warning("No text found in PDF.")
+            return
+        st.success("PDF processed successfully!")
+
+        question = st.text_input("Ask a question based on the PDF:")
+        if st.button("Get Answer"):
+            with st.spinner("Generating answer..."):
+                answer, chunk_ids = self.answer_with_sources(document.index, question, doc_hash=document.doc_hash)
+                st.subheader("Answer:")
+                st.write(answer)
+                if document.chunk_offsets:
+                    pages = sorted({page + 1 for chunk_id in chunk_ids for page in document.pages_for_chunk(chunk_id)})
+                    st.caption(f"From page(s) {', '.join(map(str, pages))}")
@@ -0,0 +1,175 @@
+"""Ask AI over one pasted passage: tokenized once, many questions per forward pass, answers cached.
+
+The question-answering pipeline re-tokenizes the whole context for every
+question and runs its windows one after another. QAContext tokenizes the
+passage once with the fast tokenizer (keeping character offsets), cuts it
+into overlapping windows and, for a batch of questions, builds every
+[CLS] question [SEP] window [SEP] sequence from the cached token IDs. All
+(question, window) pairs go through the model as one padded batch (split
+into ASK_AI_PAIRS_PER_PASS-sized passes to bound memory), and the best span
+per question is mapped back to the passage text. Answers are cached per
+(passage hash, question), so asking again costs nothing. Given a
+MicroBatcher over forward_pairs, the pairs are queued one by one instead,
+so questions from concurrent sessions share forward passes.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+from config import Config
+
+
+def context_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def normalize_question(question):
+    return " ".join(question.split()).casefold()
+
+
+def forward_pairs(model, tokenizer, sequences):
+    """(start logits, end logits) per (token IDs, position of the window) sequence, run as one padded batch"""
+    width = max(len(ids) for ids, _ in sequences)
+    input_ids = torch.full((len(sequences), width), tokenizer.pad_token_id or 0, dtype=torch.long)
+    attention_mask = torch.zeros_like(input_ids)
+    token_type_ids = torch.zeros_like(input_ids)
+    for row, (ids, window_at) in enumerate(sequences):
+        input_ids[row, :len(ids)] = torch.tensor(ids)
+        attention_mask[row, :len(ids)] = 1
+        token_type_ids[row, window_at:len(ids)] = 1
+    inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+    if "token_type_ids" in tokenizer.model_input_names:
+        inputs["token_type_ids"] = token_type_ids
+    with torch.inference_mode():
+        output = model(**inputs)
+    starts, ends = output.start_logits.float().numpy(), output.end_logits.float().numpy()
+    return [(starts[row, :len(ids)], ends[row, :len(ids)]) for row, (ids, _) in enumerate(sequences)]
+
+
+def _softmax(logits):
+    exp = np.exp(logits - logits.max())
+    return exp / exp.sum()
+
+
+class QAContext:
+    """A passage tokenized once with character offsets, answering batches of questions about it"""
+
+    def __init__(self, text, tokenizer, max_length=None, stride=None, max_answer_tokens=None):
+        if not getattr(tokenizer, "is_fast", False):
+            raise ValueError("QAContext needs a fast tokenizer for character offsets")
+        self.text = text
+        self.hash = context_hash(text)
+        self.tokenizer = tokenizer
+        self.max_length = max_length or Config.ASK_AI_MAX_LENGTH
+        self.stride = stride if stride is not None else Config.ASK_AI_DOC_STRIDE
+        self.max_answer_tokens = max_answer_tokens or Config.ASK_AI_MAX_ANSWER_TOKENS
+        encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+        self.input_ids = encoding["input_ids"]
+        self.offsets = encoding["offset_mapping"]
+        self.answers = {}  # normalized question -> {"answer", "score", "start", "end"}
+        self._lock = threading.Lock()
+        self.forward_passes = 0
+        self.pairs_encoded = 0
+
+    def window_starts(self, span):
+        """Token offsets of windows of span tokens overlapping by stride, covering the whole passage"""
+        step = max(span - self.stride, 1)
+        starts = list(range(0, max(len(self.input_ids) - span, 0) + 1, step))
+        if starts[-1] + span < len(self.input_ids):
+            starts.append(len(self.input_ids) - span)
+        return starts
+
+    def answer(self, model, questions, pairs_per_pass=None, batcher=None):
+        """Answer dicts for questions, in order; only questions not asked before reach the model.
+
+        With a batcher (a MicroBatcher over forward_pairs for the same model),
+        pairs go through it and model is not called directly.
+        """
+        keys = [normalize_question(q) for q in questions]
+        with self._lock:
+            pending = {key: q for key, q in zip(keys, questions) if key and key not in self.answers}
+        if pending:
+            results = self._run(model, pending, pairs_per_pass or Config.ASK_AI_PAIRS_PER_PASS, batcher)
+            with self._lock:
+                self.answers.update(results)
+        empty = {"answer": "", "score": 0.0, "start": 0, "end": 0}
+        return [dict(self.answers.get(key, empty), question=q) for key, q in zip(keys, questions)]
+
+    def _pairs(self, pending):
+        """(question key, window start, token IDs, position of the window in the sequence) for every pair"""
+        cls_id, sep_id = self.tokenizer.cls_token_id, self.tokenizer.sep_token_id
+        pairs = []
+        for key, question in pending.items():
+            # Long questions are cut so every window still holds a useful stretch of the passage
+            question_ids = self.tokenizer(question, add_special_tokens=False)["input_ids"][:self.max_length // 2]
+            span = self.max_length - len(question_ids) - 3
+            for start in self.window_starts(span):
+                window = self.input_ids[start:start + span]
+                pairs.append((key, start, [cls_id] + question_ids + [sep_id] + window + [sep_id],
+                              len(question_ids) + 2))
+        return pairs
+
+    def _logits(self, model, sequences, pairs_per_pass, batcher):
+        if batcher is not None:
+            futures = [batcher.submit(sequence) for sequence in sequences]
+            return [future.result() for future in futures]
+        size = pairs_per_pass if pairs_per_pass > 0 else len(sequences)
+        logits = []
+        for begin in range(0, len(sequences), size):
+            logits += forward_pairs(model, self.tokenizer, sequences[begin:begin + size])
+            self.forward_passes += 1
+        return logits
+
+    def _best_span(self, start_logits, end_logits):
+        """(score, first, last) of the most likely span of at most max_answer_tokens within one window"""
+        scores = np.outer(_softmax(start_logits), _softmax(end_logits))
+        scores = np.tril(np.triu(scores), self.max_answer_tokens - 1)
+        first, last = divmod(int(scores.argmax()), scores.shape[1])
+        return float(scores[first, last]), first, last
+
+    def _run(self, model, pending, pairs_per_pass, batcher=None):
+        pairs = self._pairs(pending)
+        logits = self._logits(model, [(ids, window_at) for _, _, ids, window_at in pairs], pairs_per_pass, batcher)
+        self.pairs_encoded += len(pairs)
+        best = {}
+        for (key, start, ids, window_at), (starts, ends) in zip(pairs, logits):
+            window_end = len(ids) - 1  # The final [SEP]
+            score, first, last = self._best_span(starts[window_at:window_end], ends[window_at:window_end])
+            if key not in best or score > best[key][0]:
+                best[key] = (score, start + first, start + last)
+        results = {}
+        for key, (score, first, last) in best.items():
+            begin_char, end_char = self.offsets[first][0], self.offsets[last][1]
+            results[key] = {"answer": self.text[begin_char:end_char], "score": score,
+                            "start": begin_char, "end": end_char}
+        return results
+
+
+class ContextCache:
+    """Most recently used passages by content hash, so follow-up questions skip tokenization"""
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity or Config.ASK_AI_CONTEXT_CACHE
+        self._contexts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text, tokenizer):
+        key = context_hash(text)
+        with self._lock:
+            context = self._contexts.get(key)
+            if context is not None:
+                self._contexts.move_to_end(key)
+                return context
+        context = QAContext(text, tokenizer)
+        with self._lock:
+            context = self._contexts.setdefault(key, context)
+            self._contexts.move_to_end(key)
+            while len(self._contexts) > self.capacity:
+                self._contexts.popitem(last=False)
+        return context
+
+    def __len__(self):
+        return len(self._contexts)
@@ -0,0 +1,157 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+import streamlit as st
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Very common words carry no signal for passage ranking
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have how in is it its of on or that the
+this to was were what when where which who why will with
+""".split())
+
+
+def tokenize(text):
+    """Lowercase word tokens with stopwords removed"""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+@st.cache_resource(show_spinner="Loading embedding model...")
+def load_embedder(model_name="all-MiniLM-L6-v2"):
+    """Load the sentence-transformers model, or None if it is unavailable"""
+    try:
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+    except Exception as e:
+        print(f"Embedding model unavailable, falling back to BM25 only: {e}")
+        return None
+
+
+class BM25Index:
+    """Okapi BM25 ranking over a fixed list of chunks using an inverted index"""
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)
+        self.doc_lengths = []
+
+        for chunk_id, chunk in enumerate(chunks):
+            terms = tokenize(chunk)
+            self.doc_lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self.postings[term].append((chunk_id, tf))
+
+        self.num_docs = len(self.doc_lengths)
+        self.avg_length = (sum(self.doc_lengths) / self.num_docs) if self.num_docs else 0.0
+        self.idf = {
+            term: math.log(1 + (self.num_docs - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in self.postings.items()
+        }
+
+    def search(self, query, k=3):
+        """Return up to k (chunk_id, score) pairs, best first"""
+        scores = defaultdict(float)
+        # Only the postings of the query terms are touched, not every chunk
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for chunk_id, tf in self.postings[term]:
+                norm = 1 - self.b + self.b * self.doc_lengths[chunk_id] / (self.avg_length or 1)
+                scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+class EmbeddingIndex:
+    """Dense retrieval with normalized sentence embeddings in a FAISS inner-product index"""
+
+    def __init__(self, chunks, embedder):
+        import faiss
+
+        self.embedder = embedder
+        embeddings = embedder.encode(
+            chunks, batch_size=32, convert_to_numpy=True, normalize_embeddings=True
+        ).astype("float32")
+        self.index = faiss.IndexFlatIP(embeddings.shape[1])
+        self.index.add(embeddings)
+
+    def nbytes(self):
+        return self.index.ntotal * self.index.d * 4
+
+    def __getstate__(self):
+        # FAISS indexes and the model itself do not pickle; store the raw index bytes instead
+        import faiss
+        return {"index": faiss.serialize_index(self.index)}
+
+    def __setstate__(self, state):
+        import faiss
+        self.index = faiss.deserialize_index(state["index"])
+        self.embedder = load_embedder()
+
+    def search(self, query, k=3):
+        """Return up to k (chunk_id, cosine similarity) pairs, best first"""
+        query_vec = self.embedder.encode(
+            [query], convert_to_numpy=True, normalize_embeddings=True
+        ).astype("float32")
+        scores, ids = self.index.search(query_vec, min(k, self.index.ntotal))
+        return [(int(i), float(s)) for i, s in zip(ids[0], scores[0]) if i >= 0]
+
+
+class ChunkIndex:
+    """Per-document retrieval index: BM25, dense embeddings, or both fused"""
+
+    def __init__(self, chunks, mode="hybrid"):
+        self.chunks = list(chunks)
+        self.bm25 = BM25Index(self.chunks) if mode in ("bm25", "hybrid") else None
+        self.dense = None
+
+        if mode in ("dense", "hybrid") and self.chunks:
+            embedder = load_embedder()
+            if embedder is not None:
+                try:
+                    self.dense = EmbeddingIndex(self.chunks, embedder)
+                except Exception as e:
+                    print(f"Could not build embedding index, using BM25 only: {e}")
+
+        if self.bm25 is None and self.dense is None:
+            self.bm25 = BM25Index(self.chunks)
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def nbytes(self):
+        """Approximate memory held by the index structures"""
+        size = 0
+        if self.bm25 is not None:
+            size += 16 * sum(len(plist) for plist in self.bm25.postings.values())
+        if self.dense is not None:
+            size += self.dense.nbytes()
+        return size
+
+    def search(self, question, k=3, candidates=20):
+        """Return the ids of the top-k chunks for the question, best first"""
+        if not self.chunks:
+            return []
+
+        rankings = []
+        if self.bm25 is not None:
+            rankings.append(self.bm25.search(question, candidates))
+        if self.dense is not None and self.dense.embedder is not None:
+            rankings.append(self.dense.search(question, candidates))
+
+        # Reciprocal rank fusion keeps BM25 and cosine scores comparable
+        fused = defaultdict(float)
+        for ranking in rankings:
+            for rank, (chunk_id, _) in enumerate(ranking):
+                fused[chunk_id] += 1.0 / (60 + rank)
+
+        ranked = sorted(fused, key=fused.get, reverse=True)[:k]
+        # No lexical or semantic match at all: the opening of the document is the best guess
+        return ranked or list(range(min(k, len(self.chunks))))
+
+    def top_chunks(self, question, k=3):
+        """Return the text of the top-k chunks for the question, best first"""
+        return [self.chunks[i] for i in self.search(question, k)]
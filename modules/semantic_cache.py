@@ -0,0 +1,259 @@
+"""Answers reused across paraphrased questions about the same document.
+
+Students ask the same question about the same handout in different words,
+and every phrasing used to run the model again. SemanticCache keys answers
+by (document hash, question embedding). A question whose normalized
+embedding has cosine similarity of at least SEMANTIC_CACHE_THRESHOLD with
+an earlier question about the same document gets that question's answer.
+Candidates are only the questions cached for that document, so the
+nearest-neighbour search is one small matrix-vector product. The cache is
+an LRU bounded by entry count and by approximate memory, and it counts
+hits, misses and the model time hits saved. Without an embedding model it
+falls back to exact (normalized) question matches.
+
+Sentence embeddings rate "When did the war start?" and "...end?" as near
+duplicates, so similarity alone is not enough. An answer can be cached with
+its evidence (the text around it), and a paraphrase only hits when every
+content word it adds to the cached question appears in that evidence;
+otherwise the lookup counts as rejected and the model runs. While one
+question is being answered, the same question or a close paraphrase of it
+about the same document waits for that answer instead of running the model
+alongside it, then looks it up (and only runs the model if rejected).
+benchmarks/eval_semantic_cache.py measures the false-hit rate of a
+threshold on labelled paraphrase pairs.
+"""
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import streamlit as st
+
+from config import Config
+from modules.retrieval import tokenize
+
+SENTENCE_END = re.compile(r"[.!?\n]")
+
+
+def normalize_question(question):
+    return " ".join(question.split()).casefold()
+
+
+def content_terms(text):
+    """Content words cut to five letters, so "produces" and "produced" are one term"""
+    return frozenset(token[:5] for token in tokenize(text))
+
+
+def _mentions(evidence, term):
+    # Prefix match either way, so "end" finds "ended"; one- and two-letter terms must match exactly
+    if term in evidence:
+        return True
+    return len(term) >= 3 and any(len(word) >= 3 and (word.startswith(term) or term.startswith(word))
+                                  for word in evidence)
+
+
+def sentence_around(text, start, end):
+    """The sentence(s) of text spanning characters start to end"""
+    begin = max((m.end() for m in SENTENCE_END.finditer(text, 0, start)), default=0)
+    stop = SENTENCE_END.search(text, end)
+    return text[begin:stop.end() if stop else len(text)].strip()
+
+
+def answer_evidence(answer, passages):
+    """The sentences of passages that contain answer, or the answer itself if none quotes it"""
+    needle = answer.strip().casefold()
+    found = []
+    for passage in passages:
+        at = passage.casefold().find(needle) if needle else -1
+        if at >= 0:
+            found.append(sentence_around(passage, at, at + len(needle)))
+    return " ".join(found) or answer
+
+
+def _size(value):
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+class SemanticCache:
+    """LRU of answers per namespace (a document hash), matched by question embedding similarity"""
+
+    def __init__(self, embed=None, threshold=None, max_entries=None, max_bytes=None):
+        self.embed = embed  # list of texts -> L2-normalized float32 rows, or None for exact matching
+        self.threshold = threshold if threshold is not None else Config.SEMANTIC_CACHE_THRESHOLD
+        self.max_entries = max_entries or Config.SEMANTIC_CACHE_MAX_ENTRIES
+        self.max_bytes = max_bytes or Config.SEMANTIC_CACHE_MAX_MB * 1024 * 1024
+        # entry ID -> (namespace, normalized question, vector, answer, model seconds, size in bytes,
+        #              question terms, evidence terms or None to skip the relevance check)
+        self._entries = OrderedDict()
+        self._namespaces = {}  # namespace -> {"ids": [...], "matrix": stacked vectors or None if stale}
+        self._in_flight = {}  # namespace -> [[normalized question, vector, threading.Event], ...] being computed
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self.coalesced = 0
+        self.saved_seconds = 0.0
+        self.lookup_seconds = 0.0
+
+    def vectors(self, questions):
+        """Embeddings for a batch of questions, in one call to the model"""
+        if self.embed is None or not questions:
+            return [None] * len(questions)
+        return list(self.embed([normalize_question(q) for q in questions]))
+
+    def lookup(self, namespace, question, vector=None):
+        """The cached answer to this question or a close paraphrase of it, else None"""
+        start = time.perf_counter()
+        if vector is None:
+            vector = self.vectors([question])[0]
+        key = normalize_question(question)
+        terms = content_terms(key)
+        with self._lock:
+            entry_id = self._nearest(namespace, key, vector)
+            entry = self._entries[entry_id] if entry_id is not None else None
+            if entry is not None and entry[1] != key and entry[7] is not None and \
+                    not all(_mentions(entry[7], term) for term in terms - entry[6]):
+                # Close in embedding space, but it asks about something the cached answer does not mention
+                self.rejected += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                answer = None
+            else:
+                self._entries.move_to_end(entry_id)
+                self.hits += 1
+                self.saved_seconds += entry[4]
+                answer = entry[3]
+            self.lookup_seconds += time.perf_counter() - start
+        return answer
+
+    def _nearest(self, namespace, key, vector):
+        bucket = self._namespaces.get(namespace)
+        if bucket is None:
+            return None
+        if vector is None:
+            return next((i for i in bucket["ids"] if self._entries[i][1] == key), None)
+        if bucket["matrix"] is None:
+            bucket["matrix"] = np.stack([self._entries[i][2] for i in bucket["ids"]])
+        similarities = bucket["matrix"] @ vector
+        best = int(similarities.argmax())
+        return bucket["ids"][best] if similarities[best] >= self.threshold else None
+
+    def store(self, namespace, question, answer, cost_seconds=0.0, vector=None, evidence=None):
+        """Cache an answer; cost_seconds is the model time a later hit on it saves.
+
+        evidence is the text the answer came from (see answer_evidence);
+        without it paraphrases hit on similarity alone.
+        """
+        if vector is None:
+            vector = self.vectors([question])[0]
+        key = normalize_question(question)
+        evidence = content_terms(evidence) if evidence is not None else None
+        size = (_size(key) + _size(answer) + (vector.nbytes if vector is not None else 0) + 200
+                + 60 * len(evidence or ()))
+        with self._lock:
+            bucket = self._namespaces.get(namespace)
+            for stale_id in [i for i in bucket["ids"] if self._entries[i][1] == key] if bucket else []:
+                self._remove(stale_id)  # Recomputed: the new answer replaces the old one
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (namespace, key, vector, answer, cost_seconds, size, content_terms(key), evidence)
+            bucket = self._namespaces.setdefault(namespace, {"ids": [], "matrix": None})
+            bucket["ids"].append(entry_id)
+            bucket["matrix"] = None
+            self.bytes += size
+            while len(self._entries) > self.max_entries or (self.bytes > self.max_bytes and len(self._entries) > 1):
+                self._evict()
+
+    def _evict(self):
+        self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        self.bytes -= entry[5]
+        bucket = self._namespaces[entry[0]]
+        bucket["ids"].remove(entry_id)
+        bucket["matrix"] = None
+        if not bucket["ids"]:
+            del self._namespaces[entry[0]]
+
+    def get_or_compute(self, namespace, question, compute, evidence=None):
+        """The cached answer for a paraphrase of question, or compute() timed and cached.
+
+        evidence(answer), if given, returns the text the answer came from.
+        """
+        vector = self.vectors([question])[0]
+        key = normalize_question(question)
+        while True:
+            answer = self.lookup(namespace, question, vector)
+            if answer is not None:
+                return answer
+            with self._lock:
+                pending = self._pending(namespace, key, vector)
+                if pending is None:
+                    flight = [key, vector, threading.Event()]
+                    self._in_flight.setdefault(namespace, []).append(flight)
+                    break
+                # Counted once, as a hit or miss, by the lookup after the wait
+                self.misses -= 1
+                self.coalesced += 1
+            pending.wait()
+
+        try:
+            start = time.perf_counter()
+            answer = compute()
+            self.store(namespace, question, answer, time.perf_counter() - start, vector,
+                       evidence(answer) if evidence is not None else None)
+        finally:
+            with self._lock:
+                flights = [f for f in self._in_flight[namespace] if f is not flight]
+                if flights:
+                    self._in_flight[namespace] = flights
+                else:
+                    del self._in_flight[namespace]
+            flight[2].set()
+        return answer
+
+    def _pending(self, namespace, key, vector):
+        """The event of an in-flight computation for this question or a close paraphrase, else None"""
+        for other_key, other_vector, done in self._in_flight.get(namespace, ()):
+            if other_key == key or (vector is not None and other_vector is not None
+                                    and float(other_vector @ vector) >= self.threshold):
+                return done
+        return None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "rejected": self.rejected,
+                "coalesced": self.coalesced,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_seconds": self.saved_seconds,
+                "mean_lookup_ms": 1000 * self.lookup_seconds / lookups if lookups else 0.0,
+            }
+
+
+@st.cache_resource
+def get_semantic_cache():
+    """Process-wide answer cache shared by PDF Q&A and Ask AI"""
+    from modules.retrieval import load_embedder
+    embedder = load_embedder()
+    if embedder is None:
+        print("Semantic answer cache is matching exact questions only")
+        return SemanticCache()
+    return SemanticCache(lambda texts: embedder.encode(texts, convert_to_numpy=True,
+                                                       normalize_embeddings=True).astype("float32"))
@@ -0,0 +1,275 @@
+"""Google sign-in (OpenID Connect) with cached provider metadata and locally verified session tokens.
+
+The discovery document and the signing keys (JWKS) are fetched once and
+kept for as long as their Cache-Control / Expires headers allow, so a
+login costs one network round trip: the code-for-token exchange. ID tokens
+are checked against the cached keys (RS256), refetching the keys once when
+a token names one we have not seen, which is how providers rotate keys.
+After login the app holds a session token signed with Config.SECRET_KEY;
+validating it is an HMAC check with no network hop. Point
+GOOGLE_DISCOVERY_URL at benchmarks/oidc_stub_server.py to run all of this
+against a local identity provider.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import re
+import secrets
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from email.utils import parsedate_to_datetime
+
+from config import Config
+
+PLACEHOLDER_SECRET = "your-secret-key-here"
+# DER prefix of a SHA-256 DigestInfo, as embedded in PKCS#1 v1.5 signatures
+SHA256_DIGEST_INFO = bytes.fromhex("3031300d060960864801650304020105000420")
+
+
+class OAuthError(Exception):
+    """The provider could not be reached or returned something that does not verify"""
+
+
+def b64url_encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def b64url_decode(text):
+    text = text.encode("ascii") if isinstance(text, str) else text
+    return base64.urlsafe_b64decode(text + b"=" * (-len(text) % 4))
+
+
+def cache_lifetime(headers, default, now=None):
+    """Seconds a response may be reused, from Cache-Control max-age (less Age) or Expires"""
+    cache_control = (headers.get("Cache-Control") or "").lower()
+    if "no-store" in cache_control or "no-cache" in cache_control:
+        return 0
+    match = re.search(r"max-age=(\d+)", cache_control)
+    if match:
+        return max(0, int(match.group(1)) - int(headers.get("Age") or 0))
+    if headers.get("Expires"):
+        try:
+            return max(0, parsedate_to_datetime(headers["Expires"]).timestamp() - (now or time.time()))
+        except (TypeError, ValueError):
+            return 0
+    return default
+
+
+def rsa_verify(jwk, message, signature):
+    """RS256 (RSASSA-PKCS1-v1_5 with SHA-256) check of signature over message with an RSA JWK"""
+    n = int.from_bytes(b64url_decode(jwk["n"]), "big")
+    e = int.from_bytes(b64url_decode(jwk["e"]), "big")
+    size = (n.bit_length() + 7) // 8
+    if len(signature) != size:
+        return False
+    decoded = pow(int.from_bytes(signature, "big"), e, n).to_bytes(size, "big")
+    digest_info = SHA256_DIGEST_INFO + hashlib.sha256(message).digest()
+    expected = b"\x00\x01" + b"\xff" * (size - len(digest_info) - 3) + b"\x00" + digest_info
+    return hmac.compare_digest(decoded, expected)
+
+
+class JsonCache:
+    """JSON documents fetched over HTTP GET and reused until their cache lifetime runs out.
+
+    If a refresh fails, the stale copy is served rather than failing logins
+    while the provider is briefly unreachable.
+    """
+
+    def __init__(self, default_ttl=None, timeout=10):
+        self.default_ttl = default_ttl if default_ttl is not None else Config.OAUTH_CACHE_DEFAULT_SECONDS
+        self.timeout = timeout
+        self._entries = {}  # url -> (expires_at, document)
+        self._lock = threading.Lock()
+        self.fetches = 0
+
+    def get(self, url, refresh=False):
+        entry = self._entries.get(url)
+        if entry is not None and not refresh and entry[0] > time.time():
+            return entry[1]
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None and not refresh and entry[0] > time.time():
+                return entry[1]
+            try:
+                document, lifetime = self._fetch(url)
+            except OAuthError as e:
+                if entry is None:
+                    raise
+                print(f"Using cached {url} after refresh failed: {e}")
+                return entry[1]
+            self._entries[url] = (time.time() + lifetime, document)
+            return document
+
+    def _fetch(self, url):
+        self.fetches += 1
+        request = urllib.request.Request(url, headers={"Accept": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read()), cache_lifetime(response.headers, self.default_ttl)
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            raise OAuthError(f"Could not fetch {url}: {e}") from e
+
+
+class SessionSigner:
+    """Expiring HMAC-SHA256 tokens: base64url(JSON claims) "." base64url(MAC)"""
+
+    def __init__(self, secret=None, ttl_seconds=None):
+        secret = secret or Config.SECRET_KEY
+        if not secret or secret == PLACEHOLDER_SECRET:
+            # Sessions then only survive until the process restarts, which beats a guessable key
+            print("SECRET_KEY is not set; signing sessions with a random per-process key")
+            secret = secrets.token_hex(32)
+        self._key = secret.encode("utf-8") if isinstance(secret, str) else secret
+        self.ttl_seconds = ttl_seconds or Config.SESSION_TTL_SECONDS
+
+    def _mac(self, payload):
+        return hmac.new(self._key, payload.encode("ascii"), hashlib.sha256).digest()
+
+    def sign(self, claims, ttl_seconds=None):
+        now = int(time.time())
+        body = dict(claims, iat=now, exp=now + int(ttl_seconds or self.ttl_seconds))
+        payload = b64url_encode(json.dumps(body, separators=(",", ":"), sort_keys=True).encode("utf-8"))
+        return f"{payload}.{b64url_encode(self._mac(payload))}"
+
+    def verify(self, token):
+        """The claims of a valid, unexpired token, else None"""
+        try:
+            payload, mac = token.split(".")
+            if not hmac.compare_digest(b64url_decode(mac), self._mac(payload)):
+                return None
+            claims = json.loads(b64url_decode(payload))
+        except (AttributeError, ValueError, TypeError):
+            return None
+        if not isinstance(claims, dict) or claims.get("exp", 0) < time.time():
+            return None
+        return claims
+
+
+class OIDCProvider:
+    """Authorization-code login against an OpenID Connect provider described by a discovery URL"""
+
+    def __init__(self, discovery_url=None, client_id=None, client_secret=None, redirect_uri=None,
+                 cache=None, signer=None, leeway_seconds=60):
+        self.discovery_url = discovery_url or Config.GOOGLE_DISCOVERY_URL
+        self.client_id = client_id or Config.GOOGLE_CLIENT_ID
+        self.client_secret = client_secret or Config.GOOGLE_CLIENT_SECRET
+        self.redirect_uri = redirect_uri or Config.GOOGLE_REDIRECT_URI
+        self.cache = cache or JsonCache()
+        self.signer = signer or SessionSigner()
+        self.leeway_seconds = leeway_seconds
+        self.token_requests = 0
+
+    def metadata(self):
+        return self.cache.get(self.discovery_url)
+
+    def signing_key(self, kid):
+        jwks_uri = self.metadata()["jwks_uri"]
+        for refresh in (False, True):
+            for key in self.cache.get(jwks_uri, refresh=refresh).get("keys", []):
+                if key.get("kid") == kid:
+                    return key
+        raise OAuthError(f"Unknown signing key {kid!r}")
+
+    def authorization_url(self, login_hint=None):
+        """Where to send the browser; state is a signed nonce, so the callback needs no server-side state"""
+        nonce = secrets.token_urlsafe(16)
+        params = {
+            "response_type": "code",
+            "client_id": self.client_id,
+            "redirect_uri": self.redirect_uri,
+            "scope": "openid email profile",
+            "state": self.signer.sign({"purpose": "oauth-state", "nonce": nonce}, ttl_seconds=600),
+            "nonce": nonce,
+            "prompt": "select_account",
+        }
+        if login_hint:
+            params["login_hint"] = login_hint
+        return f"{self.metadata()['authorization_endpoint']}?{urllib.parse.urlencode(params)}"
+
+    def exchange_code(self, code):
+        """Trade the authorization code for tokens: the only network round trip of a warm login"""
+        self.token_requests += 1
+        data = urllib.parse.urlencode({
+            "grant_type": "authorization_code",
+            "code": code,
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "redirect_uri": self.redirect_uri,
+        }).encode("ascii")
+        request = urllib.request.Request(self.metadata()["token_endpoint"], data=data,
+                                         headers={"Accept": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.cache.timeout) as response:
+                return json.loads(response.read())
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            raise OAuthError(f"Token exchange failed: {e}") from e
+
+    def verify_id_token(self, token, nonce=None):
+        """Claims of an ID token whose signature, issuer, audience, expiry and nonce all check out"""
+        try:
+            header_b64, payload_b64, signature_b64 = token.split(".")
+            header = json.loads(b64url_decode(header_b64))
+            claims = json.loads(b64url_decode(payload_b64))
+            signature = b64url_decode(signature_b64)
+        except (AttributeError, ValueError, TypeError) as e:
+            raise OAuthError(f"Malformed ID token: {e}") from e
+        if header.get("alg") != "RS256":
+            raise OAuthError(f"Unsupported ID token algorithm {header.get('alg')!r}")
+        if not rsa_verify(self.signing_key(header.get("kid")), f"{header_b64}.{payload_b64}".encode("ascii"),
+                          signature):
+            raise OAuthError("ID token signature does not verify")
+
+        issuer = self.metadata()["issuer"]
+        # Google also issues tokens with the scheme-less form of its issuer
+        if claims.get("iss") not in (issuer, issuer.split("://", 1)[-1]):
+            raise OAuthError(f"Unexpected issuer {claims.get('iss')!r}")
+        audience = claims.get("aud")
+        if self.client_id not in (audience if isinstance(audience, list) else [audience]):
+            raise OAuthError("ID token was issued to a different client")
+        if claims.get("exp", 0) < time.time() - self.leeway_seconds:
+            raise OAuthError("ID token has expired")
+        if nonce is not None and claims.get("nonce") != nonce:
+            raise OAuthError("ID token nonce does not match this login")
+        return claims
+
+    def complete_login(self, code, state):
+        """Verified ID token claims for the code and state the provider redirected back with"""
+        state_claims = self.signer.verify(state)
+        if not state_claims or state_claims.get("purpose") != "oauth-state":
+            raise OAuthError("Login state is invalid or has expired; please try again")
+        tokens = self.exchange_code(code)
+        if "id_token" not in tokens:
+            raise OAuthError(f"Token response has no ID token: {tokens.get('error', 'unknown error')}")
+        return self.verify_id_token(tokens["id_token"], nonce=state_claims["nonce"])
+
+
+def link_google_user(pool, claims):
+    """The local account for a verified Google identity, matched by email and created on first login"""
+    email = claims.get("email")
+    if not email or claims.get("email_verified") is False:
+        raise OAuthError("Google account has no verified email address")
+    with pool.transaction() as conn:
+        row = conn.execute("SELECT username, role FROM users WHERE lower(email) = lower(?) AND email IS NOT NULL",
+                           (email,)).fetchone()
+        if row is None:
+            base = re.sub(r"[^\w.-]", "", email.split("@")[0]) or "user"
+            for n in range(1, 1000):
+                username = base if n == 1 else f"{base}{n}"
+                cursor = conn.execute("INSERT OR IGNORE INTO users (username, email, role, auth_method) "
+                                      "VALUES (?, ?, 'student', 'google')", (username, email))
+                if cursor.rowcount:
+                    row = (username, "student")
+                    break
+            else:
+                raise OAuthError(f"Could not find a free username for {email}")
+    return {
+        "username": row[0],
+        "email": email,
+        "name": claims.get("name", row[0]),
+        "picture": claims.get("picture"),
+        "role": row[1],
+    }
@@ -0,0 +1,433 @@
+import hashlib
+import io
+import json
+import mmap
+import os
+import random
+import struct
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from config import Config
+
+DIFFICULTY_ORDER = {"easy": 0, "medium": 1, "hard": 2}
+BANK_MAGIC = b"EQBANK\0\0"
+BANK_VERSION = 1
+
+
+class AliasTable:
+    """Vose's alias method: O(n) to build, O(1) per weighted draw"""
+
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        n = len(weights)
+        scaled = weights * n / weights.sum()
+        self.prob = np.zeros(n)
+        self.alias = np.zeros(n, dtype=np.int64)
+        small = [i for i in range(n) if scaled[i] < 1.0]
+        large = [i for i in range(n) if scaled[i] >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def draw(self, rng):
+        i = rng.randrange(len(self.prob))
+        return i if rng.random() < self.prob[i] else int(self.alias[i])
+
+
+class SeenSets:
+    """Per-user bitsets of question IDs already served (one bit per question)"""
+
+    def __init__(self, size):
+        self.words = (size + 63) // 64
+        self._bits = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            bits = self._bits.get(user_id)
+            if bits is None:
+                bits = self._bits[user_id] = np.zeros(self.words, dtype=np.uint64)
+            return bits
+
+    def loaded(self, user_id):
+        return user_id in self._bits
+
+    def add(self, user_id, question_ids):
+        bits = self.get(user_id)
+        ids = np.asarray(question_ids, dtype=np.int64)
+        if len(ids):
+            with self._lock:
+                np.bitwise_or.at(bits, ids >> 6, np.left_shift(np.uint64(1), (ids & 63).astype(np.uint64)))
+
+    @staticmethod
+    def contains(bits, question_id):
+        return bool((int(bits[question_id >> 6]) >> (question_id & 63)) & 1)
+
+    @staticmethod
+    def mask(bits, question_ids):
+        """Vectorized membership test for an array of IDs"""
+        ids = np.asarray(question_ids, dtype=np.int64)
+        return ((bits[ids >> 6] >> (ids & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
+
+
+def _text_hash(text):
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def load_records(path):
+    """Question dicts from either the nested {subject: {topic: {difficulty: [...]}}} file or a flat list"""
+    path = Path(path)
+    if not path.exists():
+        print(f"Error: Questions file not found at {path}")
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        print(f"Error decoding JSON from {path}: {e}")
+        return []
+
+    if isinstance(data, list):
+        return data
+    return [
+        dict(q, subject=subject, topic=topic, difficulty=difficulty)
+        for subject, topics in data.items()
+        for topic, difficulties in topics.items()
+        for difficulty, items in difficulties.items()
+        for q in items
+    ]
+
+
+def compile_questions(records, source=None):
+    """Serialize questions into the compiled bank format (returned as bytes).
+
+    Layout: magic, header length, JSON header (key and tag tables, array
+    offsets), then 8-byte aligned arrays. Questions are ordered by
+    (subject, topic, difficulty), so every index entry is a contiguous ID
+    range; each question's JSON record lives in one string arena addressed
+    by an offsets table, and a sorted hash table maps question text to ID.
+    """
+    questions = []
+    for q in records:
+        if not isinstance(q, dict) or "question" not in q or "options" not in q:
+            continue
+        questions.append(dict(
+            q,
+            subject=str(q.get("subject", "general")).lower(),
+            topic=str(q.get("topic", "general")).lower(),
+            difficulty=str(q.get("difficulty", "easy")).lower(),
+            tags=[str(t).lower() for t in q.get("tags", [])],
+        ))
+    questions.sort(key=lambda q: (q["subject"], q["topic"], q["difficulty"]))
+    n = len(questions)
+
+    keys, key_of = [], np.zeros(n, dtype=np.int32)
+    for qid, q in enumerate(questions):
+        key = [q["subject"], q["topic"], q["difficulty"]]
+        if not keys or keys[-1][:3] != key:
+            keys.append(key + [qid, qid])
+        keys[-1][4] = qid + 1
+        key_of[qid] = len(keys) - 1
+
+    by_tag = {}
+    for qid, q in enumerate(questions):
+        for tag in dict.fromkeys(q["tags"]):
+            by_tag.setdefault(tag, []).append(qid)
+    tags, tag_ids = {}, []
+    for tag, ids in sorted(by_tag.items()):
+        tags[tag] = [len(tag_ids), len(tag_ids) + len(ids)]
+        tag_ids.extend(ids)
+
+    blobs = [json.dumps(q, ensure_ascii=False, separators=(",", ":")).encode("utf-8") for q in questions]
+    offsets = np.zeros(n + 1, dtype=np.uint64)
+    offsets[1:] = np.cumsum([len(blob) for blob in blobs], dtype=np.uint64)
+    hashes = np.array([_text_hash(q["question"]) for q in questions], dtype=np.uint64)
+    hash_order = np.argsort(hashes, kind="stable")
+
+    arrays = {
+        "weights": np.array([float(q.get("weight", 1.0)) for q in questions], dtype=np.float64),
+        "key_of": key_of,
+        "offsets": offsets,
+        "tag_ids": np.array(tag_ids, dtype=np.int32),
+        "text_hashes": hashes[hash_order],
+        "text_ids": hash_order.astype(np.int32),
+        "arena": np.frombuffer(b"".join(blobs), dtype=np.uint8),
+    }
+    layout, position = {}, 0
+    for name, array in arrays.items():
+        layout[name] = [position, array.dtype.str, len(array)]
+        position = _align(position + array.nbytes)
+    header = json.dumps({"version": BANK_VERSION, "count": n, "keys": keys, "tags": tags,
+                         "source": source, "arrays": layout}).encode("utf-8")
+
+    out = io.BytesIO()
+    out.write(BANK_MAGIC)
+    out.write(struct.pack("<Q", len(header)))
+    out.write(header)
+    base = _align(out.tell())
+    for name, array in arrays.items():
+        out.seek(base + layout[name][0])
+        out.write(array.tobytes())
+    out.seek(0, io.SEEK_END)
+    out.write(b"\0" * (_align(out.tell()) - out.tell()))
+    return out.getvalue()
+
+
+class QuestionBank:
+    """Questions compiled to integer IDs, indexed by (subject, topic, difficulty) and by tag.
+
+    Wraps a compiled bank buffer (bytes, or a read-only mmap shared by every
+    process that opens the same file); arrays are zero-copy views into it and
+    a question's record is only decoded when asked for. Sampling k questions
+    costs O(k) draws regardless of bank size.
+    """
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        if bytes(buffer[:len(BANK_MAGIC)]) != BANK_MAGIC:
+            raise ValueError("Not a compiled question bank")
+        (header_len,) = struct.unpack("<Q", buffer[len(BANK_MAGIC):len(BANK_MAGIC) + 8])
+        start = len(BANK_MAGIC) + 8
+        header = json.loads(bytes(buffer[start:start + header_len]))
+        if header["version"] != BANK_VERSION:
+            raise ValueError(f"Unsupported question bank version {header['version']}")
+        base = _align(start + header_len)
+        arrays = {
+            name: np.frombuffer(buffer, dtype=np.dtype(dtype), count=length, offset=base + offset)
+            for name, (offset, dtype, length) in header["arrays"].items()
+        }
+        self.source = header["source"]
+        self.count = header["count"]
+        self.keys = [tuple(key[:3]) for key in header["keys"]]
+        self._ranges = {tuple(key[:3]): (key[3], key[4]) for key in header["keys"]}
+        self.by_tag = {tag: arrays["tag_ids"][lo:hi] for tag, (lo, hi) in header["tags"].items()}
+        self.weights = arrays["weights"]
+        self.key_of = arrays["key_of"]
+        self._offsets = arrays["offsets"]
+        self._arena = arrays["arena"]
+        self._text_hashes = arrays["text_hashes"]
+        self._text_ids = arrays["text_ids"]
+        self._pools = {}
+        self._filtered = {}
+        self._alias = {}
+        self._alias_lock = threading.Lock()
+
+    @classmethod
+    def from_records(cls, records):
+        return cls(compile_questions(records))
+
+    @classmethod
+    def from_json(cls, path):
+        """Parse and compile a JSON bank in memory"""
+        return cls.from_records(load_records(path))
+
+    @classmethod
+    def open(cls, path):
+        """Memory-map a compiled bank file read-only"""
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @staticmethod
+    def read_source(path):
+        """The source stamp of a compiled bank file, read from its header without mapping the file"""
+        with open(path, "rb") as f:
+            if f.read(len(BANK_MAGIC)) != BANK_MAGIC:
+                raise ValueError("Not a compiled question bank")
+            length = f.read(8)
+            if len(length) != 8:
+                raise ValueError("Truncated question bank header")
+            header = json.loads(f.read(struct.unpack("<Q", length)[0]))
+        if header.get("version") != BANK_VERSION:
+            raise ValueError(f"Unsupported question bank version {header.get('version')}")
+        return header["source"]
+
+    def __len__(self):
+        return self.count
+
+    def subjects(self):
+        return sorted({s for s, _, _ in self.keys})
+
+    def topics(self, subject):
+        return sorted({t for s, t, _ in self.keys if s == subject})
+
+    def difficulties(self, subject, topic):
+        found = {d for s, t, d in self.keys if s == subject and t == topic}
+        return sorted(found, key=lambda d: (DIFFICULTY_ORDER.get(d, len(DIFFICULTY_ORDER)), d))
+
+    def question(self, qid):
+        record = json.loads(self._arena[int(self._offsets[qid]):int(self._offsets[qid + 1])].tobytes())
+        record["id"] = int(qid)
+        return record
+
+    def text(self, qid):
+        return self.question(qid)["question"]
+
+    def id_for_text(self, text):
+        """Binary search of the text hash table; None if the question is not in this bank"""
+        h = np.uint64(_text_hash(text))
+        i = int(np.searchsorted(self._text_hashes, h))
+        while i < self.count and self._text_hashes[i] == h:
+            qid = int(self._text_ids[i])
+            if self.text(qid) == text:
+                return qid
+            i += 1
+        return None
+
+    def candidates(self, subject, topic, difficulty, tags=None):
+        span = self._ranges.get((subject, topic, difficulty))
+        if span is None:
+            return np.empty(0, dtype=np.int32)
+        ids = self._pools.get(span)
+        if ids is None:
+            ids = self._pools[span] = np.arange(*span, dtype=np.int32)
+        if not tags:
+            return ids
+        key = (subject, topic, difficulty, tuple(sorted(tags)))
+        filtered = self._filtered.get(key)
+        if filtered is None:
+            filtered = ids
+            for tag in key[3]:
+                filtered = np.intersect1d(filtered, self.by_tag.get(tag, np.empty(0, dtype=np.int32)),
+                                          assume_unique=True)
+            self._filtered[key] = filtered
+        return filtered
+
+    def _alias_for(self, key, pool):
+        with self._alias_lock:
+            table = self._alias.get(key)
+            if table is None:
+                table = self._alias[key] = AliasTable(self.weights[pool])
+            return table
+
+    def sample(self, subject, topic, difficulty, k, seen=None, tags=None, weighted=False, rng=None):
+        """Up to k distinct question IDs, unseen ones first.
+
+        Draws are rejected when already picked or set in the seen bitset, so
+        the cost is O(k) while most of the pool is unseen; once rejections
+        pile up it switches to one vectorized pass over the pool.
+        """
+        rng = rng or random
+        pool = self.candidates(subject, topic, difficulty, tags)
+        n = len(pool)
+        if n == 0 or k <= 0:
+            return []
+        k = min(k, n)
+        key = (subject, topic, difficulty, tuple(sorted(tags or ())))
+        draw = self._alias_for(key, pool).draw if weighted else (lambda r: r.randrange(n))
+
+        picked, picked_set = [], set()
+        attempts = 0
+        while len(picked) < k and attempts < 4 * k + 16:
+            attempts += 1
+            qid = int(pool[draw(rng)])
+            if qid in picked_set or (seen is not None and SeenSets.contains(seen, qid)):
+                continue
+            picked.append(qid)
+            picked_set.add(qid)
+        if len(picked) == k:
+            return picked
+
+        # Most of the pool is seen or already picked: choose from what is left directly
+        unseen = ~SeenSets.mask(seen, pool) if seen is not None else np.ones(n, dtype=bool)
+        unseen &= ~np.isin(pool, picked)
+        remaining = self._choose(pool[unseen], k - len(picked), weighted, rng)
+        picked.extend(remaining)
+        if len(picked) < k:
+            # Every question here has been seen: top up with repeats rather than return a short quiz
+            leftover = pool[~np.isin(pool, picked)]
+            picked.extend(self._choose(leftover, k - len(picked), weighted, rng))
+        return picked
+
+    def _choose(self, ids, k, weighted, rng):
+        if k <= 0 or len(ids) == 0:
+            return []
+        k = min(k, len(ids))
+        if not weighted:
+            return [int(i) for i in rng.sample(list(ids), k)]
+        gen = np.random.default_rng(rng.getrandbits(32))
+        p = self.weights[ids] / self.weights[ids].sum()
+        return [int(i) for i in gen.choice(ids, size=k, replace=False, p=p)]
+
+
+def _source_stamp(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _bank_stamp(json_path, extra):
+    return [_source_stamp(json_path), extra.stamp() if extra is not None else None]
+
+
+def ensure_compiled(json_path, compiled_path=None, extra=None):
+    """Recompile into json_path's .bank file if any source changed; the swap is an atomic rename.
+
+    extra is an optional second source of questions (such as generated ones)
+    with stamp() and records() methods.
+    """
+    json_path = Path(json_path)
+    compiled_path = Path(compiled_path or json_path.with_suffix(".bank"))
+    stamp = _bank_stamp(json_path, extra)
+    if compiled_path.exists():
+        try:
+            # Only the header is read: a mapping left open here would block the os.replace below on Windows
+            if (stamp[0] is None and extra is None) or QuestionBank.read_source(compiled_path) == stamp:
+                return compiled_path
+        except (ValueError, KeyError, OSError) as e:
+            print(f"Recompiling unreadable question bank {compiled_path}: {e}")
+    records = load_records(json_path) + (extra.records() if extra is not None else [])
+    data = compile_questions(records, source=stamp)
+    tmp_path = compiled_path.with_name(f"{compiled_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, compiled_path)
+    return compiled_path
+
+
+class BankWatcher:
+    """The current mmap'd bank for a JSON source, swapped for a recompiled one when a source changes"""
+
+    def __init__(self, json_path, check_interval=None, extra=None):
+        self.json_path = Path(json_path)
+        self.extra = extra
+        self.check_interval = check_interval if check_interval is not None else Config.QUESTION_BANK_CHECK_SECONDS
+        self._lock = threading.Lock()
+        self._stamp = _bank_stamp(self.json_path, extra)
+        self._bank = QuestionBank.open(ensure_compiled(self.json_path, extra=extra))
+        self._checked_at = time.monotonic()
+        self.reloads = 0
+
+    def current(self):
+        """Costs one stat() (plus extra.stamp()) per check_interval; readers holding the old bank keep using it"""
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return self._bank
+        with self._lock:
+            if time.monotonic() - self._checked_at >= self.check_interval:
+                self._checked_at = time.monotonic()
+                stamp = _bank_stamp(self.json_path, self.extra)
+                if stamp != self._stamp and (stamp[0] is not None or self.extra is not None):
+                    self._bank = QuestionBank.open(ensure_compiled(self.json_path, extra=self.extra))
+                    self._stamp = stamp
+                    self.reloads += 1
+        return self._bank
+
+    def refresh(self):
+        """Check the sources now instead of waiting for the next interval"""
+        with self._lock:
+            self._checked_at = float("-inf")
+        return self.current()
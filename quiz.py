@@ -1,66 +1,116 @@
-import json
-import random
-from pathlib import Path
+import threading
 
-class QuizEngine:
-    def __init__(self, data_path="data/questions.json"):
-        self.data_path = Path(data_path)
-        self.questions = self.load_questions()
-
-    def load_questions(self):
-        """Load questions from JSON file, return empty dict if file doesn't exist or is invalid"""
-        if not self.data_path.exists():
-            print(f"Error: Questions file not found at {self.data_path}")
-            return {}
-
-        try:
-            with open(self.data_path, "r") as f:
-                return json.load(f)
-        except json.JSONDecodeError as e:
-            print(f"Error decoding JSON from {self.data_path}: {e}")
-            return {}
-        except Exception as e:
-            print(f"Error loading questions: {e}")
-            return {}
-
-    def get_questions(self, subject, topic, difficulty, num_questions=3):
-        """Get random questions matching the criteria"""
-        try:
-            # Convert all parameters to lowercase for case-insensitive matching
-            subject = subject.lower()
-            topic = topic.lower()
-            difficulty = difficulty.lower()
+from adaptive import AdaptiveEngine
+from attempt_recorder import get_attempt_recorder
+from llm_gateway import LLMError
+from question_bank import BankWatcher, SeenSets
+from quiz_generator import GeneratedQuestionStore, QuestionPregenerator
 
-            # Debug print to show what we're looking for
-            print(f"Looking for: Subject={subject}, Topic={topic}, Difficulty={difficulty}")
-
-            # Get the matching questions with more error checking
-            subject_data = self.questions.get(subject, {})
-            if not subject_data:
-                print(f"No questions found for subject: {subject}")
-                return []
+class QuizEngine:
+    def __init__(self, data_path="data/questions.json", recorder=None, history=None, adaptive=None,
+                 generator=None):
+        self.recorder = recorder or get_attempt_recorder()
+        # Generated questions are merged into the compiled bank alongside the JSON file
+        self.generated = GeneratedQuestionStore(self.recorder.db_path) if generator is not None else None
+        # Compiled once to a .bank file next to the JSON and memory-mapped; reloaded when a source changes
+        self.watcher = BankWatcher(data_path, extra=self.generated)
+        self._bank = self.watcher.current()
+        self._swap_lock = threading.Lock()
+        self.seen = SeenSets(len(self._bank))
+        # Anything with answered_questions(user_id); used to seed a user's seen-set once
+        self.history = history
+        self.adaptive = adaptive or AdaptiveEngine(self._bank, db_path=self.recorder.db_path)
+        # Call pregenerator.start() to keep pools filled in the background
+        self.pregenerator = (QuestionPregenerator(self, generator, self.generated)
+                             if generator is not None else None)
 
-            topic_data = subject_data.get(topic, {})
-            if not topic_data:
-                print(f"No questions found for topic: {topic} in subject: {subject}")
-                return []
+    @property
+    def bank(self):
+        """The current bank; question IDs are only meaningful within one bank version"""
+        bank = self.watcher.current()
+        if bank is not self._bank:
+            with self._swap_lock:
+                if bank is not self._bank:
+                    # IDs change with a recompile: seen-sets re-seed from history and estimates reload by text
+                    self.seen = SeenSets(len(bank))
+                    self.adaptive.rebind(bank)
+                    self._bank = bank
+        return bank
 
-            difficulty_data = topic_data.get(difficulty, [])
-            if not difficulty_data:
-                print(f"No questions found for difficulty: {difficulty} in topic: {topic}")
-                return []
+    def _seen_for(self, bank, user_id):
+        seen = self.seen
+        if not seen.loaded(user_id) and self.history is not None:
+            try:
+                answered = self.history.answered_questions(user_id)
+            except Exception as e:
+                print(f"Could not load question history for {user_id}: {e}")
+                answered = []
+            seen.add(user_id, [qid for qid in map(bank.id_for_text, answered) if qid is not None])
+        return seen.get(user_id)
 
-            # Debug print to show how many questions were found
-            print(f"Found {len(difficulty_data)} questions matching criteria")
+    def _generate(self, subject, topic, difficulty, count, user_id=None):
+        """Synchronously generate questions for a key with none, then have the worker top it up"""
+        if self.pregenerator is None:
+            return False
+        self.pregenerator.fill(subject, topic, difficulty, count, minimum=count, user_id=user_id)
+        self.pregenerator.request(subject, topic)
+        # Also picks up questions the worker stored while this request waited for it
+        bank = self.watcher.refresh()
+        return len(bank.candidates(subject.lower(), topic.lower(), difficulty.lower())) > 0
 
-            # Return random sample
-            return random.sample(difficulty_data, min(num_questions, len(difficulty_data)))
-            
+    def get_questions(self, subject, topic, difficulty, num_questions=3, user_id=None,
+                      tags=None, weighted=False):
+        """Sample questions matching the criteria; with a user_id, questions they have seen come last"""
+        try:
+            bank = self.bank
+            seen = self._seen_for(bank, str(user_id)) if user_id is not None else None
+            ids = bank.sample(subject.lower(), topic.lower(), difficulty.lower(), num_questions,
+                              seen=seen, tags=tags, weighted=weighted)
+            if not ids and self._generate(subject, topic, difficulty, num_questions, user_id):
+                bank = self.bank
+                seen = self._seen_for(bank, str(user_id)) if user_id is not None else None
+                ids = bank.sample(subject.lower(), topic.lower(), difficulty.lower(), num_questions,
+                                  seen=seen, tags=tags, weighted=weighted)
+            if user_id is not None:
+                self.seen.add(str(user_id), ids)
+            return [bank.question(qid) for qid in ids]
+        except LLMError:
+            raise
         except Exception as e:
             print(f"Error in get_questions: {e}")
             return []
 
-    def save_score(self, username, subject, topic, difficulty, score, total):
-        """Log the user's score"""
-        print(f"[SCORE LOG] User: {username}, Subject: {subject}, Topic: {topic}, "
-              f"Difficulty: {difficulty}, Score: {score}/{total}")
\ No newline at end of file
+    def next_adaptive_question(self, user_id, subject, topic, asked=()):
+        """The most informative unseen question for this student right now, or None if the topic is exhausted.
+
+        asked holds the question dicts already served in this quiz.
+        """
+        if not subject or not topic:
+            return None
+        bank = self.bank
+        user_id = str(user_id)
+        exclude = [qid for qid in (bank.id_for_text(q['question']) for q in asked) if qid is not None]
+        qid = self.adaptive.next_question(user_id, subject.lower(), topic.lower(), exclude=exclude,
+                                          seen=self._seen_for(bank, user_id))
+        if qid is None and not asked and self._generate(subject, topic, "medium", 3, user_id):
+            bank = self.bank
+            qid = self.adaptive.next_question(user_id, subject.lower(), topic.lower(),
+                                              seen=self._seen_for(bank, user_id))
+        if qid is None:
+            return None
+        self.seen.add(user_id, [qid])
+        return bank.question(qid)
+
+    def record_answer(self, user_id, question, correct):
+        """Online ability/difficulty update for one answered question dict; returns the new ability estimate"""
+        qid = self.bank.id_for_text(question['question'])
+        if qid is None:
+            # Removed from the bank since it was served
+            return self.adaptive.ability(user_id)
+        return self.adaptive.update(user_id, qid, correct)
+
+    def save_score(self, username, subject, topic, difficulty, score, total, answers=None,
+                   started_at=None):
+        """Queue the attempt for persistence; returns immediately, the write happens in the background"""
+        self.recorder.record(username, subject, topic, difficulty, score, total,
+                             answers=answers, started_at=started_at)
@@ -0,0 +1,197 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+from config import Config
+from database import get_pool
+from analytics_aggregates import apply_attempts, db_timestamp
+
+ATTEMPT_COLUMNS = "user_id AS username, subject, topic, difficulty, score, total, timestamp"
+CATEGORY_COLUMNS = ["username", "subject", "topic", "difficulty"]
+READ_CHUNK_ROWS = 100_000
+
+
+def typed_attempts(df):
+    """Apply defaults, validation and compact dtypes to an attempts frame, one column at a time"""
+    for column in CATEGORY_COLUMNS:
+        default = "" if column == "username" else "Unknown"
+        df[column] = df[column].fillna(default).astype("category")
+    total = pd.to_numeric(df["total"], errors="coerce").fillna(1).clip(lower=1)
+    score = pd.to_numeric(df["score"], errors="coerce").fillna(0).clip(lower=0)
+    df["total"] = total.astype("int32")
+    df["score"] = score.where(score <= total, total).astype("int32")
+    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+    return df
+
+
+def _legacy_row(record):
+    """A quiz_results row from one record of the legacy JSON score file; raises if it is malformed"""
+    return {"user_id": str(record.get("username", "")), "subject": record.get("subject", "Unknown"),
+            "topic": record.get("topic", "Unknown"), "difficulty": record.get("difficulty", "Unknown"),
+            "score": int(record.get("score", 0)), "total": int(record.get("total", 1)),
+            "timestamp": db_timestamp(record.get("timestamp") or None)}
+
+
+class ScoreStore:
+    """Append-only quiz score history in the quiz_results table (WAL mode, indexed by user and subject)"""
+
+    def __init__(self, db_path=None):
+        self.db_path = str(db_path or Config.EDUTUTOR_DB_PATH)
+        self.pool = get_pool(self.db_path)
+        for legacy_path in Config.LEGACY_SCORE_FILES:
+            self.migrate_json(legacy_path)
+
+    def connect(self):
+        """This thread's pooled connection; use it as a context manager to commit, never close it"""
+        return self.pool.connection()
+
+    def add_score(self, user_id, subject, topic, difficulty, score, total, timestamp=None):
+        attempt = {
+            "user_id": str(user_id), "subject": subject, "topic": topic, "difficulty": difficulty,
+            "score": int(score), "total": int(total),
+            "timestamp": db_timestamp(timestamp),
+        }
+        with self.connect() as conn:
+            self._insert(conn, [attempt])
+
+    def _insert(self, conn, attempts):
+        conn.executemany(
+            "INSERT INTO quiz_results (user_id, subject, topic, difficulty, score, total, timestamp) "
+            "VALUES (:user_id, :subject, :topic, :difficulty, :score, :total, :timestamp)", attempts,
+        )
+        apply_attempts(conn, attempts)
+
+    def _read_attempts(self, where="", params=(), order="ORDER BY timestamp", limit=None):
+        query = f"SELECT {ATTEMPT_COLUMNS} FROM quiz_results {where} {order}"
+        params = list(params)
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self.connect() as conn:
+            # Typed chunk by chunk, so large histories never exist as a full frame of Python objects
+            frames = [typed_attempts(chunk) for chunk in
+                      pd.read_sql_query(query, conn, params=params, chunksize=READ_CHUNK_ROWS)]
+        if not frames:
+            return typed_attempts(pd.DataFrame(columns=[c.split()[-1] for c in ATTEMPT_COLUMNS.split(", ")]))
+        if len(frames) > 1:
+            for column in CATEGORY_COLUMNS:
+                categories = union_categoricals([frame[column] for frame in frames]).categories
+                for frame in frames:
+                    frame[column] = frame[column].cat.set_categories(categories)
+        return pd.concat(frames, ignore_index=True)
+
+    def load_user(self, user_id):
+        """One student's attempts in time order, read through the (user_id, timestamp) index"""
+        return self._read_attempts("WHERE user_id = ?", (str(user_id),))
+
+    def load_recent(self, subject=None, limit=500):
+        """The most recent attempts, optionally for one subject"""
+        if subject:
+            return self._read_attempts("WHERE subject = ?", (subject,), "ORDER BY id DESC", limit)
+        return self._read_attempts(order="ORDER BY id DESC", limit=limit)
+
+    def scores_by_user(self, subject=None):
+        """Total score per student, read from the materialized aggregates"""
+        query = "SELECT user_id AS username, SUM(score_sum) AS score FROM student_aggregates"
+        params = []
+        if subject:
+            query += " WHERE subject = ?"
+            params.append(subject)
+        query += " GROUP BY user_id"
+        with self.connect() as conn:
+            return pd.read_sql_query(query, conn, params=params).set_index("username")["score"]
+
+    def student_summary(self, subject=None):
+        """One row per student: attempts, overall percentage, last attempt and recent trend"""
+        query = ("SELECT user_id, attempts, score_sum, total_sum, last_timestamp, recent_pcts "
+                 "FROM student_aggregates")
+        params = []
+        if subject:
+            query += " WHERE subject = ?"
+            params.append(subject)
+        with self.connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        summary = {}
+        for user_id, attempts, score_sum, total_sum, last_ts, recent in rows:
+            entry = summary.setdefault(user_id, [0, 0, 0, "", []])
+            entry[0] += attempts
+            entry[1] += score_sum
+            entry[2] += total_sum
+            if (last_ts or "") > entry[3]:
+                entry[3] = last_ts
+            entry[4].extend(json.loads(recent))
+
+        return pd.DataFrame(
+            [
+                {
+                    "username": user_id,
+                    "attempts": attempts,
+                    "score": score_sum,
+                    "Percentage": round(score_sum / total_sum * 100, 2) if total_sum else 0.0,
+                    "last_attempt": last_ts,
+                    "recent": recent[-Config.ANALYTICS_TREND_LENGTH:],
+                }
+                for user_id, (attempts, score_sum, total_sum, last_ts, recent) in sorted(summary.items())
+            ],
+            columns=["username", "attempts", "score", "Percentage", "last_attempt", "recent"],
+        )
+
+    def topic_breakdown(self, user_id):
+        """One student's aggregates per subject, topic and difficulty"""
+        with self.connect() as conn:
+            df = pd.read_sql_query(
+                "SELECT subject, topic, difficulty, attempts, score_sum, total_sum, last_timestamp "
+                "FROM student_aggregates WHERE user_id = ? ORDER BY subject, topic, difficulty",
+                conn, params=(str(user_id),),
+            )
+        df["Percentage"] = (df["score_sum"] / df["total_sum"].where(df["total_sum"] > 0) * 100).round(2)
+        return df
+
+    def answered_questions(self, user_id):
+        """Text of every question this user has answered (for no-repeat quiz sampling)"""
+        with self.connect() as conn:
+            return [row[0] for row in conn.execute(
+                "SELECT DISTINCT a.question FROM quiz_results r JOIN quiz_answers a ON a.result_id = r.id "
+                "WHERE r.user_id = ?", (str(user_id),),
+            )]
+
+    def subjects(self):
+        with self.connect() as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT subject FROM student_aggregates ORDER BY subject")]
+
+    def usernames(self):
+        with self.connect() as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT user_id FROM student_aggregates ORDER BY user_id")]
+
+    def migrate_json(self, json_path):
+        """Import a legacy JSON score file once; returns the number of rows imported"""
+        json_path = Path(json_path)
+        name = f"scores_json:{json_path.name}"
+        with self.connect() as conn:
+            if conn.execute("SELECT 1 FROM applied_migrations WHERE name = ?", (name,)).fetchone():
+                return 0
+            records = []
+            if json_path.exists():
+                try:
+                    with open(json_path, "r", encoding="utf-8-sig") as f:
+                        data = json.load(f)
+                    records = data if isinstance(data, list) else []
+                except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                    print(f"Skipping unreadable score file {json_path}: {e}")
+
+            rows, skipped = [], 0
+            for r in records:
+                try:
+                    rows.append(_legacy_row(r))
+                except (AttributeError, TypeError, ValueError, OverflowError, OSError) as e:
+                    # One malformed record must not keep the store (and the app) from starting
+                    skipped += 1
+                    print(f"Skipping malformed score record in {json_path}: {r!r} ({e})")
+            if skipped:
+                print(f"Imported {len(rows)} score records from {json_path}, skipped {skipped}")
+            # Rows and the migration marker commit together, so a crash cannot import twice
+            self._insert(conn, rows)
+            conn.execute("INSERT INTO applied_migrations (name) VALUES (?)", (name,))
+            return len(rows)
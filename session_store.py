@@ -0,0 +1,124 @@
+"""Server-side sessions behind a signed cookie, so a browser refresh or reconnect resumes where it left off.
+
+Streamlit's session_state lives only as long as one websocket connection.
+SessionStore keeps the parts worth restoring (who is logged in, the quiz
+in progress, small per-session caches) under a random session ID. The
+browser only holds that ID, signed with SECRET_KEY. Hot sessions sit in
+an in-memory LRU as JSON; every change is also written to the sessions
+table, so sessions survive evictions and restarts. A reconnect is one
+dict lookup, or one primary-key read after an eviction.
+"""
+import json
+import secrets
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+from database import get_pool
+from oauth import SessionSigner
+
+# session_state keys that are saved and restored
+PERSISTED_KEYS = ("user", "session_token", "current_quiz", "session_cache")
+
+
+class SessionStore:
+    def __init__(self, db_path=None, capacity=None, idle_seconds=None, signer=None):
+        self.pool = get_pool(db_path)
+        self.capacity = capacity or Config.SESSION_CACHE_CAPACITY
+        self.idle_seconds = idle_seconds or Config.SESSION_IDLE_SECONDS
+        self.signer = signer or SessionSigner()
+        # sid -> [last_seen, serialized data, last written]; only the JSON is kept, so callers get private copies
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.purge()
+
+    def cookie_for(self, sid):
+        """Signed cookie value for a session ID; it expires with the idle timeout and is renewed on use"""
+        return self.signer.sign({"sid": sid}, ttl_seconds=self.idle_seconds)
+
+    def sid_from_cookie(self, cookie):
+        claims = self.signer.verify(cookie) if cookie else None
+        return claims.get("sid") if claims else None
+
+    def create(self, data):
+        """Start a session holding data; returns its ID"""
+        sid = secrets.token_urlsafe(24)
+        self.save(sid, data)
+        return sid
+
+    def load(self, sid):
+        """The session's data, or None if it does not exist or has been idle too long"""
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(sid)
+            if entry is not None:
+                if entry[0] < now - self.idle_seconds:
+                    del self._sessions[sid]
+                    entry = None
+                else:
+                    entry[0] = now
+                    self._sessions.move_to_end(sid)
+                    self.hits += 1
+                    serialized = entry[1]
+        if entry is not None:
+            return json.loads(serialized)
+        self.misses += 1
+        row = self.pool.execute("SELECT data, last_seen FROM sessions WHERE id = ?", (sid,)).fetchone()
+        if row is None or row[1] < now - self.idle_seconds:
+            return None
+        self._remember(sid, now, row[0], row[1])
+        return json.loads(row[0])
+
+    def save(self, sid, data):
+        """Store data for sid; the database is written when the data changed or its last_seen grows stale"""
+        serialized = json.dumps(data, separators=(",", ":"), default=str)
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(sid)
+            written = entry[2] if entry is not None and entry[1] == serialized else None
+        if written is None or written < now - self.idle_seconds / 4:
+            with self.pool.transaction() as conn:
+                conn.execute("INSERT OR REPLACE INTO sessions (id, user_id, data, last_seen) VALUES (?, ?, ?, ?)",
+                             (sid, (data.get("user") or {}).get("username"), serialized, now))
+            written = now
+        self._remember(sid, now, serialized, written)
+
+    def _remember(self, sid, now, serialized, written):
+        with self._lock:
+            self._sessions[sid] = [now, serialized, written]
+            self._sessions.move_to_end(sid)
+            while len(self._sessions) > self.capacity:
+                self._sessions.popitem(last=False)  # Still in SQLite; reloads on its next request
+
+    def delete(self, sid):
+        with self._lock:
+            self._sessions.pop(sid, None)
+        with self.pool.transaction() as conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (sid,))
+
+    def purge(self):
+        """Drop idle sessions from memory and disk; returns how many rows were deleted"""
+        cutoff = time.time() - self.idle_seconds
+        with self._lock:
+            for sid in [sid for sid, entry in self._sessions.items() if entry[0] < cutoff]:
+                del self._sessions[sid]
+        with self.pool.transaction() as conn:
+            return conn.execute("DELETE FROM sessions WHERE last_seen < ?", (cutoff,)).rowcount
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def memory_bytes(self):
+        """Approximate memory held by the in-memory sessions: IDs, entries and their JSON"""
+        with self._lock:
+            return sum(sys.getsizeof(sid) + sys.getsizeof(entry) + sum(map(sys.getsizeof, entry))
+                       for sid, entry in self._sessions.items())
+
+
+def snapshot(session_state):
+    """The persisted part of a Streamlit session_state"""
+    return {key: session_state[key] for key in PERSISTED_KEYS if key in session_state}
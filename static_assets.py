@@ -0,0 +1,128 @@
+"""Background image delivery: Streamlit static serving when enabled, otherwise a once-per-process data URI.
+
+Optional build step (needs Pillow) that writes downscaled WebP/AVIF variants into static/:
+
+    python static_assets.py --width 1920 --quality 80 --formats webp avif
+"""
+import argparse
+import base64
+import hashlib
+import shutil
+from functools import lru_cache
+
+from config import Config
+
+MIME_TYPES = {".webp": "image/webp", ".avif": "image/avif", ".png": "image/png"}
+# Smallest first; Streamlit serves .avif as text/plain, so static URLs only use WebP and PNG
+VARIANT_ORDER = [".avif", ".webp", ".png"]
+STATIC_VARIANTS = [".webp", ".png"]
+
+BACKGROUND_CSS = """
+<style>
+.stApp {{
+    background-image: linear-gradient(rgba(255,255,255,0.95), rgba(255,255,255,0.95)),
+                      {bg_image};
+    background-size: cover;
+    background-position: center;
+    background-attachment: fixed;
+}}
+.main .block-container {{
+    background-color: rgba(255, 255, 255, 0.95);
+    border-radius: 15px;
+    padding: 3rem;
+    margin-top: 2rem;
+}}
+.stButton>button {{
+    background-color: #4a6fa5 !important;
+    color: white;
+}}
+</style>
+"""
+FALLBACK_IMAGE = "url('https://images.unsplash.com/photo-1523050854058-8df90110c9f1')"
+
+
+def variant_path(suffix):
+    return Config.STATIC_DIR / f"{Config.BACKGROUND_STATIC_NAME}{suffix}"
+
+
+def ensure_static_background():
+    """Make sure static/ has something to serve; copies the source PNG if no build has run"""
+    if any(variant_path(s).exists() for s in STATIC_VARIANTS):
+        return
+    if Config.BACKGROUND_IMAGE.exists():
+        Config.STATIC_DIR.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(Config.BACKGROUND_IMAGE, variant_path(".png"))
+
+
+@lru_cache(maxsize=8)
+def _file_digest(path, mtime):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+@lru_cache(maxsize=8)
+def _data_uri(path, mtime):
+    with open(path, "rb") as f:
+        encoded = base64.b64encode(f.read()).decode()
+    mime = MIME_TYPES.get(path[path.rfind("."):], "image/png")
+    return f"url('data:{mime};base64,{encoded}')"
+
+
+def background_image_url(static_serving):
+    """CSS url() for the background; file reads and encoding happen once per file version"""
+    if static_serving:
+        ensure_static_background()
+        for suffix in STATIC_VARIANTS:
+            path = variant_path(suffix)
+            if path.exists():
+                # ?v= makes Tornado send a far-future Cache-Control; the digest changes with the file
+                version = _file_digest(str(path), path.stat().st_mtime)
+                return f"url('app/static/{path.name}?v={version}')"
+
+    candidates = [variant_path(s) for s in VARIANT_ORDER] + [Config.BACKGROUND_IMAGE]
+    for path in candidates:
+        if path.exists():
+            return _data_uri(str(path), path.stat().st_mtime)
+    return None
+
+
+def background_css(static_serving):
+    bg_image = background_image_url(static_serving)
+    return BACKGROUND_CSS.format(bg_image=bg_image or FALLBACK_IMAGE), bg_image is not None
+
+
+def build_variants(width, quality, formats):
+    """Downscale the background once and write each requested format to static/"""
+    try:
+        from PIL import Image, features
+    except ImportError:
+        print("Pillow is not installed; copying the original PNG instead")
+        ensure_static_background()
+        return
+
+    Config.STATIC_DIR.mkdir(parents=True, exist_ok=True)
+    with Image.open(Config.BACKGROUND_IMAGE) as source:
+        image = source.convert("RGB")
+    if image.width > width:
+        image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+
+    for fmt in formats:
+        if not features.check(fmt):
+            print(f"Skipping {fmt}: not supported by this Pillow build")
+            continue
+        path = variant_path(f".{fmt}")
+        image.save(path, fmt.upper(), quality=quality)
+        print(f"Wrote {path} ({path.stat().st_size / 1024:.0f} KiB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build downscaled background image variants")
+    parser.add_argument("--width", type=int, default=Config.BACKGROUND_MAX_WIDTH)
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--formats", nargs="+", default=["webp"], choices=["webp", "avif"])
+    args = parser.parse_args()
+    build_variants(args.width, args.quality, args.formats)
+
+
+if __name__ == "__main__":
+    main()
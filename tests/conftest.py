@@ -0,0 +1,15 @@
+"""Shared setup for the unit tests; run them from the repository root with python -m pytest"""
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """A fresh database file per test, so the process-wide pools never share one"""
+    return tmp_path / "edututor.db"
@@ -0,0 +1,162 @@
+"""Deterministic fakes and fixtures shared by the unit tests and the benchmarks.
+
+Nothing here needs a model or the network: hashed bag-of-words embeddings,
+synthetic documents and passages, and an RSA key that signs ID tokens.
+Benchmarks import them from here (run from the repository root).
+"""
+import hashlib
+import json
+import random
+import zlib
+
+import numpy as np
+
+from oauth import SHA256_DIGEST_INFO, b64url_encode
+
+# Short biology passage and questions about it
+CONTEXT = ("The mitochondria is the powerhouse of the cell. It produces ATP through cellular "
+           "respiration, which takes place in the inner membrane. Chloroplasts, found in plant "
+           "cells, carry out photosynthesis and convert light energy into chemical energy.")
+QUESTIONS = ["What produces ATP?", "Where does respiration take place?",
+             "What do chloroplasts do?", "What is the powerhouse of the cell?"]
+
+# Short factual questions the quantized backends must answer like fp32
+PARITY_SET = [
+    ("What produces ATP?", CONTEXT),
+    ("Where does cellular respiration take place?", CONTEXT),
+    ("What do chloroplasts convert light energy into?", CONTEXT),
+    ("Who wrote Hamlet?", "Hamlet is a tragedy written by William Shakespeare sometime between 1599 and 1601."),
+    ("When did World War II end?", "World War II ended in 1945 after the surrender of Germany in May and Japan in September."),
+    ("What is the chemical symbol for gold?", "Gold is a chemical element with the symbol Au and atomic number 79."),
+    ("What is the boiling point of water?", "At sea level, water boils at 100 degrees Celsius, or 212 degrees Fahrenheit."),
+    ("What is a noun?", "A noun is a word that names a person, place, thing or idea, while a verb describes an action."),
+]
+
+# Facts hidden in long filler passages, each with the question that finds it
+FACTS = [
+    ("The mitochondria produces ATP through cellular respiration.", "What produces ATP?"),
+    ("Chloroplasts convert light energy into chemical energy during photosynthesis.",
+     "What do chloroplasts convert light energy into?"),
+    ("The Treaty of Westphalia was signed in 1648.", "When was the Treaty of Westphalia signed?"),
+    ("Marie Curie won the Nobel Prize in Chemistry in 1911.", "What did Marie Curie win in 1911?"),
+    ("The Amazon river flows into the Atlantic Ocean.", "Into which ocean does the Amazon flow?"),
+    ("Newton described gravity in the Principia, published in 1687.", "In which work did Newton describe gravity?"),
+]
+FILLER = ("Students reviewed the chapter notes and discussed the examples with their teacher before "
+          "moving on to the exercises at the end of the unit.")
+
+VOCABULARY = [f"term{n}" for n in range(5000)]
+
+
+def make_passage(words, count, seed=7):
+    """About `words` words of filler with `count` facts spread through it; returns (passage, questions)"""
+    rng = random.Random(seed)
+    filler = FILLER.split()
+    sentences = [" ".join(filler[k:] + filler[:k])
+                 for k in (rng.randrange(len(filler)) for _ in range(words // len(filler) + 1))]
+    facts = FACTS[:count]
+    for n, (fact, _) in enumerate(facts):
+        sentences.insert((n + 1) * len(sentences) // (len(facts) + 1), fact)
+    return " ".join(sentences), [question for _, question in facts]
+
+
+def pipeline_answers(qa_pipeline, items):
+    """Answer a list of (question, context) pairs as one padded pipeline batch"""
+    results = qa_pipeline(question=[question for question, _ in items], context=[context for _, context in items],
+                          batch_size=len(items))
+    # The pipeline unwraps single-item batches
+    return results if isinstance(results, list) else [results]
+
+
+class HashEmbedder:
+    """Bag-of-words embeddings from fixed random vectors per hashed word; deterministic and model-free"""
+
+    def __init__(self, dimension=384, buckets=4096, seed=0):
+        self.table = np.random.default_rng(seed).standard_normal((buckets, dimension)).astype("float32")
+        self.buckets = buckets
+
+    def get_sentence_embedding_dimension(self):
+        return self.table.shape[1]
+
+    def encode(self, texts, batch_size=None, convert_to_numpy=True, normalize_embeddings=True):
+        vectors = np.zeros((len(texts), self.table.shape[1]), dtype="float32")
+        for row, text in enumerate(texts):
+            buckets = [zlib.crc32(word.encode()) % self.buckets for word in text.split()]
+            vectors[row] = self.table[buckets].sum(axis=0)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+def page_chunks(pages):
+    """One chunk per page, standing in for the T5-token chunker"""
+    offset = 0
+    for page in pages:
+        yield page, offset, offset + len(page)
+        offset += len(page) + 1
+
+
+def make_document(rng, pages, words):
+    return [" ".join(rng.choice(VOCABULARY) for _ in range(words)) for _ in range(pages)]
+
+
+def _is_probable_prime(n, rng, rounds=32):
+    if n < 4:
+        return n in (2, 3)
+    for p in (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37):
+        if n % p == 0:
+            return n == p
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d, s = d // 2, s + 1
+    for _ in range(rounds):
+        x = pow(rng.randrange(2, n - 1), d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(s - 1):
+            x = pow(x, 2, n)
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def generate_rsa_key(bits=2048, seed=None):
+    """(n, e, d) for a fresh RSA key; test use only"""
+    rng = random.Random(seed) if seed is not None else random.SystemRandom()
+    e = 65537
+
+    def prime():
+        while True:
+            candidate = rng.getrandbits(bits // 2) | (1 << (bits // 2 - 1)) | 1
+            if candidate % e != 1 and _is_probable_prime(candidate, rng):
+                return candidate
+
+    while True:
+        p, q = prime(), prime()
+        n = p * q
+        if p != q and n.bit_length() == bits:
+            return n, e, pow(e, -1, (p - 1) * (q - 1))
+
+
+class StubSigningKey:
+    """An RSA key that signs RS256 JWTs, generated in pure Python"""
+
+    def __init__(self, bits=2048, seed=None, kid="stub-key-1"):
+        self.kid = kid
+        self.n, self.e, self.d = generate_rsa_key(bits, seed)
+
+    def jwk(self):
+        return {"kty": "RSA", "alg": "RS256", "use": "sig", "kid": self.kid,
+                "n": b64url_encode(self.n.to_bytes((self.n.bit_length() + 7) // 8, "big")),
+                "e": b64url_encode(self.e.to_bytes(3, "big"))}
+
+    def sign_jwt(self, claims):
+        header = b64url_encode(json.dumps({"alg": "RS256", "kid": self.kid, "typ": "JWT"}).encode())
+        payload = b64url_encode(json.dumps(claims).encode())
+        signing_input = f"{header}.{payload}".encode("ascii")
+        size = (self.n.bit_length() + 7) // 8
+        digest_info = SHA256_DIGEST_INFO + hashlib.sha256(signing_input).digest()
+        padded = b"\x00\x01" + b"\xff" * (size - len(digest_info) - 3) + b"\x00" + digest_info
+        signature = pow(int.from_bytes(padded, "big"), self.d, self.n).to_bytes(size, "big")
+        return f"{header}.{payload}.{b64url_encode(signature)}"
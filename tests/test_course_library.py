@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+pytest.importorskip("faiss")
+pytest.importorskip("streamlit")
+
+from modules.course_library import CourseLibrary
+from tests.helpers import HashEmbedder, make_document, page_chunks
+
+EMBEDDER = HashEmbedder(dimension=32, buckets=512)
+
+
+@pytest.fixture
+def open_library(db_path, tmp_path):
+    index_path = tmp_path / "library.faiss"
+    return lambda: CourseLibrary(db_path, index_path, embedder=EMBEDDER, chunk_pages=page_chunks)
+
+
+def publish(library, count, class_name="biology", uploaded_by=None, save=True):
+    rng = random.Random(len(library))
+    return [library.add_pages(make_document(rng, 3, 20), f"Handout {n}", class_name, uploaded_by, save=save)
+            for n in range(count)]
+
+
+def vector_ids(library):
+    import faiss
+    return set(faiss.vector_to_array(library.index.id_map).tolist())
+
+
+def test_unsaved_chunks_are_added_on_reopen(open_library):
+    library = open_library()
+    publish(library, 2)
+    publish(library, 2, save=False)
+    assert len(library) == 12
+    reopened = open_library()
+    assert len(reopened) == 12
+    assert vector_ids(reopened) == vector_ids(library)
+    assert not reopened.dirty  # The caught-up index was saved
+
+
+def test_vectors_of_removed_documents_are_dropped_on_reopen(open_library):
+    library = open_library()
+    kept, removed = publish(library, 2)
+    library.remove_document(removed, save=False)
+    reopened = open_library()
+    assert len(reopened) == 3
+    assert {hit["document_id"] for hit in reopened.search("term1 term2", k=10)} == {kept}
+
+
+def test_missing_index_file_is_rebuilt(open_library, tmp_path):
+    library = open_library()
+    publish(library, 2)
+    (tmp_path / "library.faiss").unlink()
+    reopened = open_library()
+    assert vector_ids(reopened) == vector_ids(library)
+
+
+def test_search_is_limited_to_one_class(open_library):
+    library = open_library()
+    biology = publish(library, 2, "biology")
+    history = publish(library, 2, "history")
+    assert {hit["document_id"] for hit in library.search("term1 term2", k=10, class_name="history")} <= set(history)
+    assert {hit["document_id"] for hit in library.search("term1 term2", k=10, class_name="biology")} <= set(biology)
+    assert library.search("term1", class_name="chemistry") == []
+
+
+def test_republishing_the_same_pages_returns_the_existing_document(open_library):
+    library = open_library()
+    pages = make_document(random.Random(0), 3, 20)
+    first = library.add_pages(pages, "Handout", "biology")
+    assert library.add_pages(pages, "Handout again", "biology") == first
+    assert len(library) == 3
+
+
+def test_only_the_uploader_can_remove_a_document(open_library):
+    library = open_library()
+    document_id, = publish(library, 1, uploaded_by="teacher")
+    assert not library.remove_document(document_id, uploaded_by="other")
+    assert len(library) == 3
+    assert library.remove_document(document_id, uploaded_by="teacher")
+    assert len(library) == 0
+    assert not library.remove_document(document_id)
@@ -0,0 +1,76 @@
+import pytest
+
+pytest.importorskip("bcrypt")
+
+from credentials import CredentialStore, LoginThrottle, LoginThrottled, hash_password, verify_password
+from database import get_pool
+
+
+def test_throttle_trips_after_max_failures():
+    throttle = LoginThrottle(max_failures=3, window_seconds=60)
+    for t in (100.0, 101.0):
+        throttle.record_failure("user:ada", now=t)
+        assert throttle.retry_after("user:ada", now=t) == 0
+    throttle.record_failure("user:ada", now=102.0)
+    # Blocked until the oldest of the last three failures leaves the window
+    assert throttle.retry_after("user:ada", now=102.0) == pytest.approx(58.0)
+    assert throttle.retry_after("user:other", now=102.0) == 0
+
+
+def test_throttle_window_slides():
+    throttle = LoginThrottle(max_failures=2, window_seconds=10)
+    throttle.record_failure("client:1.2.3.4", now=100.0)
+    throttle.record_failure("client:1.2.3.4", now=105.0)
+    assert throttle.retry_after("client:1.2.3.4", now=109.0) > 0
+    assert throttle.retry_after("client:1.2.3.4", now=110.5) == 0
+
+
+def test_throttle_reset_clears_one_key():
+    throttle = LoginThrottle(max_failures=1, window_seconds=60)
+    throttle.record_failure("user:ada", now=100.0)
+    throttle.record_failure("client:1.2.3.4", now=100.0)
+    throttle.reset("user:ada")
+    assert throttle.retry_after("user:ada", now=100.0) == 0
+    assert throttle.retry_after("client:1.2.3.4", now=100.0) > 0
+
+
+def test_throttle_prunes_expired_keys_when_full():
+    throttle = LoginThrottle(max_failures=5, window_seconds=10, max_keys=2)
+    throttle.record_failure("a", now=100.0)
+    throttle.record_failure("b", now=100.0)
+    throttle.record_failure("c", now=200.0)
+    assert set(throttle._failures) == {"c"}
+
+
+def test_hash_round_trip():
+    stored = hash_password("correct horse" * 10, rounds=4)
+    assert verify_password("correct horse" * 10, stored)
+    # Longer than bcrypt's 72 bytes, so only the pre-hash tells these apart
+    assert not verify_password("correct horse" * 10 + "!", stored)
+
+
+@pytest.fixture
+def store(db_path):
+    store = CredentialStore(get_pool(db_path), LoginThrottle(max_failures=2, window_seconds=60), rounds=4)
+    store.register("ada", "right password")
+    store.register("eve", "eve's password")
+    return store
+
+
+def test_authenticate_throttles_user_and_client(store):
+    assert store.authenticate("ada", "right password", client="1.2.3.4")[1] == "ada"
+    for _ in range(2):
+        assert store.authenticate("ada", "wrong", client="1.2.3.4") is None
+    with pytest.raises(LoginThrottled):
+        store.authenticate("ada", "right password", client="5.6.7.8")
+    with pytest.raises(LoginThrottled):
+        store.authenticate("eve", "eve's password", client="1.2.3.4")
+
+
+def test_valid_login_does_not_clear_the_client_count(store):
+    assert store.authenticate("ada", "wrong", client="1.2.3.4") is None
+    assert store.authenticate("eve", "eve's password", client="1.2.3.4") is not None
+    assert store.authenticate("ada", "wrong again", client="1.2.3.4") is None
+    # The eve account has no failures; the client's two still count despite the success in between
+    with pytest.raises(LoginThrottled):
+        store.authenticate("eve", "eve's password", client="1.2.3.4")
@@ -0,0 +1,77 @@
+import sqlite3
+
+import pytest
+
+import database
+from database import MIGRATIONS, get_pool, migrate
+
+
+def user_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def tables(conn):
+    return {name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def test_migrate_creates_the_current_schema(db_path):
+    conn = sqlite3.connect(db_path)
+    migrate(conn)
+    assert user_version(conn) == len(MIGRATIONS)
+    assert {"users", "quiz_results", "quiz_answers", "student_aggregates", "sessions",
+            "library_documents", "library_chunks"} <= tables(conn)
+
+
+def test_migrate_is_idempotent(db_path):
+    conn = sqlite3.connect(db_path)
+    migrate(conn)
+    conn.execute("INSERT INTO users (username, password, role) VALUES ('ada', 'x', 'student')")
+    conn.commit()
+    migrate(conn)
+    assert user_version(conn) == len(MIGRATIONS)
+    assert conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 1
+
+
+def test_migrate_runs_only_the_missing_steps(db_path):
+    conn = sqlite3.connect(db_path)
+    migrate(conn)
+    conn.execute("INSERT INTO quiz_results (user_id, subject, topic, difficulty, score, total, timestamp) "
+                 "VALUES ('ada', 'math', 'algebra', 'easy', 2, 3, '2024-05-01T10:00:00')")
+    conn.execute(f"PRAGMA user_version = {MIGRATIONS.index(database._normalize_timestamps)}")
+    conn.commit()
+    migrate(conn)
+    assert user_version(conn) == len(MIGRATIONS)
+    # The version 6 step normalizes ISO 'T' timestamps and rebuilds the aggregates
+    assert "T" not in conn.execute("SELECT timestamp FROM quiz_results").fetchone()[0]
+    assert conn.execute("SELECT attempts FROM student_aggregates").fetchone()[0] == 1
+
+
+def test_failed_step_rolls_back(db_path, monkeypatch):
+    def broken(c):
+        c.execute("CREATE TABLE half_done (id INTEGER)")
+        raise sqlite3.IntegrityError("step failed")
+
+    monkeypatch.setattr(database, "MIGRATIONS", MIGRATIONS + [broken])
+    conn = sqlite3.connect(db_path)
+    with pytest.raises(sqlite3.IntegrityError):
+        migrate(conn)
+    assert user_version(conn) == len(MIGRATIONS)
+    assert "half_done" not in tables(conn)
+
+
+def test_corrupt_file_is_moved_aside(db_path):
+    db_path.write_bytes(b"this is not a database" * 100)
+    pool = get_pool(db_path)
+    assert user_version(pool.connection()) == len(MIGRATIONS)
+    assert len(list(db_path.parent.glob("edututor.db.corrupt-*"))) == 1
+
+
+def test_other_errors_keep_the_file(db_path, monkeypatch):
+    def broken(c):
+        raise sqlite3.IntegrityError("UNIQUE constraint failed")
+
+    monkeypatch.setattr(database, "MIGRATIONS", [broken])
+    with pytest.raises(sqlite3.IntegrityError):
+        get_pool(db_path)
+    assert db_path.exists()
+    assert not list(db_path.parent.glob("*.corrupt-*"))
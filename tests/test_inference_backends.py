@@ -0,0 +1,86 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from modules.inference_backends import load_qa, load_t5
+from tests.helpers import PARITY_SET, pipeline_answers
+
+# Share of parity answers a backend must give exactly as fp32 does (the benchmark's --min-parity)
+MIN_PARITY = 0.75
+# Largest mean absolute difference from the fp32 start/end logits, over real (unpadded) tokens
+MAX_LOGIT_DRIFT = 1.0
+
+
+def load(loader, backend):
+    try:
+        return loader(backend)
+    except OSError as e:
+        pytest.skip(f"{backend} model is not available: {e}")
+
+
+@pytest.fixture(scope="module", params=["int8", "onnx"])
+def backend(request):
+    if request.param == "onnx":
+        # Without optimum, resolve_backend falls back to torch and there would be nothing to compare
+        pytest.importorskip("optimum.onnxruntime")
+    return request.param
+
+
+@pytest.fixture(scope="module")
+def fp32_qa():
+    return load(load_qa, "torch")
+
+
+@pytest.fixture(scope="module")
+def fp32_t5():
+    return load(load_t5, "torch")
+
+
+@pytest.fixture(scope="module")
+def quantized_qa(backend):
+    return load(load_qa, backend)
+
+
+@pytest.fixture(scope="module")
+def quantized_t5(backend):
+    return load(load_t5, backend)
+
+
+def matching(expected, actual):
+    return sum(a == b for a, b in zip(expected, actual)) / len(expected)
+
+
+def qa_logits(qa_pipeline):
+    inputs = qa_pipeline.tokenizer([q for q, _ in PARITY_SET], [c for _, c in PARITY_SET],
+                                   padding=True, return_tensors="pt")
+    with torch.inference_mode():
+        outputs = qa_pipeline.model(**inputs)
+    mask = inputs["attention_mask"].bool()
+    return torch.stack([torch.as_tensor(outputs.start_logits), torch.as_tensor(outputs.end_logits)])[:, mask]
+
+
+def t5_answers(tokenizer, model):
+    # The generation settings of modules.pdf_qa.generate_answers
+    inputs = tokenizer([f"question: {q} context: {c}" for q, c in PARITY_SET], return_tensors="pt",
+                       max_length=512, truncation=True, padding=True)
+    with torch.inference_mode():
+        outputs = model.generate(**inputs, max_length=100, num_beams=4, early_stopping=True)
+    return tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+
+def test_qa_answers_match_fp32(quantized_qa, fp32_qa):
+    expected = [r["answer"].strip() for r in pipeline_answers(fp32_qa, PARITY_SET)]
+    actual = [r["answer"].strip() for r in pipeline_answers(quantized_qa, PARITY_SET)]
+    assert matching(expected, actual) >= MIN_PARITY, list(zip(expected, actual))
+
+
+def test_qa_logits_stay_close_to_fp32(quantized_qa, fp32_qa):
+    drift = (qa_logits(quantized_qa) - qa_logits(fp32_qa)).abs().mean().item()
+    assert drift <= MAX_LOGIT_DRIFT
+
+
+def test_t5_answers_match_fp32(quantized_t5, fp32_t5):
+    expected = t5_answers(*fp32_t5)
+    actual = t5_answers(*quantized_t5)
+    assert matching(expected, actual) >= MIN_PARITY, list(zip(expected, actual))
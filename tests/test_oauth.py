@@ -0,0 +1,119 @@
+import time
+
+import pytest
+
+from oauth import OAuthError, OIDCProvider, SessionSigner, b64url_decode, b64url_encode, rsa_verify
+from tests.helpers import StubSigningKey
+
+ISSUER = "https://idp.example"
+DISCOVERY = f"{ISSUER}/.well-known/openid-configuration"
+
+
+class DictCache:
+    """JsonCache stand-in serving fixed documents and counting forced refreshes"""
+
+    timeout = 1
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.refreshes = 0
+
+    def get(self, url, refresh=False):
+        self.refreshes += refresh
+        return self.documents[url]
+
+
+@pytest.fixture(scope="module")
+def idp():
+    return StubSigningKey(bits=1024, seed=1)
+
+
+@pytest.fixture
+def provider(idp):
+    cache = DictCache({
+        DISCOVERY: {"issuer": ISSUER, "jwks_uri": f"{ISSUER}/jwks"},
+        f"{ISSUER}/jwks": {"keys": [idp.jwk()]},
+    })
+    return OIDCProvider(discovery_url=DISCOVERY, client_id="edututor", cache=cache,
+                        signer=SessionSigner("test secret"))
+
+
+def claims(**overrides):
+    now = int(time.time())
+    return dict({"iss": ISSUER, "aud": "edututor", "sub": "42", "email": "ada@example.com",
+                 "iat": now, "exp": now + 600, "nonce": "n-1"}, **overrides)
+
+
+def test_rsa_verify(idp):
+    header, payload, signature = idp.sign_jwt(claims()).split(".")
+    message = f"{header}.{payload}".encode("ascii")
+    assert rsa_verify(idp.jwk(), message, b64url_decode(signature))
+    assert not rsa_verify(idp.jwk(), message + b"x", b64url_decode(signature))
+    assert not rsa_verify(idp.jwk(), message, b64url_decode(signature)[:-1])
+    tampered = bytearray(b64url_decode(signature))
+    tampered[-1] ^= 1
+    assert not rsa_verify(idp.jwk(), message, bytes(tampered))
+
+
+def test_verify_id_token_accepts_a_valid_token(provider, idp):
+    assert provider.verify_id_token(idp.sign_jwt(claims()), nonce="n-1")["email"] == "ada@example.com"
+    # Google's scheme-less issuer and a list audience are both accepted
+    token = idp.sign_jwt(claims(iss="idp.example", aud=["other", "edututor"]))
+    assert provider.verify_id_token(token)["sub"] == "42"
+
+
+@pytest.mark.parametrize("bad, message", [
+    (dict(iss="https://evil.example"), "issuer"),
+    (dict(aud="someone-else"), "different client"),
+    (dict(exp=int(time.time()) - 3600), "expired"),
+    (dict(nonce="n-2"), "nonce"),
+])
+def test_verify_id_token_rejects_bad_claims(provider, idp, bad, message):
+    with pytest.raises(OAuthError, match=message):
+        provider.verify_id_token(idp.sign_jwt(claims(**bad)), nonce="n-1")
+
+
+def test_verify_id_token_rejects_a_forged_signature(provider, idp):
+    header, payload, signature = idp.sign_jwt(claims()).split(".")
+    forged_payload = b64url_encode(b64url_decode(payload).replace(b"ada@", b"eve@"))
+    with pytest.raises(OAuthError, match="signature"):
+        provider.verify_id_token(f"{header}.{forged_payload}.{signature}")
+
+
+def test_verify_id_token_rejects_other_algorithms(provider):
+    header = b64url_encode(b'{"alg":"none","kid":"stub-key-1"}')
+    with pytest.raises(OAuthError, match="algorithm"):
+        provider.verify_id_token(f"{header}.{b64url_encode(b'{}')}.")
+    with pytest.raises(OAuthError, match="Malformed"):
+        provider.verify_id_token("not-a-token")
+
+
+def test_unknown_key_refetches_the_jwks_once(provider, idp, monkeypatch):
+    monkeypatch.setattr(idp, "kid", "rotated-key")
+    with pytest.raises(OAuthError, match="Unknown signing key"):
+        provider.verify_id_token(idp.sign_jwt(claims()))
+    assert provider.cache.refreshes == 1
+
+
+def test_session_signer_round_trip():
+    signer = SessionSigner("test secret", ttl_seconds=60)
+    token = signer.sign({"username": "ada"})
+    assert signer.verify(token)["username"] == "ada"
+    assert SessionSigner("another secret").verify(token) is None
+
+
+def test_session_signer_rejects_tampering_and_expiry():
+    signer = SessionSigner("test secret")
+    payload, mac = signer.sign({"username": "ada", "role": "student"}).split(".")
+    forged = b64url_encode(b64url_decode(payload).replace(b"student", b"teacher"))
+    assert signer.verify(f"{forged}.{mac}") is None
+    assert signer.verify("garbage") is None
+    assert signer.verify(None) is None
+    assert signer.verify(signer.sign({"username": "ada"}, ttl_seconds=-1)) is None
+
+
+def test_session_signer_without_a_secret_uses_a_random_key(monkeypatch):
+    from config import Config
+    monkeypatch.setattr(Config, "SECRET_KEY", "your-secret-key-here")
+    first, second = SessionSigner(), SessionSigner()
+    assert second.verify(first.sign({"username": "ada"})) is None
@@ -0,0 +1,72 @@
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from modules.inference_server import MicroBatcher
+from modules.qa_context import ContextCache, QAContext, forward_pairs
+from tests.helpers import CONTEXT, QUESTIONS, make_passage, pipeline_answers
+
+
+@pytest.fixture(scope="module")
+def qa_pipeline():
+    from modules.inference_backends import load_qa
+    try:
+        return load_qa("torch")
+    except OSError as e:
+        pytest.skip(f"QA model is not available: {e}")
+
+
+def test_matches_the_pipeline_on_a_short_passage(qa_pipeline):
+    expected = pipeline_answers(qa_pipeline, [(question, CONTEXT) for question in QUESTIONS])
+    answers = QAContext(CONTEXT, qa_pipeline.tokenizer).answer(qa_pipeline.model, QUESTIONS)
+    assert [a["answer"].strip() for a in answers] == [e["answer"].strip() for e in expected]
+    for answer in answers:
+        assert CONTEXT[answer["start"]:answer["end"]] == answer["answer"]
+
+
+def test_finds_facts_across_windows(qa_pipeline):
+    passage, questions = make_passage(1500, 3)
+    context = QAContext(passage, qa_pipeline.tokenizer, max_length=128, stride=32)
+    assert len(context.window_starts(100)) > 10
+    answers = context.answer(qa_pipeline.model, questions, pairs_per_pass=16)
+    for answer, fact in zip(answers, ["mitochondria", "chemical energy", "1648"]):
+        assert fact in answer["answer"]
+    assert context.forward_passes == -(-context.pairs_encoded // 16)
+
+
+def test_windows_cover_the_whole_passage(qa_pipeline):
+    passage, _ = make_passage(800, 1)
+    context = QAContext(passage, qa_pipeline.tokenizer, stride=16)
+    starts = context.window_starts(64)
+    assert starts[0] == 0 and starts[-1] + 64 >= len(context.input_ids)
+    assert all(b - a <= 64 - 16 for a, b in zip(starts, starts[1:]))
+
+
+def test_batcher_gives_the_same_answers(qa_pipeline):
+    passage, questions = make_passage(600, 3)
+    direct = QAContext(passage, qa_pipeline.tokenizer).answer(qa_pipeline.model, questions)
+    batcher = MicroBatcher(lambda sequences: forward_pairs(qa_pipeline.model, qa_pipeline.tokenizer, sequences),
+                           max_batch_size=4, max_wait_ms=5)
+    batched = QAContext(passage, qa_pipeline.tokenizer).answer(qa_pipeline.model, questions, batcher=batcher)
+    assert [a["answer"] for a in batched] == [a["answer"] for a in direct]
+    assert batcher.batches >= 1
+
+
+def test_repeated_questions_skip_the_model(qa_pipeline):
+    context = QAContext(CONTEXT, qa_pipeline.tokenizer)
+    first = context.answer(qa_pipeline.model, QUESTIONS[:2])
+    passes = context.forward_passes
+    again = context.answer(qa_pipeline.model, ["  what PRODUCES atp? ", QUESTIONS[1]])
+    assert context.forward_passes == passes
+    assert [a["answer"] for a in again] == [a["answer"] for a in first]
+
+
+def test_context_cache_keeps_the_most_recent_passages(qa_pipeline):
+    cache = ContextCache(capacity=2)
+    a = cache.get("First passage.", qa_pipeline.tokenizer)
+    cache.get("Second passage.", qa_pipeline.tokenizer)
+    assert cache.get("First passage.", qa_pipeline.tokenizer) is a
+    cache.get("Third passage.", qa_pipeline.tokenizer)
+    assert len(cache) == 2
+    assert cache.get("First passage.", qa_pipeline.tokenizer) is a